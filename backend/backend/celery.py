@@ -0,0 +1,21 @@
+# Drug/backend/backend/celery.py
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+# Background training jobs (predictions.tasks); start a worker with
+#   celery -A backend worker -l info
+# Only the worker and predictions.tasks.enqueue_training_job import this module,
+# so web workers and management commands never load Celery.
+app = Celery('backend')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+
+@app.task(name='predictions.run_training_job')
+def run_training_job(job_id):
+    from predictions.tasks import run_training_job
+
+    return run_training_job(job_id)
@@ -113,6 +113,15 @@ DATABASES = {
     }
 }
 
+# Offline runs (tests, benchmarks): DATABASE_URL=sqlite:///db.sqlite3, or sqlite:// for in-memory
+if tmpPostgres.scheme == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': tmpPostgres.path[1:] or ':memory:',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -184,6 +193,90 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
     'COMPONENT_SPLIT_REQUEST': True,
 }
+# ML model: load and warm the predictor at startup instead of on the first request.
+# Combine with `gunicorn --preload` so workers share one copy of the model.
+PRELOAD_ML_MODEL = os.getenv('PRELOAD_ML_MODEL', 'False').lower() == 'true'
+# How often (seconds) workers check ml_models/CURRENT for a newly published model version
+ML_MODEL_POLL_SECONDS = float(os.getenv('ML_MODEL_POLL_SECONDS', '5'))
+
+# Prediction cache: per-worker LRU (size 0 disables it) plus an optional Redis tier
+# shared by all workers, e.g. PREDICTION_CACHE_REDIS_URL=redis://localhost:6379/1.
+# Only calls of up to PREDICTION_CACHE_MAX_ROWS rows (single and small batch
+# requests) use it; bulk and network scoring go straight to the model.
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '10000'))
+PREDICTION_CACHE_MAX_ROWS = int(os.getenv('PREDICTION_CACHE_MAX_ROWS', '64'))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', '300'))
+PREDICTION_CACHE_REDIS_URL = os.getenv('PREDICTION_CACHE_REDIS_URL', '')
+
+# Micro-batching of concurrent single predictions (useful with threaded workers,
+# e.g. `gunicorn --threads 8`). A window of 0 ms disables it. A caller not
+# answered within the timeout scores its own row directly.
+PREDICTION_BATCH_WINDOW_MS = float(os.getenv('PREDICTION_BATCH_WINDOW_MS', '0'))
+PREDICTION_BATCH_MAX_SIZE = int(os.getenv('PREDICTION_BATCH_MAX_SIZE', '64'))
+PREDICTION_BATCH_TIMEOUT_MS = float(os.getenv('PREDICTION_BATCH_TIMEOUT_MS', '1000'))
+
+# Batches up to this many rows are scored by the NumPy tree evaluator instead of
+# xgboost (faster when per-call overhead dominates). 0 always uses xgboost.
+# Workers import xgboost and read the booster only for their first larger batch.
+ML_NUMPY_EVALUATOR_MAX_ROWS = int(os.getenv('ML_NUMPY_EVALUATOR_MAX_ROWS', '32'))
+
+# Per-worker latency histograms for each prediction stage (model-status/, metrics/)
+PREDICTION_METRICS_ENABLED = os.getenv('PREDICTION_METRICS_ENABLED', 'True').lower() == 'true'
+
+# Scored result sets kept for paging by handle (uses the Redis URL above when set).
+# Each worker keeps at most PREDICTION_RESULT_CACHE_SIZE sets and
+# PREDICTION_RESULT_CACHE_MB of arrays in memory; a 20,000-row set is about 0.7 MB.
+PREDICTION_RESULT_TTL = int(os.getenv('PREDICTION_RESULT_TTL', '900'))
+PREDICTION_RESULT_CACHE_SIZE = int(os.getenv('PREDICTION_RESULT_CACHE_SIZE', '20'))
+PREDICTION_RESULT_CACHE_MB = int(os.getenv('PREDICTION_RESULT_CACHE_MB', '64'))
+
+# train_model --incremental: trees added per update, minimum changed records
+# for an update, tree count that forces a full retrain, and the largest
+# feature mean shift (in training standard deviations) before one is forced
+ML_INCREMENTAL_ROUNDS = int(os.getenv('ML_INCREMENTAL_ROUNDS', '50'))
+ML_INCREMENTAL_MIN_ROWS = int(os.getenv('ML_INCREMENTAL_MIN_ROWS', '50'))
+ML_INCREMENTAL_MAX_TREES = int(os.getenv('ML_INCREMENTAL_MAX_TREES', '500'))
+ML_INCREMENTAL_DRIFT_THRESHOLD = float(os.getenv('ML_INCREMENTAL_DRIFT_THRESHOLD', '0.5'))
+
+# Shortage horizons in days the model is trained for, e.g. 7,14,30. More than
+# one trains a single multi-output booster that scores every horizon in one pass.
+ML_PREDICTION_HORIZONS = [int(h) for h in os.getenv('ML_PREDICTION_HORIZONS', '7').split(',')]
+
+# Monte Carlo stockout simulation (simulate_stockouts, /api/predictions/stockout-simulation/):
+# demand paths per inventory, days simulated, working memory per chunk, daily
+# demand spread (std / mean) where the ledger gives none, and the replenishment
+# lead time in days with its spread
+SIMULATION_PATHS = int(os.getenv('SIMULATION_PATHS', '1000'))
+SIMULATION_DAYS = int(os.getenv('SIMULATION_DAYS', '30'))
+SIMULATION_MEMORY_MB = int(os.getenv('SIMULATION_MEMORY_MB', '256'))
+SIMULATION_DEMAND_CV = float(os.getenv('SIMULATION_DEMAND_CV', '0.5'))
+SIMULATION_LEAD_TIME_DAYS = float(os.getenv('SIMULATION_LEAD_TIME_DAYS', '7'))
+SIMULATION_LEAD_TIME_CV = float(os.getenv('SIMULATION_LEAD_TIME_CV', '0.5'))
+# Largest inventories x paths x days the stockout-simulation/ API runs inside a
+# request (about two seconds on one core); larger runs return 400
+SIMULATION_REQUEST_MAX_STEPS = int(os.getenv('SIMULATION_REQUEST_MAX_STEPS', '60000000'))
+
+# Persisted prediction runs (score_network --save, /api/predictions/runs/):
+# completed runs kept before the oldest are deleted, and results per INSERT
+PREDICTION_RUNS_KEPT = int(os.getenv('PREDICTION_RUNS_KEPT', '30'))
+PREDICTION_RUN_BATCH_SIZE = int(os.getenv('PREDICTION_RUN_BATCH_SIZE', '2000'))
+
+# Background training jobs (POST /api/predictions/training-jobs/). With a broker,
+# e.g. CELERY_BROKER_URL=redis://localhost:6379/2, jobs run on Celery workers
+# (`celery -A backend worker`); otherwise in a thread of the web process.
+# 'eager' runs them inline, before the request returns.
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', '')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', '') or None
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+TRAINING_JOB_BACKEND = os.getenv('TRAINING_JOB_BACKEND', 'celery' if CELERY_BROKER_URL else 'thread')
+# Running jobs refresh a heartbeat every TRAINING_JOB_HEARTBEAT_SECONDS; one
+# silent for TRAINING_JOB_STALE_SECONDS (its worker was killed or recycled) is
+# marked FAILED so it no longer blocks new jobs. TUNE jobs start a process pool
+# and are refused on the 'thread' backend, which would run it in a web worker.
+TRAINING_JOB_HEARTBEAT_SECONDS = int(os.getenv('TRAINING_JOB_HEARTBEAT_SECONDS', '30'))
+TRAINING_JOB_STALE_SECONDS = int(os.getenv('TRAINING_JOB_STALE_SECONDS', '300'))
+
 # CORS settings - add your frontend URL here
 CORS_ALLOWED_ORIGINS = os.getenv(
     'CORS_ALLOWED_ORIGINS', 
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['last_updated'], name='inventory_last_up_f611e9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['transaction_date'], name='inventory_t_transac_3d1ff9_idx'),
+        ),
+    ]
@@ -63,6 +63,8 @@ class Inventory(models.Model):
         indexes = [
             models.Index(fields=['hospital', 'current_stock']),
             models.Index(fields=['medicine', 'current_stock']),
+            # Incremental rescoring and training select rows changed since a watermark
+            models.Index(fields=['last_updated']),
         ]
     
     def __str__(self):
@@ -82,6 +84,13 @@ class Inventory(models.Model):
     
     @property
     def days_until_stockout(self):
+        # Projected from the transaction ledger's consumption forecast when there is one
+        forecast = getattr(self, 'consumption_forecast', None)
+        if forecast is not None:
+            from predictions.consumption import projected_days_of_supply
+            return int(projected_days_of_supply(
+                self.current_stock, forecast.forecast_7d, forecast.forecast_14d, forecast.forecast_30d
+            ))
         if self.average_daily_usage > 0:
             return int(self.current_stock / self.average_daily_usage)
         return None
@@ -111,6 +120,7 @@ class InventoryTransaction(models.Model):
         indexes = [
             models.Index(fields=['inventory', 'transaction_date']),
             models.Index(fields=['transaction_type', 'transaction_date']),
+            models.Index(fields=['transaction_date']),
         ]
     
     def __str__(self):
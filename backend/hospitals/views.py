@@ -49,7 +49,7 @@ class HospitalViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def inventory(self, request, pk=None):
         hospital = self.get_object()
-        inventory = hospital.inventory.select_related('medicine').all()
+        inventory = hospital.inventory.select_related('medicine', 'consumption_forecast').all()
         serializer = InventorySerializer(inventory, many=True)
         return Response(serializer.data)
     
@@ -58,13 +58,13 @@ class HospitalViewSet(viewsets.ModelViewSet):
         hospital = self.get_object()
         low_stock = hospital.inventory.filter(
             current_stock__lte=F('reorder_level')
-        ).select_related('medicine')
+        ).select_related('medicine', 'consumption_forecast')
         serializer = InventorySerializer(low_stock, many=True)
         return Response(serializer.data)
 
 
 class InventoryViewSet(viewsets.ModelViewSet):
-    queryset = Inventory.objects.select_related('hospital', 'medicine').all()
+    queryset = Inventory.objects.select_related('hospital', 'medicine', 'consumption_forecast').all()
     permission_classes = [IsAuthenticated]
     
     def get_serializer_class(self):
@@ -74,7 +74,7 @@ class InventoryViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        queryset = Inventory.objects.select_related('hospital', 'medicine')
+        queryset = Inventory.objects.select_related('hospital', 'medicine', 'consumption_forecast')
         
         if user.is_superuser or user.role == 'HEALTH_AUTHORITY':
             return queryset.all()
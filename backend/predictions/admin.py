@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import PredictionRun, TrainingJob
 
 # Register your models here.
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'mode', 'status', 'progress', 'model_version', 'requested_by', 'created_at', 'finished_at']
+    list_filter = ['mode', 'status', 'created_at']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(PredictionRun)
+class PredictionRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model_version', 'hospital', 'state', 'total', 'seconds', 'created_at', 'completed_at']
+    list_filter = ['model_version', 'created_at']
+    readonly_fields = ['created_at', 'completed_at']
@@ -1,6 +1,23 @@
+import gc
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PredictionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predictions'
+
+    def ready(self):
+        # Opt-in: load and warm the model once in the gunicorn master (--preload)
+        # so forked workers share its pages copy-on-write
+        if getattr(settings, 'PRELOAD_ML_MODEL', False):
+            from .forecaster import predictor_instance
+            from .metrics import pipeline_metrics
+
+            if predictor_instance.warm_up():
+                # Warm-up timings would otherwise be copied into every worker
+                pipeline_metrics.reset()
+                # Move the loaded objects out of the GC's reach so collections in
+                # the workers don't touch (and un-share) their pages
+                gc.freeze()
@@ -0,0 +1,159 @@
+# Drug/backend/predictions/batching.py
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from django.conf import settings
+
+
+class _Pending:
+    __slots__ = ('snapshot', 'row', 'done', 'result', 'error')
+
+    def __init__(self, snapshot, row):
+        self.snapshot = snapshot
+        self.row = row
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one model call.
+
+    Callers block in infer() while a dispatcher thread collects rows for up to
+    `window_ms` (or until `max_batch` rows are queued), scores them with one
+    vectorized call and hands each caller its own probability.
+
+    The window is adaptive: a lone request on an idle worker is dispatched
+    immediately, so batching only adds latency when there is real concurrency.
+
+    A caller never waits more than `timeout_ms` for the dispatcher: after
+    that (a dispatcher that died, or a request stranded by a reset) it
+    scores its own row directly.
+    """
+
+    def __init__(self, infer_fn, window_ms=3, max_batch=64, timeout_ms=1000):
+        self.infer_fn = infer_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.timeouts = 0
+        self._reset_lock = threading.Lock()
+        self._reset()
+
+    @classmethod
+    def from_settings(cls, infer_fn):
+        window_ms = getattr(settings, 'PREDICTION_BATCH_WINDOW_MS', 0)
+        if window_ms <= 0:
+            return None
+        return cls(
+            infer_fn, window_ms, getattr(settings, 'PREDICTION_BATCH_MAX_SIZE', 64),
+            getattr(settings, 'PREDICTION_BATCH_TIMEOUT_MS', 1000),
+        )
+
+    def _reset(self):
+        # Threads don't survive fork; every worker process starts its own dispatcher
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        self._last_batch_size = 0
+        # Last, so a thread that sees the new pid also sees the new queue
+        self._pid = os.getpid()
+
+    def _check_process(self):
+        """Reset once after a fork, however many threads notice it at the same time"""
+        if self._pid != os.getpid():
+            with self._reset_lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _start_dispatcher(self):
+        self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+        self._thread.start()
+
+    def infer(self, snapshot, X):
+        """Drop-in for a direct model call: probabilities for each row of X"""
+        return np.array([self.submit(snapshot, row) for row in X], dtype=np.float32)
+
+    def submit(self, snapshot, row):
+        pending = _Pending(snapshot, row)
+        self._check_process()
+        cond, queue = self._cond, self._queue
+        with cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._start_dispatcher()
+            queue.append(pending)
+            cond.notify()
+
+        if not pending.done.wait(self.timeout):
+            with cond:
+                try:
+                    queue.remove(pending)
+                except ValueError:
+                    pass  # Already taken by the dispatcher; its answer is simply not waited for
+            self.timeouts += 1
+            print(f"⚠️  Micro-batcher did not answer within {self.timeout * 1000:.0f}ms; scoring the row directly")
+            return self.infer_fn(snapshot, np.asarray(row)[None, :])[0]
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            # Idle worker and a single caller: don't make it wait for company
+            if len(self._queue) > 1 or self._last_batch_size > 1:
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch))]
+            self._last_batch_size = len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            # A model swap can land mid-window; score each snapshot's rows separately
+            groups = {}
+            for pending in batch:
+                groups.setdefault(id(pending.snapshot), []).append(pending)
+
+            for group in groups.values():
+                try:
+                    X = np.stack([pending.row for pending in group])
+                    probabilities = self.infer_fn(group[0].snapshot, X)
+                    for pending, probability in zip(group, probabilities):
+                        pending.result = probability
+                except Exception as e:
+                    for pending in group:
+                        pending.error = e
+                for pending in group:
+                    pending.done.set()
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+            'max_batch_seen': self.max_batch_seen,
+            'timeouts': self.timeouts,
+        }
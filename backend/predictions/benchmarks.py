@@ -0,0 +1,229 @@
+# Drug/backend/predictions/benchmarks.py
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+DEFAULT_SIZES = [1, 100, 10000, 100000]
+# Allowed slowdown of the median before a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Every benchmark runs at least MIN_RUNS times, then stops after `repeat`
+# runs or once it has used TIME_BUDGET seconds, whichever comes first
+MIN_RUNS = 3
+TIME_BUDGET = 5.0
+
+CATEGORIES = ['ANTIBIOTIC', 'ANALGESIC', 'ANTIVIRAL', 'CARDIOVASCULAR', 'DIABETES', 'RESPIRATORY', 'VACCINE', 'OTHER']
+HOSPITAL_TYPES = ['GOVERNMENT', 'PRIVATE', 'CHARITABLE']
+
+
+def synthetic_inventories(count, seed=0):
+    """Deterministic raw-input inventory dicts, as a client would send them"""
+    rng = np.random.default_rng(seed)
+    stock = rng.integers(0, 500, count)
+    usage = np.round(rng.uniform(1, 50, count), 2)
+    reorder = rng.integers(10, 100, count)
+    categories = rng.integers(0, len(CATEGORIES), count)
+    types = rng.integers(0, len(HOSPITAL_TYPES), count)
+    beds = rng.choice([50, 100, 200, 500, 1000], count)
+    days = rng.integers(0, 365, count)
+    start = datetime(2025, 1, 1, 10, tzinfo=timezone.utc).timestamp()
+
+    return [
+        {
+            'medicine_id': i % 500,
+            'hospital_id': i // 500,
+            'current_stock': int(stock[i]),
+            'daily_consumption': float(usage[i]),
+            'reorder_level': int(reorder[i]),
+            'drug_category': CATEGORIES[categories[i]],
+            'hospital_type': HOSPITAL_TYPES[types[i]],
+            'hospital_bed_count': int(beds[i]),
+            'last_updated': datetime.fromtimestamp(start + days[i] * 86400, timezone.utc).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def seed_fixture(hospitals=20, medicines=50):
+    """Hospitals stocking every medicine, for the database-backed views"""
+    from hospitals.models import Hospital, Inventory
+    from medicines.models import Medicine
+
+    meds = Medicine.objects.bulk_create([
+        Medicine(
+            name=f'Bench Medicine {m}', generic_name=f'Generic {m}', category=CATEGORIES[m % len(CATEGORIES)],
+            manufacturer='Acme', dosage_form='Tablet', strength='500mg'
+        )
+        for m in range(medicines)
+    ])
+    sites = Hospital.objects.bulk_create([
+        Hospital(
+            name=f'Bench Hospital {h}', registration_number=f'BENCH{h}', address='1 Main St',
+            city='Pune', state='Maharashtra' if h % 2 == 0 else 'Kerala', pincode='411001',
+            contact_person='Admin', contact_email=f'bench{h}@example.com', contact_phone='123',
+            bed_capacity=100 * (h % 10 + 1), hospital_type=HOSPITAL_TYPES[h % 3]
+        )
+        for h in range(hospitals)
+    ])
+    Inventory.objects.bulk_create([
+        Inventory(
+            hospital=hospital, medicine=medicine,
+            current_stock=(h * 53 + m * 31) % 300, reorder_level=(m * 17) % 80 + 10,
+            max_capacity=1000, average_daily_usage=f'{(h * 7 + m * 11) % 40 + 1}.50'
+        )
+        for h, hospital in enumerate(sites)
+        for m, medicine in enumerate(meds)
+    ])
+    return hospitals * medicines
+
+
+def measure(fn, repeat, rows=1):
+    """Run fn once to warm up, then time it; returns a result dict (milliseconds)"""
+    fn()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max(repeat, 1):
+        run_started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - run_started)
+        if len(timings) >= MIN_RUNS and time.perf_counter() - started > TIME_BUDGET:
+            break
+
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        'rows': rows,
+        'runs': len(timings),
+        'median_ms': median * 1000,
+        'min_ms': timings[0] * 1000,
+        'p95_ms': timings[min(int(len(timings) * 0.95), len(timings) - 1)] * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000,
+        'rows_per_second': rows / median if median else 0.0,
+    }
+
+
+def environment():
+    """Library and machine details, so results are only compared like with like"""
+    versions = {}
+    for name in ('django', 'numpy', 'pandas', 'sklearn', 'xgboost'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'libraries': versions,
+    }
+
+
+def run_benchmarks(predictor, sizes=DEFAULT_SIZES, repeat=20, views=True, log=print):
+    """
+    Time the prediction stack with `predictor` (which must have a model).
+    View benchmarks go through the DRF test client and need a database with
+    the fixture from seed_fixture; they use the module's predictor_instance.
+    """
+    import pandas as pd
+    from .forecaster import MODEL_FILE, load_booster
+
+    snapshot = predictor.serving_snapshot()
+    results = {}
+
+    def record(name, fn, rows=1):
+        results[name] = measure(fn, repeat, rows)
+        log(f"   {name}: {results[name]['median_ms']:.3f} ms median ({results[name]['runs']} runs)")
+
+    # A full load includes the booster, which bundled versions otherwise read on first use
+    record('model_load', lambda: predictor._load_snapshot(snapshot.version).model)
+    booster_path = os.path.join(predictor.registry.version_path(snapshot.version), MODEL_FILE)
+    if os.path.exists(booster_path):
+        record('booster_load', lambda: load_booster(booster_path))
+
+    single = synthetic_inventories(1)[0]
+    record('predict', lambda: predictor.predict(single))
+
+    for size in sizes:
+        items = synthetic_inventories(size)
+        df = pd.DataFrame(items)
+        record(f'create_features[{size}]', lambda: predictor.create_features(df, is_training=False, snapshot=snapshot), size)
+        record(f'batch_predict[{size}]', lambda: predictor.batch_predict(items), size)
+
+    if views:
+        results.update(_view_benchmarks(repeat, log))
+
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'model_version': snapshot.version,
+        'environment': environment(),
+        'results': results,
+    }
+
+
+def _view_benchmarks(repeat, log):
+    from django.contrib.auth import get_user_model
+    from hospitals.models import Inventory
+    from rest_framework.test import APIClient
+
+    user, _ = get_user_model().objects.get_or_create(
+        username='benchmark-user', defaults={'email': 'benchmark@example.com', 'role': 'HEALTH_AUTHORITY'}
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    inventory = Inventory.objects.order_by('id').first()
+    rows = Inventory.objects.count()
+    single = dict(synthetic_inventories(1)[0], hospital_id=inventory.hospital_id, medicine_id=inventory.medicine_id)
+    batch = {'inventories': synthetic_inventories(100)}
+
+    def call(method, url, data=None):
+        # secure=True so SECURE_SSL_REDIRECT (DEBUG=False) doesn't turn every call into a redirect
+        response = getattr(client, method)(url, data, format='json', secure=True)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+
+    results = {}
+    cases = [
+        ('view.predict', lambda: call('post', '/api/predictions/predict/', single), 1),
+        ('view.batch_predict[100]', lambda: call('post', '/api/predictions/batch-predict/', batch), 100),
+        (f'view.network_score[{rows}]', lambda: call('get', '/api/predictions/network-score/'), rows),
+    ]
+    for name, fn, size in cases:
+        results[name] = measure(fn, repeat, size)
+        log(f"   {name}: {results[name]['median_ms']:.3f} ms median ({results[name]['runs']} runs)")
+    return results
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, overrides=None):
+    """
+    Compare median timings with a baseline run. Returns one row per benchmark
+    present in both: (name, baseline_ms, current_ms, ratio, regressed), where
+    regressed means slower than (1 + threshold) x baseline. `overrides` maps
+    benchmark names to their own threshold.
+    """
+    overrides = overrides or {}
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None or not before['median_ms']:
+            continue
+        ratio = result['median_ms'] / before['median_ms']
+        limit = 1 + overrides.get(name, threshold)
+        rows.append((name, before['median_ms'], result['median_ms'], ratio, ratio > limit))
+    return rows
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,82 @@
+# Drug/backend/predictions/bundle.py
+import hashlib
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# File layout:
+#   MAGIC | uint32 header length | JSON header | padding | array payload
+# The header lists every array's dtype, shape and offset into the payload, plus
+# free-form metadata and the sha256 of the payload. Arrays are uncompressed and
+# ALIGNMENT-aligned so they can be used in place from a read-only memory map.
+MAGIC = b'DSBUNDL1'
+ALIGNMENT = 64
+_LENGTH = struct.Struct('<I')
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def write_bundle(path, arrays, metadata=None):
+    """Write {name: ndarray} and JSON-serializable metadata to `path`"""
+    entries, blobs, offset = {}, [], 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise ValueError(f"Bundle arrays must not hold Python objects: {name}")
+        data = array.tobytes()
+        entries[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': len(data),
+        }
+        blobs.append(data + b'\0' * _padding(len(data)))
+        offset += len(blobs[-1])
+
+    payload = b''.join(blobs)
+    header = json.dumps({
+        'format': 1,
+        'arrays': entries,
+        'metadata': metadata or {},
+        'payload_sha256': hashlib.sha256(payload).hexdigest(),
+    }).encode()
+    prefix = MAGIC + _LENGTH.pack(len(header)) + header
+
+    with open(path, 'wb') as f:
+        f.write(prefix + b'\0' * _padding(len(prefix)))
+        f.write(payload)
+
+
+def read_bundle(path, verify=True):
+    """
+    Memory-map a bundle and return ({name: read-only ndarray}, metadata).
+    The arrays are views of the shared page cache, not private copies.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a model bundle")
+    (header_length,) = _LENGTH.unpack_from(buffer, len(MAGIC))
+    header_start = len(MAGIC) + _LENGTH.size
+    header = json.loads(buffer[header_start:header_start + header_length])
+    payload_start = header_start + header_length
+    payload_start += _padding(payload_start)
+
+    if verify:
+        digest = hashlib.sha256(memoryview(buffer)[payload_start:]).hexdigest()
+        if digest != header['payload_sha256']:
+            raise ValueError(f"Checksum mismatch in {path}")
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        count = entry['nbytes'] // dtype.itemsize if dtype.itemsize else 0
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=payload_start + entry['offset']
+        ).reshape(entry['shape'])
+    return arrays, header['metadata']
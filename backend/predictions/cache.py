@@ -0,0 +1,230 @@
+# Drug/backend/predictions/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU with a per-entry TTL and a hard size bound.
+    With max_bytes, entries are also weighed by `sizeof` and the oldest are
+    evicted until the total fits; an entry larger than max_bytes is not kept.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, max_bytes=None, sizeof=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value, size = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.nbytes -= size
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        size = self.sizeof(value) if self.max_bytes is not None and self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[2]
+            self._data[key] = (time.monotonic() + self.ttl, value, size)
+            self.nbytes += size
+            while len(self._data) > self.max_size or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self.nbytes -= self._data.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+
+class RedisTier:
+    """
+    Lazily connected Redis client shared by the prediction caches.
+    Connection or command errors put it to sleep for RETRY_SECONDS so an
+    outage costs cache misses, not request latency.
+    """
+
+    RETRY_SECONDS = 30
+
+    def __init__(self, url):
+        self.url = url
+        self.errors = 0
+        self._client = None
+        self._retry_at = 0.0
+
+    def client(self):
+        if not self.url or time.monotonic() < self._retry_at:
+            return None
+        if self._client is None:
+            try:
+                import redis
+                self._client = redis.Redis.from_url(
+                    self.url, socket_timeout=0.05, socket_connect_timeout=0.05
+                )
+            except Exception as e:
+                print(f"❌ Prediction cache: Redis unavailable ({e})")
+                self.failed()
+        return self._client
+
+    def failed(self):
+        self.errors += 1
+        self._retry_at = time.monotonic() + self.RETRY_SECONDS
+
+
+def encode_value(value):
+    """Redis form of a cached probability, or a comma-joined vector of them"""
+    return ','.join(repr(float(v)) for v in np.atleast_1d(value))
+
+
+def decode_value(raw):
+    """Inverse of encode_value: a float32 scalar, or a float32 array for vectors"""
+    parts = raw.split(b',') if isinstance(raw, bytes) else str(raw).split(',')
+    if len(parts) == 1:
+        return np.float32(float(parts[0]))
+    return np.array([float(part) for part in parts], dtype=np.float32)
+
+
+class PredictionCache:
+    """
+    Two-tier cache of shortage probabilities (one per horizon for
+    multi-horizon models).
+
+    Keys combine the model version with a hash of the scaled float32 feature
+    row, so identical inputs share an entry and a model swap never serves stale
+    scores. Tier one is a per-process LRU; tier two is an optional Redis shared
+    by every gunicorn worker. Redis failures only cost a cache miss.
+
+    Only calls of up to max_rows rows use the cache: bulk scoring would pay
+    for hashing every row and only evict its own entries.
+    """
+
+    KEY_PREFIX = 'shortage-pred'
+
+    def __init__(self, max_size=10000, ttl=300, redis_url='', max_rows=64):
+        self.local = LRUCache(max_size, ttl)
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.redis = RedisTier(redis_url)
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_size=getattr(settings, 'PREDICTION_CACHE_SIZE', 10000),
+            ttl=getattr(settings, 'PREDICTION_CACHE_TTL', 300),
+            redis_url=getattr(settings, 'PREDICTION_CACHE_REDIS_URL', ''),
+            max_rows=getattr(settings, 'PREDICTION_CACHE_MAX_ROWS', 64),
+        )
+
+    @property
+    def enabled(self):
+        return self.local.max_size > 0 or bool(self.redis.url)
+
+    def key(self, version, row):
+        """Canonical key for one scaled feature row (float32, so equal inputs hash equal)"""
+        digest = hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float32).tobytes(), digest_size=16)
+        return f"{self.KEY_PREFIX}:{version}:{digest.hexdigest()}"
+
+    def keys(self, version, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return [self.key(version, row) for row in X]
+
+    def get_many(self, keys):
+        """Cached probabilities for `keys` (None where missing)"""
+        if not self.enabled:
+            self.misses += len(keys)
+            return [None] * len(keys)
+
+        values = [self.local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self.local_hits += len(keys) - len(missing)
+
+        client = self.redis.client() if missing else None
+        if client is not None:
+            try:
+                remote = client.mget([keys[i] for i in missing])
+            except Exception:
+                self.redis.failed()
+                remote = [None] * len(missing)
+            for i, raw in zip(missing, remote):
+                if raw is not None:
+                    values[i] = decode_value(raw)
+                    self.local.set(keys[i], values[i])
+                    self.redis_hits += 1
+
+        self.misses += sum(1 for value in values if value is None)
+        return values
+
+    def set_many(self, items):
+        """Store {key: probability} in both tiers"""
+        if not self.enabled or not items:
+            return
+        for key, value in items.items():
+            self.local.set(key, np.float32(value))
+
+        client = self.redis.client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.set(key, encode_value(value), ex=int(self.ttl))
+                pipe.execute()
+            except Exception:
+                self.redis.failed()
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'redis_enabled': bool(self.redis.url),
+            'size': len(self.local),
+            'max_size': self.local.max_size,
+            'max_rows': self.max_rows,
+            'ttl_seconds': self.ttl,
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'hit_rate': (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            'evictions': self.local.evictions,
+            'expirations': self.local.expirations,
+            'redis_errors': self.redis.errors,
+        }
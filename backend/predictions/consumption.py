@@ -0,0 +1,212 @@
+# Drug/backend/predictions/consumption.py
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 5000
+# Days of CONSUMPTION ledger history each series is fitted on (13 weeks)
+DEFAULT_HISTORY_DAYS = 91
+# Weekly seasonality: hospital usage follows the working week
+SEASON_LENGTH = 7
+HORIZONS = (7, 14, 30)
+# Smoothing weights for the level and the day-of-week profile
+DEFAULT_ALPHA = 0.3
+DEFAULT_GAMMA = 0.1
+# Raw-input columns holding the forecast total for each horizon
+FORECAST_COLUMNS = [f'forecast_{horizon}d' for horizon in HORIZONS]
+
+
+class ConsumptionSeries:
+    """
+    Daily consumption for many inventories as one (series, days) matrix.
+    Column t is the day `start + t`; every series shares the calendar, so
+    the day-of-week of a column is the same for all rows.
+    """
+
+    def __init__(self, inventory_ids, values, start):
+        self.inventory_ids = inventory_ids  # (series,) int64
+        self.values = values  # (series, days) float64 units consumed
+        self.start = start  # date of column 0
+
+    def __len__(self):
+        return len(self.inventory_ids)
+
+    @property
+    def days(self):
+        return self.values.shape[1]
+
+    def weekdays(self, offset=0, count=None):
+        """Day of week (Monday=0) of `count` columns starting at column `offset`"""
+        count = self.days if count is None else count
+        return (self.start.weekday() + offset + np.arange(count)) % SEASON_LENGTH
+
+
+def consumption_series(queryset=None, days=DEFAULT_HISTORY_DAYS, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Daily CONSUMPTION totals for the `days` whole days before `end` (a date;
+    default today, UTC), from one grouped query over InventoryTransaction.
+    `queryset` limits the inventories (default: all of them). Only
+    inventories with consumption in the window get a series.
+    """
+    from django.db.models import Sum
+    from django.db.models.functions import TruncDate
+    from hospitals.models import InventoryTransaction
+
+    end = end or datetime.now(timezone.utc).date()
+    start = end - timedelta(days=days)
+    transactions = InventoryTransaction.objects.filter(
+        transaction_type=InventoryTransaction.TransactionType.CONSUMPTION,
+        transaction_date__gte=datetime.combine(start, datetime.min.time(), timezone.utc),
+        transaction_date__lt=datetime.combine(end, datetime.min.time(), timezone.utc),
+    )
+    if queryset is not None:
+        transactions = transactions.filter(inventory__in=queryset.values('id'))
+
+    rows = (
+        transactions.annotate(day=TruncDate('transaction_date', tzinfo=timezone.utc))
+        .values('inventory_id', 'day')
+        .annotate(total=Sum('quantity'))
+        .order_by()
+        .values_list('inventory_id', 'day', 'total')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    inventory_ids, offsets, totals = [], [], []
+    origin = start.toordinal()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ids, dates, quantities = zip(*chunk)
+        inventory_ids.append(np.fromiter(ids, dtype=np.int64, count=len(chunk)))
+        offsets.append(np.fromiter((d.toordinal() - origin for d in dates), dtype=np.int64, count=len(chunk)))
+        totals.append(np.fromiter(quantities, dtype=np.float64, count=len(chunk)))
+
+    if not inventory_ids:
+        return ConsumptionSeries(np.empty(0, dtype=np.int64), np.zeros((0, days)), start)
+
+    inventory_ids = np.concatenate(inventory_ids)
+    series_ids, rows_of = np.unique(inventory_ids, return_inverse=True)
+    values = np.zeros((len(series_ids), days))
+    # Consumption is recorded as negative stock movements
+    np.add.at(values, (rows_of, np.concatenate(offsets)), np.abs(np.concatenate(totals)))
+    return ConsumptionSeries(series_ids, values, start)
+
+
+def forecast_consumption(series, horizons=HORIZONS, alpha=DEFAULT_ALPHA, gamma=DEFAULT_GAMMA):
+    """
+    Exponential smoothing with an additive day-of-week profile (Holt-Winters
+    without a trend), fitted to every series at once: each step updates the
+    level and seasonal arrays for all series with a handful of array ops.
+
+    Each series starts on its first day of recorded consumption, from the mean
+    and weekday profile of its history. Returns ({horizon: (series,) expected
+    units consumed over the next `horizon` days}, (series,) smoothed level,
+    (series,) RMS of the one-step-ahead errors, i.e. the daily demand spread).
+    """
+    values = series.values
+    count, days = values.shape
+    first = np.argmax(values > 0, axis=1)
+    active = np.arange(days) >= first[:, None]
+    active_days = np.maximum(active.sum(axis=1), 1)
+    weekdays = series.weekdays()
+
+    level = (values * active).sum(axis=1) / active_days
+    seasonal = np.zeros((count, SEASON_LENGTH))
+    for weekday in range(SEASON_LENGTH):
+        columns = weekdays == weekday
+        seen = active[:, columns].sum(axis=1)
+        total = (values[:, columns] * active[:, columns]).sum(axis=1)
+        seasonal[:, weekday] = np.where(seen > 0, total / np.maximum(seen, 1) - level, 0.0)
+
+    squared_error = np.zeros(count)
+    for t in range(days):
+        weekday = weekdays[t]
+        observed = values[:, t]
+        current = seasonal[:, weekday]
+        updated = alpha * (observed - current) + (1 - alpha) * level
+        on = active[:, t]
+        squared_error += np.where(on, (observed - level - current) ** 2, 0.0)
+        seasonal[:, weekday] = np.where(on, gamma * (observed - updated) + (1 - gamma) * current, current)
+        level = np.where(on, updated, level)
+
+    longest = max(horizons)
+    daily = np.maximum(level[:, None] + seasonal[:, series.weekdays(days, longest)], 0.0)
+    cumulative = np.cumsum(daily, axis=1)
+    residual_std = np.sqrt(squared_error / active_days)
+    return {horizon: cumulative[:, horizon - 1] for horizon in horizons}, level, residual_std
+
+
+def forecast_daily_consumption(forecast_7d, fallback):
+    """Daily demand from the 7-day forecast where there is one, else `fallback`"""
+    forecast_7d = np.asarray(forecast_7d, dtype=np.float64)
+    return np.where(np.isnan(forecast_7d), fallback, forecast_7d / 7)
+
+
+def projected_days_of_supply(stock, forecast_7d, forecast_14d, forecast_30d):
+    """
+    Days until cumulative forecast demand reaches `stock`, interpolating
+    linearly between the 7, 14 and 30 day totals and continuing at the
+    30-day average rate after that. NaN where there is no forecast.
+    """
+    stock = np.asarray(stock, dtype=np.float64)
+    f7, f14, f30 = (np.asarray(f, dtype=np.float64) for f in (forecast_7d, forecast_14d, forecast_30d))
+
+    def segment(start_day, length, before, after):
+        return start_day + length * (stock - before) / np.maximum(after - before, 1e-9)
+
+    with np.errstate(invalid='ignore'):
+        projected = np.select(
+            [stock <= f7, stock <= f14, stock <= f30],
+            [segment(0, 7, 0, f7), segment(7, 7, f7, f14), segment(14, 16, f14, f30)],
+            # Same 0.01 guard as create_features' days_of_supply
+            30 + (stock - f30) / (f30 / 30 + 0.01),
+        )
+    return np.where(np.isnan(f7), np.nan, projected)
+
+
+def refresh_forecasts(queryset=None, days=DEFAULT_HISTORY_DAYS, end=None, alpha=DEFAULT_ALPHA,
+                      gamma=DEFAULT_GAMMA, batch_size=2000, log=print):
+    """
+    Fit every series and upsert one ConsumptionForecast per inventory.
+    Forecasts in scope that were not refreshed (no consumption in the window
+    any more) are deleted. Returns the number of forecasts written.
+    """
+    from django.utils import timezone as django_timezone
+    from .models import ConsumptionForecast
+
+    started = time.perf_counter()
+    series = consumption_series(queryset, days, end)
+    loaded = time.perf_counter()
+    forecasts, level, residual_std = forecast_consumption(series, alpha=alpha, gamma=gamma)
+    fitted = time.perf_counter()
+
+    generated_at = django_timezone.now()
+    history = (series.values > 0).sum(axis=1)
+    objects = [
+        ConsumptionForecast(
+            inventory_id=int(inventory_id), level=float(level[i]), residual_std=float(residual_std[i]),
+            history_days=int(history[i]), generated_at=generated_at,
+            **{column: float(forecasts[horizon][i]) for column, horizon in zip(FORECAST_COLUMNS, HORIZONS)},
+        )
+        for i, inventory_id in enumerate(series.inventory_ids)
+    ]
+    update_fields = FORECAST_COLUMNS + ['level', 'residual_std', 'history_days', 'generated_at']
+    for offset in range(0, len(objects), batch_size):
+        ConsumptionForecast.objects.bulk_create(
+            objects[offset:offset + batch_size],
+            update_conflicts=True, unique_fields=['inventory'], update_fields=update_fields,
+        )
+
+    stale = ConsumptionForecast.objects.filter(generated_at__lt=generated_at)
+    if queryset is not None:
+        stale = stale.filter(inventory__in=queryset.values('id'))
+    stale.delete()
+
+    log(
+        f"📈 Forecast {len(series)} series over {series.days} days: "
+        f"load {loaded - started:.2f}s, fit {fitted - loaded:.2f}s, write {time.perf_counter() - fitted:.2f}s"
+    )
+    return len(objects)
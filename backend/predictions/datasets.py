@@ -0,0 +1,320 @@
+# Drug/backend/predictions/datasets.py
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+import numpy as np
+
+from .bundle import read_bundle, write_bundle
+
+DEFAULT_CHUNK_SIZE = 5000
+# Bump when feature engineering changes so older snapshots stop matching
+DATASET_FORMAT = 5
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_NAT = np.iinfo(np.int64).min
+
+# Synthetic training data: value pools for the categorical columns
+SYNTHETIC_MEDICINES = ['Paracetamol', 'Amoxicillin', 'Insulin', 'Oxygen']
+# Standard categories matching seeded data (Title Case will be applied nicely)
+SYNTHETIC_CATEGORIES = ['Antibiotic', 'Analgesic', 'Antiviral', 'Cardiovascular', 'Diabetes', 'Respiratory', 'Gastrointestinal']
+SYNTHETIC_HOSPITAL_TYPES = ['Government', 'Private', 'Charitable', 'Medical College']
+SYNTHETIC_BED_COUNTS = [50, 100, 200, 500, 1000]
+SYNTHETIC_CHUNK_SIZE = 500000
+
+# (column, Inventory field, dtype) streamed for training. Column names match the
+# raw-input format create_features expects; last_updated is read as microseconds
+# since the epoch (NaT for NULL) and viewed as datetime64 at the end.
+INVENTORY_COLUMNS = [
+    ('inventory_id', 'id', np.int64),
+    ('hospital_id', 'hospital_id', np.int64),
+    ('medicine_id', 'medicine_id', np.int64),
+    ('current_stock', 'current_stock', np.float64),
+    ('daily_consumption', 'average_daily_usage', np.float64),
+    ('reorder_level', 'reorder_level', np.float64),
+    ('last_updated', 'last_updated', np.int64),
+    ('drug_category', 'medicine__category', object),
+    ('hospital_type', 'hospital__hospital_type', object),
+    ('hospital_bed_count', 'hospital__bed_capacity', np.float64),
+    ('forecast_7d', 'consumption_forecast__forecast_7d', np.float64),
+    ('forecast_14d', 'consumption_forecast__forecast_14d', np.float64),
+    ('forecast_30d', 'consumption_forecast__forecast_30d', np.float64),
+]
+
+
+def target_column(horizon):
+    return f'shortage_next_{horizon}d'
+
+
+def add_shortage_target(df, horizons=(7,)):
+    """
+    Label rows: will there be a shortage in the next N days (one column per horizon)?
+    Shortage = stock < (daily_consumption * N * 1.2) with 20% buffer,
+    using the ledger's N-day consumption forecast instead where there is one
+    """
+    for horizon in horizons:
+        column = target_column(horizon)
+        df[column] = 0
+        required_stock = df['daily_consumption'] * horizon * 1.2
+        if f'forecast_{horizon}d' in df.columns:
+            required_stock = (df[f'forecast_{horizon}d'] * 1.2).fillna(required_stock)
+        df.loc[df['current_stock'] < required_stock, column] = 1
+    return df
+
+
+def _categorical(codes, labels):
+    import pandas as pd
+
+    return pd.Categorical.from_codes(codes, categories=labels)
+
+
+def synthetic_training_frame(count, seed=42, end=None, rng=None):
+    """
+    Labelled synthetic inventory records, one Generator call per column.
+    Dates are spread over the year before `end` (a date; default today, UTC)
+    and built as datetime64; text columns are pandas categoricals.
+    Pass `rng` to continue an existing stream (chunked generation).
+    """
+    import pandas as pd
+
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    end = np.datetime64(end or datetime.now(timezone.utc).date(), 'us')
+
+    medicines = rng.integers(1, 50, count)
+    hospitals = rng.integers(1, 20, count)
+    categories = rng.integers(0, len(SYNTHETIC_CATEGORIES), count)
+    daily_consumption = rng.integers(1, 50, count).astype(np.float64)
+    # Monsoon increases antibiotic consumption
+    daily_consumption[categories == SYNTHETIC_CATEGORIES.index('Antibiotic')] *= 1.5
+
+    df = pd.DataFrame({
+        'medicine_id': _categorical(medicines - 1, [f'MED{i:03d}' for i in range(1, 50)]),
+        'medicine_name': _categorical(
+            rng.integers(0, len(SYNTHETIC_MEDICINES), count), [f'Medicine_{name}' for name in SYNTHETIC_MEDICINES]
+        ),
+        'drug_category': _categorical(categories, SYNTHETIC_CATEGORIES),
+        'hospital_id': _categorical(hospitals - 1, [f'HOSP{i:03d}' for i in range(1, 20)]),
+        'hospital_name': _categorical(hospitals - 1, [f'Hospital_{i}' for i in range(1, 20)]),
+        'hospital_type': _categorical(rng.integers(0, len(SYNTHETIC_HOSPITAL_TYPES), count), SYNTHETIC_HOSPITAL_TYPES),
+        'hospital_bed_count': rng.choice(SYNTHETIC_BED_COUNTS, count),
+        'current_stock': rng.integers(0, 500, count),
+        'daily_consumption': daily_consumption,
+        'reorder_level': rng.integers(20, 100, count),
+        'lead_time': rng.integers(3, 14, count),
+        'last_updated': pd.to_datetime(end - rng.integers(0, 365, count).astype('timedelta64[D]'), utc=True),
+    })
+    return add_shortage_target(df)
+
+
+def iter_synthetic_frames(count, chunk_size=SYNTHETIC_CHUNK_SIZE, seed=42, end=None):
+    """
+    synthetic_training_frame in chunks of at most chunk_size rows, drawn from
+    one stream: the same seed and chunk size always give the same rows
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now(timezone.utc).date()
+    for start in range(0, count, chunk_size):
+        yield synthetic_training_frame(min(chunk_size, count - start), end=end, rng=rng)
+
+
+def write_synthetic_parquet(path, count, chunk_size=SYNTHETIC_CHUNK_SIZE, seed=42, end=None):
+    """
+    Write `count` synthetic rows to one Parquet file, a row group per chunk,
+    so memory use is bounded by chunk_size whatever the total. Needs pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for df in iter_synthetic_frames(count, chunk_size, seed, end):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def read_inventory_columns(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a queryset into one preallocated array per column and return them
+    as a raw-input frame. Rows arrive as values_list tuples in chunks, so no
+    model instance or per-row dict is ever built.
+    """
+    import pandas as pd
+
+    capacity = queryset.count()
+    arrays = [np.empty(capacity, dtype=dtype) for _, _, dtype in INVENTORY_COLUMNS]
+    timestamps = [column for column, _, _ in INVENTORY_COLUMNS].index('last_updated')
+
+    rows = queryset.values_list(*(field for _, field, _ in INVENTORY_COLUMNS)).iterator(chunk_size=chunk_size)
+    filled = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        end = filled + len(chunk)
+        if end > capacity:
+            # Rows inserted after count(): grow instead of failing
+            capacity = max(end, capacity * 2)
+            arrays = [np.resize(array, capacity) for array in arrays]
+        for index, values in enumerate(zip(*chunk)):
+            if index == timestamps:
+                values = [(value - _EPOCH) // _MICROSECOND if value else _NAT for value in values]
+            arrays[index][filled:end] = values
+        filled = end
+
+    df = pd.DataFrame({
+        column: array[:filled] for (column, _, _), array in zip(INVENTORY_COLUMNS, arrays)
+    })
+    # Same defaults as server-side scoring (scoring.inventory_frame)
+    df['current_stock'] = df['current_stock'].fillna(0)
+    df['daily_consumption'] = df['daily_consumption'].fillna(0)
+    df['reorder_level'] = df['reorder_level'].fillna(0).replace(0, 50)
+    df['hospital_bed_count'] = df['hospital_bed_count'].fillna(0).replace(0, 100)
+    df['last_updated'] = pd.to_datetime(df['last_updated'].to_numpy().view('datetime64[us]'), utc=True)
+    return df
+
+
+class TrainingMatrix:
+    """
+    Engineered features and labels ready for fitting, plus the label encoder
+    classes create_features fitted while building them and each row's
+    last_updated (for time-ordered splits). y has one column per horizon.
+    """
+
+    def __init__(self, X, y, feature_columns, encoder_classes, timestamps=None, path=None, horizons=(7,)):
+        self.X = X  # (rows, features) float64
+        self.y = y.reshape(len(y), -1)  # (rows, horizons) int8
+        self.horizons = list(horizons)
+        self.feature_columns = list(feature_columns)
+        self.encoder_classes = encoder_classes  # {name: array of class labels}
+        self.timestamps = timestamps  # (rows,) int64 microseconds since the epoch
+        self.path = path  # Snapshot file backing the arrays, if any
+
+    def __len__(self):
+        return len(self.y)
+
+    @classmethod
+    def from_frame(cls, df, feature_columns, label_encoders, horizons=(7,)):
+        import pandas as pd
+
+        timestamps = pd.to_datetime(df['last_updated'], utc=True).dt.tz_convert(None)
+        return cls(
+            df[feature_columns].to_numpy(dtype=np.float64),
+            df[[target_column(horizon) for horizon in horizons]].to_numpy(dtype=np.int8),
+            feature_columns,
+            {name: np.asarray(le.classes_) for name, le in label_encoders.items()},
+            timestamps.to_numpy(dtype='datetime64[us]').view(np.int64),
+            horizons=horizons,
+        )
+
+    @property
+    def labels(self):
+        """Labels in the shape XGBClassifier expects: 1-D for one horizon"""
+        return self.y[:, 0] if len(self.horizons) == 1 else self.y
+
+    def time_order(self):
+        """Row indices from oldest to newest (stable for equal timestamps)"""
+        if self.timestamps is None:
+            return np.arange(len(self))
+        return np.argsort(self.timestamps, kind='stable')
+
+    def label_encoders(self):
+        from sklearn.preprocessing import LabelEncoder
+
+        encoders = {}
+        for name, classes in self.encoder_classes.items():
+            encoders[name] = LabelEncoder()
+            encoders[name].classes_ = np.asarray(classes).astype(object)
+        return encoders
+
+
+class FeatureSnapshotStore:
+    """
+    Training matrices on disk as artifact bundles, keyed by the data they
+    were built from (the training data watermark plus build parameters).
+    Repeated training, tuning and evaluation runs on an unchanged database
+    memory-map the snapshot instead of querying and re-engineering features.
+    """
+
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep
+
+    @staticmethod
+    def key(watermark, **params):
+        payload = json.dumps({'format': DATASET_FORMAT, 'watermark': watermark, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def path(self, key):
+        return os.path.join(self.directory, f'features-{key}.bundle')
+
+    def load(self, key):
+        """The snapshot stored under `key`, or None (missing or unreadable)"""
+        try:
+            return load_matrix(self.path(key))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable feature snapshot {key}: {e}")
+            return None
+
+    def save(self, key, matrix):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.features-', dir=self.directory)
+        os.close(fd)
+        try:
+            save_matrix(tmp_path, matrix)
+            os.replace(tmp_path, self.path(key))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        matrix.path = self.path(key)
+        self.prune()
+
+    def prune(self):
+        """Keep only the `keep` most recently written snapshots"""
+        snapshots = sorted(
+            (entry for entry in os.scandir(self.directory)
+             if entry.name.startswith('features-') and entry.name.endswith('.bundle')),
+            key=lambda entry: entry.stat().st_mtime_ns,
+            reverse=True,
+        )
+        for entry in snapshots[self.keep:]:
+            os.unlink(entry.path)
+
+
+def save_matrix(path, matrix):
+    arrays = {'X': matrix.X, 'y': matrix.y}
+    if matrix.timestamps is not None:
+        arrays['timestamps'] = matrix.timestamps
+    for name, classes in matrix.encoder_classes.items():
+        arrays[f'encoder.{name}'] = np.asarray(classes, dtype=str)
+    metadata = {
+        'feature_columns': matrix.feature_columns,
+        'encoders': list(matrix.encoder_classes),
+        'horizons': matrix.horizons,
+    }
+    write_bundle(path, arrays, metadata)
+
+
+def load_matrix(path, verify=True):
+    """A TrainingMatrix whose arrays are read-only views of the memory-mapped file"""
+    arrays, metadata = read_bundle(path, verify=verify)
+    return TrainingMatrix(
+        arrays['X'],
+        arrays['y'],
+        metadata['feature_columns'],
+        {name: arrays[f'encoder.{name}'] for name in metadata['encoders']},
+        arrays.get('timestamps'),
+        path=path,
+        horizons=metadata['horizons'],
+    )
@@ -1,20 +1,218 @@
 # Drug/backend/predictions/forecaster.py
-import pandas as pd
 import numpy as np
-import joblib
 import os
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
 from django.conf import settings
-
-# ML Libraries
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import xgboost as xgb
 import warnings
+
+# pandas, scikit-learn, xgboost and joblib are imported inside the methods that
+# need them: together they take seconds to import, and every process that loads
+# the predictions URLConf (migrate, admin, inventory-only workers) imports this
+# module without ever scoring or training.
+
+from .batching import MicroBatcher
+from .bundle import read_bundle, write_bundle
+from .cache import PredictionCache
+from .consumption import forecast_daily_consumption, projected_days_of_supply
+from .datasets import FeatureSnapshotStore, TrainingMatrix, add_shortage_target, synthetic_training_frame, target_column
+from .metrics import pipeline_metrics
+from .pipeline import CompiledFeaturePipeline
+from .registry import ModelRegistry
+from .trees import TreeEnsemble
 warnings.filterwarnings('ignore')
 
+# Risk bands: a probability below RISK_THRESHOLDS[i] falls into RISK_LEVELS[i]
+RISK_THRESHOLDS = [0.3, 0.6, 0.8]
+RISK_LEVELS = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
+RECOMMENDATIONS = [
+    "Normal monitoring",
+    "Consider restocking",
+    "Urgent restock needed",
+    "EMERGENCY - Redistribute stock",
+]
+
+# Shortage horizon (days) of models trained before multi-horizon scoring
+DEFAULT_HORIZONS = [7]
+
+# Raw inputs every inventory item must carry to be scored
+REQUIRED_INPUTS = ['current_stock', 'daily_consumption', 'reorder_level']
+
+# Version name for artifacts saved before the registry existed
+LEGACY_VERSION = 'legacy'
+
+# Artifacts that make up one model version: the booster in XGBoost's native
+# format, everything else as flat arrays in one memory-mappable bundle
+MODEL_FILE = 'shortage_model.ubj'
+BUNDLE_FILE = 'artifacts.bundle'
+
+# Pickled artifacts of versions saved before the bundle format
+ARTIFACT_FILES = {
+    'model': 'shortage_model.pkl',
+    'scaler': 'scaler.pkl',
+    'label_encoders': 'label_encoders.pkl',
+    'feature_columns': 'feature_columns.pkl',
+}
+# NumPy evaluator arrays saved alongside those pickles
+ENSEMBLE_FILE = 'tree_ensemble.npz'
+
+# Cached training matrices (see datasets.FeatureSnapshotStore), under model_path
+DATASET_DIR = 'datasets'
+SYNTHETIC_SAMPLES = 1000
+
+# Booster hyperparameters shared by full training and incremental updates
+BOOSTER_PARAMS = {
+    'max_depth': 6,
+    'learning_rate': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'random_state': 42,
+    'eval_metric': 'logloss',
+}
+FULL_TRAINING_ROUNDS = 200
+# Progress steps reported by train_model and by incremental updates
+FULL_TRAINING_STEPS = 7
+INCREMENTAL_STEPS = 6
+
+# Model features, in training order (bed_count_scaled is appended when known)
+FEATURE_COLUMNS = [
+    'current_stock', 'daily_consumption', 'reorder_level',
+    'stock_consumption_ratio', 'days_of_supply', 'below_reorder_level',
+    'month', 'day_of_week', 'is_monsoon', 'is_flu_season',
+    'drug_category_encoded', 'hospital_type_encoded'
+]
+# Features checked for drift before an incremental update. Changed records are
+# recent by definition and usually come from a few busy hospitals, so calendar
+# and hospital features would always look shifted; stock and usage should not.
+DRIFT_FEATURES = [
+    'current_stock', 'daily_consumption', 'reorder_level',
+    'stock_consumption_ratio', 'days_of_supply', 'below_reorder_level',
+]
+
+
+def risk_indices(probabilities):
+    """Map shortage probabilities to indices into RISK_LEVELS"""
+    return np.searchsorted(RISK_THRESHOLDS, probabilities, side='right')
+
+
+def normalize_labels(values):
+    """
+    Title-cased strings with 'Unknown' for missing values (Antibiotic vs ANTIBIOTIC).
+    Categorical columns are normalized once per category, not once per row.
+    """
+    import pandas as pd
+    
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        labels = np.append(values.cat.categories.astype(str).str.title().to_numpy(dtype=object), 'Unknown')
+        # Missing values have code -1, which picks the trailing 'Unknown'
+        return pd.Series(labels[values.cat.codes.to_numpy()], index=values.index)
+    return values.fillna('Unknown').astype(str).str.title()
+
+
+def prediction_horizons(horizons=None):
+    """Sorted, distinct horizons to train for (default: the ML_PREDICTION_HORIZONS setting)"""
+    horizons = horizons or getattr(settings, 'ML_PREDICTION_HORIZONS', DEFAULT_HORIZONS)
+    horizons = sorted({int(horizon) for horizon in horizons})
+    if not horizons or horizons[0] < 1:
+        raise ValueError("Prediction horizons must be positive numbers of days")
+    return horizons
+
+
+def primary_probabilities(probabilities):
+    """
+    Shortage probabilities for the shortest horizon: the column that drives
+    risk levels and ranking when a model predicts several horizons
+    """
+    probabilities = np.asarray(probabilities)
+    return probabilities[:, 0] if probabilities.ndim == 2 else probabilities
+
+
+def save_booster(model, path):
+    """
+    Write the model's booster in XGBoost's native format. The booster is
+    saved rather than the classifier: the classifier's own save_model needs
+    scikit-learn estimator tags that xgboost 1.7 can't read from sklearn 1.8.
+    """
+    model.get_booster().save_model(path)
+
+
+def load_booster(source):
+    """XGBClassifier around a booster written by save_booster (a path, or the file's bytes)"""
+    import xgboost as xgb
+    
+    model = xgb.XGBClassifier()
+    model.load_model(source)
+    if not hasattr(model, 'classes_'):
+        # xgboost 1.7 only restores these from the classifier's own metadata
+        model.classes_ = np.arange(2)
+        model.n_classes_ = 2
+    return model
+
+
+def compile_ensemble(model):
+    """The model as a TreeEnsemble, or None if it can't be evaluated with NumPy"""
+    try:
+        return TreeEnsemble.from_model(model)
+    except Exception as e:
+        print(f"❌ NumPy tree evaluator unavailable: {e}")
+        return None
+
+
+def top_k_indices(values, k=None):
+    """
+    Indices of the k largest values, highest first. Same order as the first k
+    entries of a stable descending argsort (ties keep input order), but uses
+    np.partition so only the k selected rows are sorted.
+    """
+    values = np.asarray(values)
+    if k is None or k >= len(values):
+        return np.argsort(-values, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    kth = np.partition(values, len(values) - k)[len(values) - k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)[:k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((chosen, -values[chosen]))]
+
+
+class ModelSnapshot:
+    """
+    Fully loaded set of artifacts from one model version.
+    Serving code grabs one snapshot per call, so a hot-swap never mixes versions.
+    """
+    
+    def __init__(self, version, model, scaler, label_encoders, feature_columns, ensemble=None, horizons=None,
+                 model_loader=None):
+        self.version = version
+        self._model = model
+        # Builds the model on first use when it was left unloaded (see _load_bundle)
+        self._model_loader = model_loader
+        self._model_lock = threading.Lock()
+        self.ensemble = ensemble  # TreeEnsemble of the same model, when available
+        self.scaler = scaler
+        self.label_encoders = label_encoders
+        self.feature_columns = feature_columns
+        # Days ahead of each model output; several means one multi-output booster
+        self.horizons = list(horizons or DEFAULT_HORIZONS)
+        self.pipeline = CompiledFeaturePipeline(feature_columns, label_encoders, scaler)
+    
+    @property
+    def model(self):
+        """The XGBoost model, loaded on first access if the snapshot deferred it"""
+        if self._model is None and self._model_loader is not None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._model_loader()
+        return self._model
+    
+    @property
+    def model_loaded(self):
+        return self._model is not None
+
+
 class DrugShortagePredictor:
     """
     ML Model for predicting drug shortages.
@@ -22,44 +220,88 @@ class DrugShortagePredictor:
     """
     
     def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
+        self._model = None  # Model being trained, until it is published (see model)
+        self.scaler = None
         self.label_encoders = {}
         self.feature_columns = []
+        self.pipeline = None  # CompiledFeaturePipeline, built from the fitted artifacts
+        self.horizons = list(DEFAULT_HORIZONS)
+        self.version = None
+        self.snapshot = None  # ModelSnapshot used for serving
         self.model_path = os.path.join(settings.BASE_DIR, '..', 'ml_models')
+        self.cache = PredictionCache.from_settings()
+        # Coalesces concurrent single-item predictions (None when disabled)
+        self.batcher = MicroBatcher.from_settings(self._infer)
+        # Batches up to this many rows skip the xgboost runtime (see trees.py);
+        # bundled versions only load the booster for the first larger batch
+        self.numpy_max_rows = getattr(settings, 'ML_NUMPY_EVALUATOR_MAX_ROWS', 32)
         
-    def create_features(self, df, is_training=True):
+        # Hot-swap bookkeeping: how often to stat the registry pointer
+        self.poll_interval = getattr(settings, 'ML_MODEL_POLL_SECONDS', 5)
+        self._pointer_stamp = None
+        self._last_update_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._reload_thread = None
+    
+    @property
+    def model(self):
+        """The model being trained, else the serving snapshot's"""
+        if self._model is None and self.snapshot is not None:
+            return self.snapshot.model
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    @property
+    def registry(self):
+        return ModelRegistry(self.model_path)
+        
+    def create_features(self, df, is_training=True, snapshot=None):
         """
         Create features from raw data for ML model
+        snapshot: fitted artifacts to encode with at inference (defaults to this predictor's)
         """
+        import pandas as pd
+        from sklearn.preprocessing import LabelEncoder
+        
         # Make a copy to avoid modifying original
         df = df.copy()
+        state = snapshot or self
         
         # 1. TIME-BASED FEATURES
         if 'last_updated' in df.columns:
-            df['date'] = pd.to_datetime(df['last_updated'])
+            df['date'] = pd.to_datetime(df['last_updated'], utc=True)
             df['month'] = df['date'].dt.month
             df['day_of_week'] = df['date'].dt.dayofweek
             df['week_of_year'] = df['date'].dt.isocalendar().week
             
-        # 2. SEASONAL FEATURES (India specific)
         # 2. SEASONAL FEATURES (India specific)
         if 'month' in df.columns:
             # Monsoon season: June-Sept
-            df['is_monsoon'] = df['month'].apply(
-                lambda x: 1 if x in [6, 7, 8, 9] else 0
-            )
+            df['is_monsoon'] = df['month'].isin([6, 7, 8, 9]).astype(int)
             # Winter/Flu season: Oct-Feb
-            df['is_flu_season'] = df['month'].apply(
-                lambda x: 1 if x in [10, 11, 12, 1, 2] else 0
-            )
+            df['is_flu_season'] = df['month'].isin([10, 11, 12, 1, 2]).astype(int)
         else:
             df['is_monsoon'] = 0
             df['is_flu_season'] = 0
         
         # 3. STOCK-RELATED FEATURES
+        # Ledger-based consumption forecasts (consumption.py) replace the
+        # manually maintained average where an inventory has one
+        has_forecast = 'forecast_7d' in df.columns
+        if has_forecast:
+            df['daily_consumption'] = forecast_daily_consumption(
+                df['forecast_7d'], df['daily_consumption'].astype(float)
+            )
         df['stock_consumption_ratio'] = df['current_stock'] / (df['daily_consumption'] + 1)
         df['days_of_supply'] = df['current_stock'] / (df['daily_consumption'] + 0.01)
+        if has_forecast and {'forecast_14d', 'forecast_30d'} <= set(df.columns):
+            projected = projected_days_of_supply(
+                df['current_stock'], df['forecast_7d'], df['forecast_14d'], df['forecast_30d']
+            )
+            df['days_of_supply'] = np.where(np.isnan(projected), df['days_of_supply'], projected)
         df['below_reorder_level'] = (df['current_stock'] < df['reorder_level']).astype(int)
         
         # 4. HOSPITAL-SPECIFIC FEATURES
@@ -69,7 +311,7 @@ class DrugShortagePredictor:
         # 5. DRUG CATEGORY ENCODING
         if 'drug_category' in df.columns:
             # Normalize to title case to handle mismatches (Antibiotic vs ANTIBIOTIC)
-            df['drug_category'] = df['drug_category'].fillna('Unknown').astype(str).str.title()
+            df['drug_category'] = normalize_labels(df['drug_category'])
             
             if is_training:
                 le = LabelEncoder()
@@ -77,36 +319,31 @@ class DrugShortagePredictor:
                 self.label_encoders['drug_category'] = le
             else:
                 # During prediction, use existing encoder
-                le = self.label_encoders.get('drug_category')
+                le = state.label_encoders.get('drug_category')
                 if le:
-                    # Handle unseen categories by assigning a default "Other" or mode
-                    known_classes = set(le.classes_)
-                    df['drug_category'] = df['drug_category'].apply(lambda x: x if x in known_classes else list(known_classes)[0])
+                    # Handle unseen categories by falling back to the first known class
+                    known = df['drug_category'].isin(le.classes_)
+                    df['drug_category'] = df['drug_category'].where(known, le.classes_[0])
                     df['drug_category_encoded'] = le.transform(df['drug_category'])
         
         # 6. HOSPITAL TYPE ENCODING
         if 'hospital_type' in df.columns:
-            df['hospital_type'] = df['hospital_type'].fillna('Unknown').astype(str).str.title()
+            df['hospital_type'] = normalize_labels(df['hospital_type'])
             
             if is_training:
                 le = LabelEncoder()
                 df['hospital_type_encoded'] = le.fit_transform(df['hospital_type'])
                 self.label_encoders['hospital_type'] = le
             else:
-                le = self.label_encoders.get('hospital_type')
+                le = state.label_encoders.get('hospital_type')
                 if le:
-                    known_classes = set(le.classes_)
-                    df['hospital_type'] = df['hospital_type'].apply(lambda x: x if x in known_classes else list(known_classes)[0])
+                    known = df['hospital_type'].isin(le.classes_)
+                    df['hospital_type'] = df['hospital_type'].where(known, le.classes_[0])
                     df['hospital_type_encoded'] = le.transform(df['hospital_type'])
         
         # Define feature columns logic for TRAINING
         if is_training:
-            self.feature_columns = [
-                'current_stock', 'daily_consumption', 'reorder_level',
-                'stock_consumption_ratio', 'days_of_supply', 'below_reorder_level',
-                'month', 'day_of_week', 'is_monsoon', 'is_flu_season',
-                'drug_category_encoded', 'hospital_type_encoded'
-            ]
+            self.feature_columns = list(FEATURE_COLUMNS)
             if 'bed_count_scaled' in df.columns:
                 self.feature_columns.append('bed_count_scaled')
         else:
@@ -116,161 +353,117 @@ class DrugShortagePredictor:
             if 'hospital_bed_count' not in df.columns and 'bed_count_scaled' not in df.columns:
                  df['bed_count_scaled'] = 0.1 # Default 100 beds
             elif 'hospital_bed_count' in df.columns:
-                 df['bed_count_scaled'] = df['hospital_bed_count'] / 1000
+                 df['bed_count_scaled'] = (df['hospital_bed_count'] / 1000).fillna(0.1)
+
+            # Rows of a batch without a date get the same zeros as a lone dateless item
+            for col in ['month', 'day_of_week']:
+                if col in df.columns:
+                    df[col] = df[col].fillna(0)
 
             # 2. Ensure every single feature expected by the model exists
-            for col in self.feature_columns:
+            for col in state.feature_columns:
                 if col not in df.columns:
                     df[col] = 0.0 # Default fallback
         
         return df
     
-    def prepare_training_data(self):
+    def prepare_training_data(self, horizons=DEFAULT_HORIZONS):
         """
         Get data from your database and prepare for training
+        (one shortage label per horizon)
         """
+        import pandas as pd
+        
         try:
-            # Import your models
-            from medicines.models import Medicine
-            from hospitals.models import Hospital, Inventory
-            
-            # Get all inventory records
-            inventories = Inventory.objects.select_related('medicine', 'hospital').all()
+            from .datasets import read_inventory_columns
+            from .scoring import inventory_scope
             
-            data = []
-            for inv in inventories:
-                record = {
-                    'inventory_id': inv.id,
-                    'medicine_id': inv.medicine.id,
-                    'medicine_name': inv.medicine.name,
-                    'drug_category': inv.medicine.category,
-                    'hospital_id': inv.hospital.id,
-                    'hospital_name': inv.hospital.name,
-                    'hospital_type': inv.hospital.hospital_type,
-                    'hospital_bed_count': inv.hospital.bed_capacity or 100,
-                    'current_stock': inv.current_stock or 0,
-                    'daily_consumption': float(inv.average_daily_usage) or 0,
-                    'reorder_level': inv.reorder_level or 50,
-                    'last_updated': inv.last_updated or datetime.now(),
-                    'lead_time': 7,  # Default lead time
-                }
-                data.append(record)
-            
-            df = pd.DataFrame(data)
-            
-            # Ensure last_updated is UTC
-            if not df.empty and 'last_updated' in df.columns:
-                df['last_updated'] = pd.to_datetime(df['last_updated'], utc=True)
+            # Stream every inventory record as typed columns (UTC last_updated)
+            df = read_inventory_columns(inventory_scope())
             
             # ALWAYS combine with synthetic data to ensure robust training
             # This fixes the issue of "not enough data" vs "unseen data"
             print(f"Loaded {len(df)} real records. Adding synthetic data for better training...")
-            synthetic_df = self.generate_synthetic_data(1000)
+            synthetic_df = self.generate_synthetic_data(SYNTHETIC_SAMPLES)
             
             if not df.empty:
                 df = pd.concat([df, synthetic_df], ignore_index=True)
             else:
                 df = synthetic_df
             
-            # Create target variable: Will there be a shortage in next 7 days?
-            # Shortage = stock < (daily_consumption * 7 * 1.2) with 20% buffer
-            df['shortage_next_7d'] = 0
-            required_stock = df['daily_consumption'] * 7 * 1.2
-            df.loc[df['current_stock'] < required_stock, 'shortage_next_7d'] = 1
-            
-            return df
+            return add_shortage_target(df, horizons)
             
         except Exception as e:
             print(f"Error loading data: {e}")
             print("Generating synthetic data instead...")
-            return self.generate_synthetic_data(2000)
+            return add_shortage_target(self.generate_synthetic_data(2000), horizons)
     
-    def generate_synthetic_data(self, num_samples=1000):
+    def generate_synthetic_data(self, num_samples=1000, seed=42):
         """
         Generate synthetic training data for hackathon
+        (vectorized; the same seed gives the same rows on the same day)
         """
-        np.random.seed(42)
-        
-        data = []
-        for i in range(num_samples):
-            record = {
-                'medicine_id': f'MED{np.random.randint(1, 50):03d}',
-                'medicine_name': f'Medicine_{np.random.choice(["Paracetamol", "Amoxicillin", "Insulin", "Oxygen"])}',
-                # Use standard categories matching seeded data (Title Case will be applied nicely)
-                'drug_category': np.random.choice(['Antibiotic', 'Analgesic', 'Antiviral', 'Cardiovascular', 'Diabetes', 'Respiratory', 'Gastrointestinal']),
-                'hospital_id': f'HOSP{np.random.randint(1, 20):03d}',
-                'hospital_name': f'Hospital_{np.random.randint(1, 20)}',
-                'hospital_type': np.random.choice(['Government', 'Private', 'Charitable', 'Medical College']),
-                'hospital_bed_count': np.random.choice([50, 100, 200, 500, 1000]),
-                'current_stock': np.random.randint(0, 500),
-                'daily_consumption': np.random.randint(1, 50),
-                'reorder_level': np.random.randint(20, 100),
-                'lead_time': np.random.randint(3, 14),
-                'last_updated': (datetime.now() - timedelta(days=np.random.randint(0, 365))).isoformat()
-            }
-            data.append(record)
-        
-        df = pd.DataFrame(data)
-        
-        # Ensure 'last_updated' is datetime
-        df['last_updated'] = pd.to_datetime(df['last_updated'], utc=True)
-        
-        # Add realistic patterns
-        # Monsoon increases antibiotic consumption
-        monsoon_mask = df['drug_category'] == 'Antibiotic'
-        df.loc[monsoon_mask, 'daily_consumption'] = df.loc[monsoon_mask, 'daily_consumption'] * 1.5
-        
-        # Rural hospitals have lower stock
-        rural_mask = df['hospital_type'] == 'Rural'
-        df.loc[rural_mask, 'current_stock'] = df.loc[rural_mask, 'current_stock'] * 0.7
-        
-        # Create target variable: Will there be a shortage in next 7 days?
-        # Shortage = stock < (daily_consumption * 7 * 1.2) with 20% buffer
-        df['shortage_next_7d'] = 0
-        required_stock = df['daily_consumption'] * 7 * 1.2
-        df.loc[df['current_stock'] < required_stock, 'shortage_next_7d'] = 1
-        
-        return df
+        return synthetic_training_frame(num_samples, seed=seed)
     
-    def train_model(self):
+    def train_model(self, incremental=False, params=None, tuning=None, progress=None, horizons=None):
         """
         Train the ML model
+        incremental: continue boosting the current version on records changed
+        since it was trained, falling back to full training when that isn't safe
+        params: booster hyperparameters overriding the defaults (see tune_model)
+        tuning: search report to record with the version
+        progress: called as progress(step, total_steps, message) at every step;
+        an exception raised from it aborts the run before anything is published
+        horizons: shortage horizons in days (default ML_PREDICTION_HORIZONS);
+        several train one multi-output booster that scores them all in one pass
         """
-        print("Step 1: Preparing training data...")
-        df = self.prepare_training_data()
+        import pandas as pd
+        import xgboost as xgb
+        from sklearn.metrics import accuracy_score, classification_report
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
         
-        print("Step 2: Creating features...")
-        df = self.create_features(df, is_training=True)
+        horizons = prediction_horizons(horizons)
+        # Read before extracting, so rows changed during this run are picked up next time
+        watermark = self.data_watermark()
+        if incremental:
+            accuracy = self._train_incremental(watermark, progress, horizons)
+            if accuracy is not None:
+                return accuracy
+        
+        # Start from fresh artifacts; the serving snapshot keeps its own
+        self.scaler = StandardScaler()
+        self.label_encoders = {}
+        self.horizons = horizons
         
-        print("Step 3: Splitting data...")
-        # Separate features and target
-        X = df[self.feature_columns]
-        y = df['shortage_next_7d']
+        self._step(progress, 1, FULL_TRAINING_STEPS, "Preparing training data")
+        matrix = self.training_matrix(watermark, progress, horizons)
         
-        # Split data (80% train, 20% test)
+        self._step(progress, 3, FULL_TRAINING_STEPS, "Splitting data")
+        # Separate features and target (one label column per horizon)
+        X = pd.DataFrame(matrix.X, columns=self.feature_columns)
+        y = matrix.labels
+        
+        # Split data (80% train, 20% test), stratified on the shortest horizon
         X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
+            X, y, test_size=0.2, random_state=42, stratify=matrix.y[:, 0]
         )
         
         print(f"Training samples: {len(X_train)}")
         print(f"Test samples: {len(X_test)}")
-        print(f"Shortage rate: {y.mean():.2%}")
+        for horizon, rate in zip(horizons, matrix.y.mean(axis=0)):
+            print(f"Shortage rate ({horizon}d): {rate:.2%}")
         
-        print("Step 4: Scaling features...")
+        self._step(progress, 4, FULL_TRAINING_STEPS, "Scaling features")
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
-        print("Step 5: Training XGBoost model...")
+        self._step(progress, 5, FULL_TRAINING_STEPS, "Training XGBoost model")
         # Train XGBoost (usually best for tabular data)
+        params = {'n_estimators': FULL_TRAINING_ROUNDS, **(params or {})}
         self.model = xgb.XGBClassifier(
-            n_estimators=200,
-            max_depth=6,
-            learning_rate=0.1,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            random_state=42,
-            eval_metric='logloss',
-            use_label_encoder=False
+            use_label_encoder=False,
+            **{**BOOSTER_PARAMS, **params}
         )
         
         self.model.fit(
@@ -280,15 +473,21 @@ class DrugShortagePredictor:
             verbose=False
         )
         
-        print("Step 6: Evaluating model...")
-        y_pred = self.model.predict(X_test_scaled)
-        y_pred_proba = self.model.predict_proba(X_test_scaled)[:, 1]
+        self._step(progress, 6, FULL_TRAINING_STEPS, "Evaluating model")
+        y_pred = self.model.predict(X_test_scaled).reshape(len(X_test_scaled), len(horizons))
+        y_test = np.asarray(y_test).reshape(len(X_test_scaled), len(horizons))
         
-        accuracy = accuracy_score(y_test, y_pred)
+        horizon_accuracy = {
+            f'{horizon}d': float(accuracy_score(y_test[:, i], y_pred[:, i]))
+            for i, horizon in enumerate(horizons)
+        }
+        # The shortest horizon drives risk levels, so it is the headline figure
+        accuracy = horizon_accuracy[f'{horizons[0]}d']
         print(f"\n📊 Model Performance:")
         print(f"   Accuracy: {accuracy:.2%}")
-        print(f"   Classification Report:")
-        print(classification_report(y_test, y_pred))
+        for i, horizon in enumerate(horizons):
+            print(f"   Classification Report ({horizon}d):")
+            print(classification_report(y_test[:, i], y_pred[:, i]))
         
         # Feature importance
         feature_importance = pd.DataFrame({
@@ -300,104 +499,680 @@ class DrugShortagePredictor:
         for idx, row in feature_importance.head().iterrows():
             print(f"   {row['feature']}: {row['importance']:.3f}")
         
-        print("Step 7: Saving model...")
-        self.save_model()
+        self._step(progress, 7, FULL_TRAINING_STEPS, "Saving model")
+        training = {
+            'mode': 'full',
+            'watermark': watermark,
+            'rows': len(matrix),
+            'trees': params['n_estimators'],
+            'params': params,
+            'accuracy': float(accuracy),
+            'horizons': horizons,
+            'horizon_accuracy': horizon_accuracy,
+        }
+        if tuning:
+            training['tuning'] = {
+                key: tuning[key] for key in ('folds', 'wall_seconds', 'best_accuracy', 'tolerance')
+            }
+            training['tuning']['candidates'] = len(tuning['candidates'])
+            training['tuning']['cv_accuracy'] = tuning['selected']['accuracy']
+        self.save_model(training=training)
         
         return accuracy
     
-    def save_model(self):
-        """Save trained model to disk"""
-        os.makedirs(self.model_path, exist_ok=True)
+    def tune_model(self, grid=None, n_iter=None, folds=3, workers=None, tolerance=None, progress=None, horizons=None):
+        """
+        Search booster hyperparameters with time-ordered cross-validation in
+        parallel processes, then train and publish the selected candidate:
+        the cheapest to evaluate whose accuracy is within `tolerance` of the best.
+        Returns (accuracy, search report).
+        """
+        from django.db import connections
+        from .tuning import DEFAULT_TOLERANCE, candidate_params, search
+        
+        horizons = prediction_horizons(horizons)
         
-        joblib.dump(self.model, os.path.join(self.model_path, 'shortage_model.pkl'))
-        joblib.dump(self.scaler, os.path.join(self.model_path, 'scaler.pkl'))
-        joblib.dump(self.label_encoders, os.path.join(self.model_path, 'label_encoders.pkl'))
-        joblib.dump(self.feature_columns, os.path.join(self.model_path, 'feature_columns.pkl'))
+        # Two search steps, then the steps of training the selected candidate
+        def report_step(step, total, message):
+            if progress is not None:
+                progress(step, total + 2, message)
         
-        print(f"✅ Model saved to: {self.model_path}")
+        print("🔍 Preparing the shared training matrix...")
+        report_step(1, FULL_TRAINING_STEPS, "Preparing the shared training matrix")
+        matrix = self.training_matrix(self.data_watermark(), horizons=horizons)
+        candidates = candidate_params(grid, n_iter)
+        print(f"🔍 Evaluating {len(candidates)} candidates on {folds} time-ordered folds...")
+        report_step(2, FULL_TRAINING_STEPS, f"Evaluating {len(candidates)} candidates")
+        
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        report = search(
+            matrix, candidates, folds=folds, workers=workers,
+            tolerance=DEFAULT_TOLERANCE if tolerance is None else tolerance,
+        )
+        selected = report['selected']
+        print(
+            f"✅ Selected {selected['params']} (CV accuracy {selected['accuracy']:.4f}, "
+            f"best {report['best_accuracy']:.4f}) in {report['wall_seconds']:.1f}s"
+        )
+        
+        accuracy = self.train_model(
+            params=selected['params'], tuning=report, horizons=horizons,
+            progress=lambda step, total, message: report_step(step + 2, total, message),
+        )
+        return accuracy, report
     
-    def load_model(self):
-        """Load trained model from disk"""
+    @staticmethod
+    def _step(progress, number, total, message):
+        print(f"Step {number}: {message}...")
+        if progress is not None:
+            progress(number, total, message)
+    
+    def data_watermark(self):
+        """
+        Newest Inventory.last_updated and InventoryTransaction.transaction_date
+        (ISO strings), plus the inventory row count so deletions register too
+        and the time consumption forecasts were last refreshed
+        """
         try:
-            self.model = joblib.load(os.path.join(self.model_path, 'shortage_model.pkl'))
-            self.scaler = joblib.load(os.path.join(self.model_path, 'scaler.pkl'))
-            self.label_encoders = joblib.load(os.path.join(self.model_path, 'label_encoders.pkl'))
-            self.feature_columns = joblib.load(os.path.join(self.model_path, 'feature_columns.pkl'))
+            from django.db.models import Count, Max
+            from hospitals.models import Inventory, InventoryTransaction
+            from .models import ConsumptionForecast
+            
+            inventory = Inventory.objects.aggregate(latest=Max('last_updated'), rows=Count('id'))
+            transaction = InventoryTransaction.objects.aggregate(latest=Max('transaction_date'))['latest']
+            forecasts = ConsumptionForecast.objects.aggregate(latest=Max('generated_at'))['latest']
+        except Exception as e:
+            print(f"⚠️  Could not read the data watermark: {e}")
+            return None
+        return {
+            'inventory_last_updated': inventory['latest'].isoformat() if inventory['latest'] else None,
+            'inventory_rows': inventory['rows'],
+            'transaction_date': transaction.isoformat() if transaction else None,
+            'forecasts_generated_at': forecasts.isoformat() if forecasts else None,
+        }
+    
+    def training_matrix(self, watermark=None, progress=None, horizons=DEFAULT_HORIZONS):
+        """
+        Engineered training features and labels (one column per horizon)
+        for the data at `watermark`.
+        Built once per watermark and cached under model_path/datasets, so
+        repeated training, tuning and evaluation runs skip the database
+        and create_features. Sets label_encoders and feature_columns.
+        """
+        store = FeatureSnapshotStore(os.path.join(self.model_path, DATASET_DIR))
+        key = None
+        if watermark is not None:
+            # Synthetic rows are dated relative to today
+            key = store.key(
+                watermark,
+                synthetic_samples=SYNTHETIC_SAMPLES,
+                synthetic_date=datetime.now().date().isoformat(),
+                feature_columns=FEATURE_COLUMNS,
+                horizons=list(horizons),
+            )
+            matrix = store.load(key)
+            if matrix is not None:
+                print(f"📦 Reusing feature snapshot {key} ({len(matrix)} rows)")
+                self.label_encoders = matrix.label_encoders()
+                self.feature_columns = matrix.feature_columns
+                return matrix
+        
+        df = self.prepare_training_data(horizons)
+        
+        self._step(progress, 2, FULL_TRAINING_STEPS, "Creating features")
+        df = self.create_features(df, is_training=True)
+        matrix = TrainingMatrix.from_frame(df, self.feature_columns, self.label_encoders, horizons)
+        if key is not None:
+            store.save(key, matrix)
+        return matrix
+    
+    def changed_inventory_frame(self, watermark):
+        """
+        Raw-input frame of inventory rows updated, or given new transactions,
+        after `watermark` (every row if nothing had been recorded yet)
+        """
+        from .datasets import read_inventory_columns
+        from .scoring import changed_inventories, inventory_scope
+        
+        return read_inventory_columns(changed_inventories(inventory_scope(), watermark, forecasts=False))
+    
+    def _train_incremental(self, watermark, progress=None, horizons=DEFAULT_HORIZONS):
+        """
+        Add trees to the current version, fitted on the records changed since
+        its watermark (xgb_model= warm start; scaler and encoders are kept).
+        Returns the accuracy, or None when a full retrain is needed instead.
+        """
+        import xgboost as xgb
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+        
+        registry = self.registry
+        version = registry.current_version()
+        training = None
+        if version is not None and version != LEGACY_VERSION:
+            training = registry.read_manifest(version)['metadata'].get('training')
+        if not training or not training.get('watermark') or watermark is None:
+            print("⚠️  No incremental baseline (watermarked model version); running full training")
+            return None
+        
+        self._step(progress, 1, INCREMENTAL_STEPS, "Extracting records changed since the last training run")
+        df = self.changed_inventory_frame(training['watermark'])
+        min_rows = getattr(settings, 'ML_INCREMENTAL_MIN_ROWS', 50)
+        if len(df) < min_rows:
+            # Leave the watermark alone so these rows count towards the next run
+            print(f"✅ {len(df)} changed records (fewer than {min_rows}); keeping model version {version}")
+            return training['accuracy']
+        
+        snapshot = self._load_snapshot(version)
+        if snapshot.horizons != list(horizons):
+            print(f"⚠️  Horizons changed ({snapshot.horizons} -> {list(horizons)}); running full training")
+            return None
+        rounds = getattr(settings, 'ML_INCREMENTAL_ROUNDS', 50)
+        max_trees = getattr(settings, 'ML_INCREMENTAL_MAX_TREES', 500)
+        
+        self._step(progress, 2, INCREMENTAL_STEPS, "Checking schema and drift")
+        reason = None
+        expected_columns = FEATURE_COLUMNS + (['bed_count_scaled'] if 'hospital_bed_count' in df.columns else [])
+        if expected_columns != snapshot.feature_columns:
+            reason = "feature columns changed"
+        for name, le in snapshot.label_encoders.items():
+            # Same normalization as create_features, which would map unseen values to a known class
+            values = set(normalize_labels(df[name]))
+            unseen = values - set(le.classes_)
+            if unseen and reason is None:
+                reason = f"new {name} values: {', '.join(sorted(unseen))}"
+        
+        df = add_shortage_target(self.create_features(df, is_training=False, snapshot=snapshot), horizons)
+        X = snapshot.scaler.transform(df[snapshot.feature_columns].astype(float))
+        labels = df[[target_column(horizon) for horizon in horizons]]
+        y = labels.iloc[:, 0] if len(horizons) == 1 else labels
+        if reason is None and (labels.nunique() < 2).any():
+            reason = "changed records hold a single class"
+        if reason is None and training['trees'] + rounds > max_trees:
+            reason = f"ensemble would exceed {max_trees} trees"
+        if reason is None:
+            # Mean of the standardized features = shift from the training mean, in standard deviations
+            shift = np.abs(X.mean(axis=0))
+            threshold = getattr(settings, 'ML_INCREMENTAL_DRIFT_THRESHOLD', 0.5)
+            drifted = [
+                f"{column} ({shift[i]:.2f} std)"
+                for i, column in enumerate(snapshot.feature_columns)
+                if column in DRIFT_FEATURES and shift[i] > threshold
+            ]
+            if drifted:
+                reason = f"drift in {', '.join(drifted)}"
+        if reason:
+            print(f"⚠️  Incremental update not possible ({reason}); running full training")
+            return None
+        
+        self._step(progress, 3, INCREMENTAL_STEPS, "Splitting data")
+        first = labels.iloc[:, 0]
+        stratify = first if first.value_counts().min() >= 2 else None
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=42, stratify=stratify
+        )
+        print(f"Changed records: {len(df)} ({len(X_train)} train, {len(X_test)} test)")
+        
+        self._step(progress, 4, INCREMENTAL_STEPS, f"Boosting {rounds} more trees on version {version}")
+        # Same hyperparameters as the trees being extended
+        params = {key: value for key, value in training.get('params', {}).items() if key != 'n_estimators'}
+        model = xgb.XGBClassifier(**{**BOOSTER_PARAMS, **params, 'n_estimators': rounds})
+        model.fit(
+            X_train,
+            y_train,
+            eval_set=[(X_test, y_test)],
+            verbose=False,
+            xgb_model=snapshot.model.get_booster()
+        )
+        
+        self._step(progress, 5, INCREMENTAL_STEPS, "Evaluating model")
+        # Headline accuracy is the shortest horizon's, as in full training
+        y_test = np.asarray(y_test).reshape(len(X_test), -1)[:, 0]
+        previous_accuracy = accuracy_score(y_test, snapshot.model.predict(X_test).reshape(len(X_test), -1)[:, 0])
+        accuracy = accuracy_score(y_test, model.predict(X_test).reshape(len(X_test), -1)[:, 0])
+        print(f"\n📊 Accuracy on changed records: {previous_accuracy:.2%} -> {accuracy:.2%}")
+        
+        self._step(progress, 6, INCREMENTAL_STEPS, "Saving model")
+        self._activate(snapshot)
+        self.model = model
+        self.save_model(training={
+            'mode': 'incremental',
+            'base_version': version,
+            'watermark': watermark,
+            'rows': len(df),
+            'trees': model.get_booster().num_boosted_rounds(),
+            'accuracy': float(accuracy),
+            'horizons': list(horizons),
+        })
+        return accuracy
+    
+    def save_model(self, training=None):
+        """
+        Publish the trained artifacts to disk as a new immutable model version
+        training: how the model was trained, recorded in the version manifest
+        """
+        ensemble = compile_ensemble(self.model)
+        
+        def write_artifacts(directory):
+            save_booster(self.model, os.path.join(directory, MODEL_FILE))
+            arrays, metadata = self._bundle_contents(ensemble)
+            write_bundle(os.path.join(directory, BUNDLE_FILE), arrays, metadata)
+        
+        registry = self.registry
+        metadata = {'feature_columns': self.feature_columns}
+        if training:
+            metadata['training'] = training
+        version = registry.publish(write_artifacts, metadata=metadata)
+        self._pointer_stamp = registry.pointer_stamp()
+        self._activate(ModelSnapshot(
+            version, self.model, self.scaler, self.label_encoders, self.feature_columns, ensemble, self.horizons
+        ))
+        
+        print(f"✅ Model saved to: {registry.version_path(version)}")
+        return version
+    
+    def _bundle_contents(self, ensemble):
+        """Scaler, encoders, feature columns and evaluator as flat arrays"""
+        arrays = {
+            'feature_columns': np.array(self.feature_columns, dtype=str),
+            'scaler.mean': self.scaler.mean_,
+            'scaler.scale': self.scaler.scale_,
+            'scaler.var': self.scaler.var_,
+        }
+        for name, le in self.label_encoders.items():
+            arrays[f'encoder.{name}'] = np.array(le.classes_, dtype=str)
+        if ensemble is not None:
+            for field in TreeEnsemble.FIELDS + ('tree_target',):
+                arrays[f'ensemble.{field}'] = getattr(ensemble, field)
+        
+        metadata = {
+            'scaler_samples_seen': int(self.scaler.n_samples_seen_),
+            'encoders': list(self.label_encoders),
+            'ensemble_base_margin': ensemble.base_margin.tolist() if ensemble is not None else None,
+            'horizons': self.horizons,
+        }
+        return arrays, metadata
+    
+    @staticmethod
+    def _load_bundle(version, directory):
+        """
+        Snapshot from a bundled version; arrays stay memory-mapped. When the
+        version has a NumPy evaluator, xgboost is only imported and the
+        booster only read once a batch too large for the evaluator needs it,
+        so workers serving single predictions never load either. The booster
+        file is opened right away, so like the mapped arrays it stays readable
+        if the registry prunes the version directory first.
+        """
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        
+        arrays, metadata = read_bundle(os.path.join(directory, BUNDLE_FILE))
+        feature_columns = [str(name) for name in arrays['feature_columns']]
+        
+        scaler = StandardScaler()
+        scaler.mean_ = arrays['scaler.mean']
+        scaler.scale_ = arrays['scaler.scale']
+        scaler.var_ = arrays['scaler.var']
+        scaler.n_features_in_ = len(feature_columns)
+        scaler.feature_names_in_ = np.array(feature_columns, dtype=object)
+        scaler.n_samples_seen_ = metadata['scaler_samples_seen']
+        
+        label_encoders = {}
+        for name in metadata['encoders']:
+            label_encoders[name] = LabelEncoder()
+            label_encoders[name].classes_ = arrays[f'encoder.{name}'].astype(object)
+        
+        ensemble = None
+        if metadata['ensemble_base_margin'] is not None:
+            ensemble = TreeEnsemble(
+                *(arrays[f'ensemble.{field}'] for field in TreeEnsemble.FIELDS),
+                base_margin=metadata['ensemble_base_margin'],
+                tree_target=arrays.get('ensemble.tree_target'),
+            )
+        
+        booster_file = open(os.path.join(directory, MODEL_FILE), 'rb') if ensemble is not None else None
+        
+        def read_booster():
+            with pipeline_metrics.timer('booster_load'):
+                if booster_file is None:
+                    model = load_booster(os.path.join(directory, MODEL_FILE))
+                else:
+                    with booster_file:
+                        model = load_booster(bytearray(booster_file.read()))
+            print(f"📦 Loaded XGBoost booster for model version {version}")
+            return model
+        
+        return ModelSnapshot(
+            version, read_booster() if ensemble is None else None, scaler, label_encoders, feature_columns,
+            ensemble, metadata.get('horizons', DEFAULT_HORIZONS), model_loader=read_booster,
+        )
+    
+    def has_saved_model(self):
+        """True if a published version (or pre-registry artifacts) exist on disk"""
+        return (
+            self.registry.current_version() is not None
+            or os.path.exists(os.path.join(self.model_path, ARTIFACT_FILES['model']))
+        )
+    
+    def _load_snapshot(self, version=None):
+        """Load every artifact of a version before anything is swapped in"""
+        with pipeline_metrics.timer('model_load'):
+            return self._read_snapshot(version)
+    
+    def _read_snapshot(self, version):
+        import joblib
+        
+        registry = self.registry
+        version = version or registry.current_version()
+        if version is None or version == LEGACY_VERSION:
+            # Artifacts saved before the registry existed live directly in ml_models/
+            directory, version = self.model_path, LEGACY_VERSION
+        else:
+            registry.verify(version)
+            directory = registry.version_path(version)
+            if os.path.exists(os.path.join(directory, BUNDLE_FILE)):
+                return self._load_bundle(version, directory)
+        
+        artifacts = {
+            attr: joblib.load(os.path.join(directory, filename))
+            for attr, filename in ARTIFACT_FILES.items()
+        }
+        
+        ensemble_path = os.path.join(directory, ENSEMBLE_FILE)
+        if os.path.exists(ensemble_path):
+            artifacts['ensemble'] = TreeEnsemble.load(ensemble_path)
+        else:
+            # Versions saved before the evaluator existed: compile it now
+            artifacts['ensemble'] = compile_ensemble(artifacts['model'])
+        return ModelSnapshot(version, **artifacts)
+    
+    def _activate(self, snapshot):
+        """Swap in a new snapshot (a single reference assignment for serving code)"""
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        self.model = None  # Served from the snapshot, which may load it lazily
+        self.scaler = snapshot.scaler
+        self.label_encoders = snapshot.label_encoders
+        self.feature_columns = snapshot.feature_columns
+        self.pipeline = snapshot.pipeline
+        self.horizons = snapshot.horizons
+    
+    def load_model(self, version=None):
+        """Load the current model version (or a specific one) from disk"""
+        try:
+            stamp = self.registry.pointer_stamp()
+            self._activate(self._load_snapshot(version))
+            self._pointer_stamp = stamp
             print("✅ Model loaded successfully")
             return True
         except Exception as e:
             print(f"❌ Error loading model: {e}")
             return False
     
-    def predict(self, input_data):
+    def check_for_update(self):
         """
-        Make prediction for a single inventory item
-        input_data: dict with inventory details
+        Poll the registry pointer (a stat, at most every poll_interval seconds)
+        and load a newly published version in the background.
+        Requests keep using the current snapshot until the new one is ready.
         """
-        if self.model is None:
+        now = time.monotonic()
+        if now - self._last_update_check < self.poll_interval:
+            return
+        self._last_update_check = now
+        
+        stamp = self.registry.pointer_stamp()
+        if stamp is None or stamp == self._pointer_stamp:
+            return
+        
+        with self._reload_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return
+            self._reload_thread = threading.Thread(target=self._reload, args=(stamp,), daemon=True)
+            self._reload_thread.start()
+    
+    def _reload(self, stamp):
+        try:
+            version = self.registry.current_version()
+            if self.snapshot is None or version != self.snapshot.version:
+                self._activate(self._load_snapshot(version))
+                print(f"🔄 Switched to model version {version}")
+            self._pointer_stamp = stamp
+        except Exception as e:
+            # Keep serving the old snapshot; the next poll retries
+            print(f"❌ Error reloading model: {e}")
+    
+    def serving_snapshot(self):
+        """Snapshot to score with, loading the model or polling for a new version"""
+        if self.snapshot is None:
             if not self.load_model():
                 raise Exception("Model not loaded. Train model first.")
-        
-        # Convert to DataFrame
-        df = pd.DataFrame([input_data])
-        
-        # Create features
-        df = self.create_features(df, is_training=False)
-        
-        # Ensure all features exist
-        for col in self.feature_columns:
-            if col not in df.columns:
-                df[col] = 0
-        
-        # Scale features
-        X = df[self.feature_columns]
-        X_scaled = self.scaler.transform(X)
-        
-        # Predict
-        probability = self.model.predict_proba(X_scaled)[0][1]
-        prediction = 1 if probability > 0.5 else 0
-        
-        # Calculate risk level
-        if probability < 0.3:
-            risk = "LOW"
-            recommendation = "Normal monitoring"
-        elif probability < 0.6:
-            risk = "MEDIUM"
-            recommendation = "Consider restocking"
-        elif probability < 0.8:
-            risk = "HIGH"
-            recommendation = "Urgent restock needed"
         else:
-            risk = "CRITICAL"
-            recommendation = "EMERGENCY - Redistribute stock"
+            self.check_for_update()
+        return self.snapshot
+    
+    def warm_up(self):
+        """
+        Load the model and run a dummy inference so the first real request
+        is served at steady-state latency. The booster is loaded and run as
+        well, although small requests never need it, so a preloading master
+        shares it with its workers instead of each reading its own copy.
+        """
+        if self.snapshot is None and not self.load_model():
+            return False
         
-        return {
-            'shortage_prediction': bool(prediction),
-            'shortage_probability': float(probability),
-            'risk_level': risk,
-            'recommendation': recommendation,
-            'confidence': float(probability) if prediction else float(1 - probability),
-            'days_of_supply': float(df['days_of_supply'].iloc[0]) if 'days_of_supply' in df.columns else 0
+        dummy = {
+            'current_stock': 100,
+            'daily_consumption': 10,
+            'reorder_level': 70,
+            'drug_category': 'General',
+            'hospital_type': 'General',
+            'hospital_bed_count': 100,
+            'last_updated': datetime.now().isoformat()
         }
+        self.predict(dummy)
+        self.batch_predict([dummy, dict(dummy, current_stock=10)])
+        snapshot = self.snapshot
+        snapshot.model.predict_proba(snapshot.pipeline.transform_one(dummy)[0])
+        return True
+    
+    def predict(self, input_data):
+        """
+        Make prediction for a single inventory item
+        input_data: dict with inventory details
+        """
+        started = time.perf_counter()
+        snapshot = self.serving_snapshot()
+        
+        # Build the scaled feature row without going through pandas
+        with pipeline_metrics.timer('predict.features'):
+            X_scaled, days_of_supply = snapshot.pipeline.transform_one(input_data)
+        
+        # Predict (through the micro-batcher when enabled)
+        infer = self.batcher.infer if self.batcher else None
+        probability = self._score(snapshot, X_scaled, infer)[0]
+        
+        prediction = self._format_predictions([probability], [days_of_supply], snapshot.horizons)[0]
+        pipeline_metrics.observe('predict', time.perf_counter() - started)
+        return prediction
+    
+    def _infer(self, snapshot, X):
+        """
+        Run the model on a scaled feature matrix.
+        Small batches, where the xgboost call overhead dominates, go through
+        the NumPy evaluator; large ones through the booster's native loop.
+        Multi-horizon models return one column per horizon.
+        """
+        pipeline_metrics.observe_size('inference_rows', len(X))
+        with pipeline_metrics.timer('inference'):
+            if snapshot.ensemble is not None and len(X) <= self.numpy_max_rows:
+                return snapshot.ensemble.predict_proba(X)
+            probabilities = snapshot.model.predict_proba(X)
+            return probabilities[:, 1] if len(snapshot.horizons) == 1 else probabilities
+    
+    def _score(self, snapshot, X, infer=None):
+        """
+        Shortage probabilities for a scaled feature matrix.
+        Rows already in the prediction cache skip the model entirely;
+        bulk calls go straight to the model (see PredictionCache).
+        """
+        infer = infer or self._infer
+        X = np.asarray(X, dtype=np.float32)
+        if not self.cache.enabled or len(X) > self.cache.max_rows:
+            return infer(snapshot, X)
+        
+        keys = self.cache.keys(snapshot.version, X)
+        cached = self.cache.get_many(keys)
+        missing = [i for i, value in enumerate(cached) if value is None]
+        
+        # Cached values are scalars, or one probability per horizon
+        filler = np.zeros(() if len(snapshot.horizons) == 1 else len(snapshot.horizons), dtype=np.float32)
+        probabilities = np.array([filler if value is None else value for value in cached], dtype=np.float32)
+        probabilities = probabilities.reshape((len(cached),) + filler.shape)
+        if missing:
+            fresh = infer(snapshot, X[missing])
+            probabilities[missing] = fresh
+            self.cache.set_many({keys[i]: value for i, value in zip(missing, fresh)})
+        return probabilities
     
-    def batch_predict(self, inventory_list):
+    def _format_predictions(self, probabilities, days_of_supply, horizons=DEFAULT_HORIZONS):
         """
-        Predict shortages for multiple items
+        Turn an array of shortage probabilities into prediction dicts.
+        With several horizons (one column each) the shortest drives the
+        headline fields and every horizon is listed under 'horizons'.
         """
+        probabilities = np.asarray(probabilities)
+        primary = primary_probabilities(probabilities)
+        risk_idx = risk_indices(primary)
+        
         predictions = []
-        for item in inventory_list:
-            try:
-                pred = self.predict(item)
-                pred['medicine_id'] = item.get('medicine_id')
-                pred['hospital_id'] = item.get('hospital_id')
-                predictions.append(pred)
-            except Exception as e:
-                print(f"Error predicting for item {item.get('medicine_id')}: {e}")
-        
-        # Sort by risk
-        predictions.sort(key=lambda x: x['shortage_probability'], reverse=True)
+        for probability, idx, days in zip(primary, risk_idx, days_of_supply):
+            prediction = probability > 0.5
+            predictions.append({
+                'shortage_prediction': bool(prediction),
+                'shortage_probability': float(probability),
+                'risk_level': RISK_LEVELS[idx],
+                'recommendation': RECOMMENDATIONS[idx],
+                'confidence': float(probability) if prediction else float(1 - probability),
+                'days_of_supply': float(days)
+            })
         
+        if probabilities.ndim == 2:
+            horizon_idx = risk_indices(probabilities)
+            for row, prediction in enumerate(predictions):
+                prediction['horizons'] = {
+                    f'{horizon}d': {
+                        'shortage_probability': float(probabilities[row, i]),
+                        'risk_level': RISK_LEVELS[horizon_idx[row, i]],
+                    }
+                    for i, horizon in enumerate(horizons)
+                }
         return predictions
+    
+    def score_frame(self, df, snapshot=None):
+        """
+        Vectorized scoring of a frame of raw inventory rows.
+        Returns (shortage probabilities, days of supply) as arrays.
+        """
+        snapshot = snapshot or self.serving_snapshot()
+        with pipeline_metrics.timer('batch.features'):
+            df = self.create_features(df, is_training=False, snapshot=snapshot)
+        with pipeline_metrics.timer('batch.scaling'):
+            X_scaled = snapshot.scaler.transform(df[snapshot.feature_columns])
+        return self._score(snapshot, X_scaled), df['days_of_supply'].to_numpy()
+    
+    def score_items(self, inventory_list, snapshot=None):
+        """
+        Vectorized scoring of raw inventory dicts without building result dicts.
+        Returns (positions, probabilities, days_of_supply, errors): `positions`
+        are the input indices that were scored; `errors` is aligned with the
+        input and holds a message for every item that could not be scored.
+        """
+        import pandas as pd
+        
+        started = time.perf_counter()
+        snapshot = snapshot or self.serving_snapshot()
+        errors = [None] * len(inventory_list)
+        
+        # Drop items the model cannot score
+        positions = []
+        for i, item in enumerate(inventory_list):
+            if not isinstance(item, dict):
+                errors[i] = "inventory item must be an object"
+                continue
+            missing = [field for field in REQUIRED_INPUTS if field not in item]
+            if missing:
+                errors[i] = f"missing {', '.join(missing)}"
+                continue
+            positions.append(i)
+        
+        if positions:
+            df = pd.DataFrame([inventory_list[i] for i in positions])
+            for col in REQUIRED_INPUTS:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            
+            invalid = df[REQUIRED_INPUTS].isna().any(axis=1).to_numpy()
+            if invalid.any():
+                for i, bad in zip(positions, invalid):
+                    if bad:
+                        errors[i] = "non-numeric stock values"
+                positions = [i for i, bad in zip(positions, invalid) if not bad]
+                df = df[~invalid].reset_index(drop=True)
+        
+        for item, error in zip(inventory_list, errors):
+            if error:
+                medicine_id = item.get('medicine_id') if isinstance(item, dict) else None
+                print(f"Error predicting for item {medicine_id}: {error}")
+        
+        pipeline_metrics.observe('batch.parsing', time.perf_counter() - started)
+        
+        if positions:
+            probabilities, days_of_supply = self.score_frame(df, snapshot)
+        else:
+            probabilities, days_of_supply = np.empty(0, dtype=np.float32), np.empty(0)
+        
+        pipeline_metrics.observe_size('batch_items', len(inventory_list))
+        pipeline_metrics.observe('batch', time.perf_counter() - started)
+        return positions, probabilities, days_of_supply, errors
+    
+    def _item_predictions(self, inventory_list, positions, probabilities, days_of_supply, horizons=DEFAULT_HORIZONS):
+        predictions = self._format_predictions(probabilities, days_of_supply, horizons)
+        for i, pred in zip(positions, predictions):
+            item = inventory_list[i]
+            pred['medicine_id'] = item.get('medicine_id')
+            pred['hospital_id'] = item.get('hospital_id')
+        return predictions
+    
+    def predict_many(self, inventory_list, snapshot=None):
+        """
+        Vectorized predictions for multiple items, in input order.
+        Returns (predictions, errors): an item that cannot be scored gets a None
+        prediction and an error message.
+        """
+        snapshot = snapshot or self.serving_snapshot()
+        positions, probabilities, days_of_supply, errors = self.score_items(inventory_list, snapshot)
+        predictions = [None] * len(inventory_list)
+        scored = self._item_predictions(inventory_list, positions, probabilities, days_of_supply, snapshot.horizons)
+        for i, pred in zip(positions, scored):
+            predictions[i] = pred
+        return predictions, errors
+    
+    def batch_predict(self, inventory_list, top_k=None):
+        """
+        Predict shortages for multiple items, highest risk first.
+        Builds one frame and runs feature creation, scaling and the model once
+        for the whole list. With `top_k`, only the k riskiest items are selected
+        (partial selection, not a full sort) and turned into result dicts.
+        """
+        snapshot = self.serving_snapshot()
+        positions, probabilities, days_of_supply, _ = self.score_items(inventory_list, snapshot)
+        order = top_k_indices(primary_probabilities(probabilities), top_k)
+        return self._item_predictions(
+            inventory_list,
+            [positions[i] for i in order],
+            probabilities[order],
+            np.asarray(days_of_supply)[order],
+            snapshot.horizons,
+        )
 
 
 # Singleton instance
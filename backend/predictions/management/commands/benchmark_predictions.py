@@ -0,0 +1,121 @@
+# Drug/backend/predictions/management/commands/benchmark_predictions.py
+import contextlib
+import io
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from predictions import benchmarks
+from predictions.cache import PredictionCache
+from predictions.forecaster import predictor_instance
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark feature creation, prediction, model load and the prediction views '
+        'against a throwaway test database, optionally comparing with a baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default=','.join(str(size) for size in benchmarks.DEFAULT_SIZES),
+            help='Comma-separated row counts for create_features and batch_predict'
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per benchmark (fewer if slow)')
+        parser.add_argument('--output', type=str, help='Write the results to this JSON file')
+        parser.add_argument('--baseline', type=str, help='Compare against a results file from an earlier run')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=benchmarks.DEFAULT_THRESHOLD,
+            help='Allowed median slowdown vs the baseline (0.25 = 25%%)'
+        )
+        parser.add_argument(
+            '--max-regression',
+            action='append',
+            default=[],
+            metavar='NAME=THRESHOLD',
+            help='Per-benchmark threshold, e.g. --max-regression model_load=1.0 (repeatable)'
+        )
+        parser.add_argument(
+            '--train',
+            action='store_true',
+            help='Train a fresh model on synthetic data instead of using the saved one'
+        )
+        parser.add_argument('--skip-views', action='store_true', help='Skip the DRF view benchmarks')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size]
+            overrides = {
+                name: float(value)
+                for name, value in (item.split('=', 1) for item in options['max_regression'])
+            }
+        except ValueError:
+            raise CommandError('--sizes takes integers and --max-regression takes NAME=THRESHOLD')
+
+        self.stdout.write(self.style.SUCCESS('🚀 Benchmarking predictions...'))
+
+        # Views need a database; use a throwaway test database (in-memory for SQLite)
+        setup_test_environment()
+        database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        model_dir = None
+        original_path, original_cache = predictor_instance.model_path, predictor_instance.cache
+        try:
+            if options['train'] or not predictor_instance.has_saved_model():
+                model_dir = tempfile.mkdtemp()
+                predictor_instance.model_path = model_dir
+                self.stdout.write('🔄 Training a benchmark model on synthetic data...')
+                with contextlib.redirect_stdout(io.StringIO()):
+                    predictor_instance.train_model()
+
+            # Repeated runs must measure the model, not the prediction cache
+            predictor_instance.cache = PredictionCache(max_size=0)
+            rows = benchmarks.seed_fixture()
+            self.stdout.write(f'💾 Seeded {rows} inventory rows')
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                predictor_instance.load_model()
+            results = benchmarks.run_benchmarks(
+                predictor_instance, sizes, options['repeat'],
+                views=not options['skip_views'], log=self._log,
+            )
+        finally:
+            predictor_instance.model_path, predictor_instance.cache = original_path, original_cache
+            predictor_instance.snapshot = None
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+            teardown_test_environment()
+            if model_dir:
+                shutil.rmtree(model_dir, ignore_errors=True)
+
+        if options['output']:
+            benchmarks.save_results(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f'💾 Results written to {options["output"]}'))
+
+        if options['baseline']:
+            self._compare(results, options['baseline'], options['threshold'], overrides)
+
+    def _log(self, line):
+        self.stdout.write(line)
+
+    def _compare(self, results, path, threshold, overrides):
+        baseline = benchmarks.load_results(path)
+        if baseline.get('environment') != results['environment']:
+            self.stdout.write(self.style.WARNING('⚠️  Baseline was recorded in a different environment'))
+
+        rows = benchmarks.compare(results, baseline, threshold, overrides)
+        self.stdout.write(f'\n📈 Compared with {path}:')
+        for name, before, after, ratio, regressed in rows:
+            line = f'   {name}: {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)'
+            self.stdout.write(self.style.ERROR(line + ' REGRESSION') if regressed else line)
+
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            raise CommandError(f'{len(regressions)} benchmark(s) regressed: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('✅ No regressions'))
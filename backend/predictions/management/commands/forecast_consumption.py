@@ -0,0 +1,51 @@
+# Drug/backend/predictions/management/commands/forecast_consumption.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions import consumption
+from predictions.scoring import inventory_scope
+
+
+class Command(BaseCommand):
+    help = (
+        'Fit daily consumption series from the InventoryTransaction ledger and store '
+        '7, 14 and 30 day forecasts for every inventory (used by scoring and training)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', type=int, help='Only forecast this hospital ID')
+        parser.add_argument('--state', type=str, help='Only forecast hospitals in this state')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=consumption.DEFAULT_HISTORY_DAYS,
+            help='Days of ledger history to fit on'
+        )
+        parser.add_argument('--alpha', type=float, default=consumption.DEFAULT_ALPHA, help='Level smoothing (0-1)')
+        parser.add_argument('--gamma', type=float, default=consumption.DEFAULT_GAMMA, help='Day-of-week smoothing (0-1)')
+        parser.add_argument('--end-date', type=str, help='Forecast from this date, YYYY-MM-DD (default: today, UTC)')
+
+    def handle(self, *args, **options):
+        if not (0 < options['alpha'] <= 1 and 0 <= options['gamma'] <= 1) or options['days'] < 1:
+            raise CommandError('--alpha must be in (0, 1], --gamma in [0, 1] and --days positive')
+        try:
+            end = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError:
+            raise CommandError('--end-date must be YYYY-MM-DD')
+
+        scope = None
+        if options['hospital'] is not None or options['state']:
+            scope = inventory_scope(hospital_id=options['hospital'], state=options['state'])
+
+        self.stdout.write(self.style.SUCCESS('🚀 Forecasting consumption...'))
+        try:
+            written = consumption.refresh_forecasts(
+                scope, days=options['days'], end=end, alpha=options['alpha'], gamma=options['gamma'],
+                log=self.stdout.write,
+            )
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Forecasting failed: {e}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {written} inventory forecasts saved'))
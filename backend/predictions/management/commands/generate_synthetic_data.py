@@ -0,0 +1,47 @@
+# Drug/backend/predictions/management/commands/generate_synthetic_data.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions.datasets import SYNTHETIC_CHUNK_SIZE, write_synthetic_parquet
+
+
+class Command(BaseCommand):
+    help = 'Write a labelled synthetic training dataset to Parquet (deterministic for a given seed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Number of rows to generate')
+        parser.add_argument('--output', type=str, required=True, help='Parquet file to write')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SYNTHETIC_CHUNK_SIZE,
+            help='Rows generated and written per row group (bounds memory use)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='Latest last_updated date, YYYY-MM-DD (default today); fix it for reproducible files'
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--rows and --chunk-size must be positive')
+        try:
+            end = date.fromisoformat(options['end_date']) if options['end_date'] else None
+        except ValueError:
+            raise CommandError('--end-date must be YYYY-MM-DD')
+
+        self.stdout.write(self.style.SUCCESS(f'🚀 Generating {options["rows"]:,} synthetic rows...'))
+        started = time.perf_counter()
+        try:
+            write_synthetic_parquet(
+                options['output'], options['rows'], options['chunk_size'], options['seed'], end
+            )
+        except ImportError:
+            raise CommandError('Writing Parquet needs pyarrow (pip install pyarrow)')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'💾 Wrote {options["output"]} in {elapsed:.1f}s'))
@@ -0,0 +1,122 @@
+# Drug/backend/predictions/management/commands/score_network.py
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from predictions.forecaster import predictor_instance
+from predictions.runs import rescore_changed, save_run
+from predictions.sharding import score_inventories_sharded
+
+
+class Command(BaseCommand):
+    help = 'Score every inventory in a scope using a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', type=int, help='Only score this hospital ID')
+        parser.add_argument('--state', type=str, help='Only score hospitals in this state')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Worker processes (default: one per CPU core, 1 = score in-process)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows read from the database per chunk')
+        parser.add_argument('--top', type=int, default=10, help='Number of highest-risk items to print')
+        parser.add_argument('--output', type=str, help='Write every score to this CSV file')
+        parser.add_argument(
+            '--save',
+            action='store_true',
+            help='Store the scores as a prediction run for dashboards (/api/predictions/runs/latest/)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only rescore inventories changed since the latest saved run of the scope and merge them into it'
+        )
+
+    def handle(self, *args, **options):
+        if options['incremental']:
+            self.rescore(options)
+            return
+
+        self.stdout.write(self.style.SUCCESS('🚀 Scoring inventory...'))
+
+        try:
+            started = time.perf_counter()
+            # Read before scoring, so rows changed meanwhile are picked up by --incremental
+            watermark = predictor_instance.data_watermark() if options['save'] else None
+            scores = score_inventories_sharded(
+                predictor_instance,
+                hospital_id=options['hospital'],
+                state=options['state'],
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+            )
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Scoring failed: {e}'))
+            return
+
+        rate = len(scores) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Scored {len(scores)} items with model {scores.version} in {elapsed:.2f}s ({rate:,.0f} items/s)'
+        ))
+        for level, count in scores.risk_summary().items():
+            self.stdout.write(f'   {level}: {count}')
+
+        if options['top'] and len(scores):
+            self.stdout.write(f'\n🔍 Top {options["top"]} highest-risk items:')
+            for pred in scores.to_predictions(predictor_instance, scores.ranking(options['top'])):
+                self.stdout.write(
+                    f"   inventory {pred['inventory_id']} (hospital {pred['hospital_id']}, "
+                    f"medicine {pred['medicine_id']}): {pred['shortage_probability']:.1%} {pred['risk_level']}"
+                )
+
+        if options['output']:
+            ranking = scores.ranking()
+            columns = {
+                'inventory_id': scores.inventory_ids[ranking],
+                'hospital_id': scores.hospital_ids[ranking],
+                'medicine_id': scores.medicine_ids[ranking],
+                'shortage_probability': scores.primary[ranking],
+                'days_of_supply': scores.days_of_supply[ranking],
+            }
+            if scores.probabilities.ndim == 2:
+                # One column per horizon of a multi-horizon model
+                for i, horizon in enumerate(scores.horizons):
+                    columns[f'shortage_probability_{horizon}d'] = scores.probabilities[ranking, i]
+            pd.DataFrame(columns).to_csv(options['output'], index=False)
+            self.stdout.write(self.style.SUCCESS(f'💾 Scores written to {options["output"]}'))
+
+        if options['save']:
+            try:
+                run = save_run(
+                    scores, options['hospital'], options['state'], scoring_seconds=elapsed, watermark=watermark,
+                    log=lambda message: self.stdout.write(message),
+                )
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'❌ Saving the prediction run failed: {e}'))
+                return
+            self.stdout.write(self.style.SUCCESS(f'✅ Prediction run {run.id} is now the latest for its scope'))
+
+    def rescore(self, options):
+        self.stdout.write(self.style.SUCCESS('🚀 Rescoring changed inventory...'))
+        try:
+            run, rescored = rescore_changed(
+                predictor_instance,
+                hospital_id=options['hospital'],
+                state=options['state'],
+                workers=options['workers'],
+                chunk_size=options['chunk_size'],
+                log=lambda message: self.stdout.write(message),
+            )
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Rescoring failed: {e}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Prediction run {run.id} is up to date: {rescored} items rescored, {run.total} in total'
+        ))
+        for level, count in run.risk_summary.items():
+            self.stdout.write(f'   {level}: {count}')
@@ -0,0 +1,68 @@
+# Drug/backend/predictions/management/commands/simulate_stockouts.py
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions.scoring import inventory_scope
+from predictions.simulation import simulate_inventories
+
+
+class Command(BaseCommand):
+    help = (
+        'Monte Carlo stockout simulation: probability of running out by each day and '
+        'expected shortage quantity for every inventory in a scope'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hospital', type=int, help='Only simulate this hospital ID')
+        parser.add_argument('--state', type=str, help='Only simulate hospitals in this state')
+        parser.add_argument('--paths', type=int, default=None, help='Demand paths per inventory (default: SIMULATION_PATHS)')
+        parser.add_argument('--days', type=int, default=None, help='Days simulated (default: SIMULATION_DAYS)')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible runs')
+        parser.add_argument('--top', type=int, default=10, help='Number of most at-risk items to print')
+        parser.add_argument('--output', type=str, help='Write every inventory\'s results to this CSV file')
+
+    def handle(self, *args, **options):
+        if (options['paths'] is not None and options['paths'] < 1) or (options['days'] is not None and options['days'] < 1):
+            raise CommandError('--paths and --days must be positive')
+
+        self.stdout.write(self.style.SUCCESS('🚀 Simulating stockouts...'))
+        try:
+            started = time.perf_counter()
+            simulation = simulate_inventories(
+                inventory_scope(hospital_id=options['hospital'], state=options['state']),
+                paths=options['paths'], days=options['days'], seed=options['seed'], log=self.stdout.write,
+            )
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Simulation failed: {e}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Simulated {len(simulation)} items ({simulation.paths} paths, {simulation.days} days) in {elapsed:.2f}s'
+        ))
+
+        ranking = simulation.ranking()
+        if options['top'] and len(simulation):
+            self.stdout.write(f'\n🔍 Top {options["top"]} items most likely to run out within {simulation.days} days:')
+            for row in simulation.to_rows(ranking[:options['top']]):
+                self.stdout.write(
+                    f"   inventory {row['inventory_id']} (hospital {row['hospital_id']}, "
+                    f"medicine {row['medicine_id']}): {row['stockout_probability'][-1]:.1%}, "
+                    f"median stockout day {row['median_stockout_day']}, "
+                    f"expected shortage {row['expected_shortage']:.0f} units"
+                )
+
+        if options['output']:
+            columns = {
+                'inventory_id': simulation.inventory_ids[ranking],
+                'hospital_id': simulation.hospital_ids[ranking],
+                'medicine_id': simulation.medicine_ids[ranking],
+                'median_stockout_day': simulation.stockout_day(0.5)[ranking],
+                'expected_shortage': simulation.expected_shortage[ranking],
+            }
+            for day in range(simulation.days):
+                columns[f'p_stockout_day_{day + 1}'] = simulation.stockout_probability[ranking, day]
+            pd.DataFrame(columns).to_csv(options['output'], index=False)
+            self.stdout.write(self.style.SUCCESS(f'💾 Results written to {options["output"]}'))
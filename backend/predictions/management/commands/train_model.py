@@ -12,12 +12,51 @@ class Command(BaseCommand):
             default=2000,
             help='Number of training samples (if using synthetic data)'
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Add trees to the current model using records changed since it was trained '
+                 '(falls back to full training on drift or schema changes)'
+        )
+        parser.add_argument(
+            '--tune',
+            action='store_true',
+            help='Search hyperparameters with time-ordered cross-validation before training'
+        )
+        parser.add_argument('--folds', type=int, default=3, help='Time-ordered folds for --tune')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes for --tune (default: CPU count)')
+        parser.add_argument(
+            '--n-iter',
+            type=int,
+            default=None,
+            help='Random search: evaluate this many sampled candidates instead of the full grid'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=None,
+            help='Accuracy within which the cheapest candidate wins (default 0.005)'
+        )
+        parser.add_argument(
+            '--horizons',
+            type=str,
+            default=None,
+            help='Comma-separated shortage horizons in days, e.g. 7,14,30 (default: ML_PREDICTION_HORIZONS)'
+        )
     
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('🚀 Starting ML model training...'))
         
         try:
-            accuracy = predictor_instance.train_model()
+            horizons = [int(h) for h in options['horizons'].split(',')] if options['horizons'] else None
+            if options['tune']:
+                accuracy, _ = predictor_instance.tune_model(
+                    n_iter=options['n_iter'], folds=options['folds'],
+                    workers=options['workers'], tolerance=options['tolerance'],
+                    horizons=horizons,
+                )
+            else:
+                accuracy = predictor_instance.train_model(incremental=options['incremental'], horizons=horizons)
             
             self.stdout.write(self.style.SUCCESS(f'✅ Model training completed!'))
             self.stdout.write(self.style.SUCCESS(f'📈 Accuracy: {accuracy:.2%}'))
@@ -0,0 +1,133 @@
+# Drug/backend/predictions/metrics.py
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Latency bucket upper bounds (seconds): 10us to ~60s, sqrt(2) apart
+LATENCY_BUCKETS = tuple(1e-5 * 2 ** (i / 2) for i in range(46))
+# Batch size bucket upper bounds: powers of two up to ~1M rows
+SIZE_BUCKETS = tuple(2 ** i for i in range(21))
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: observing a value is one bisect and one
+    increment, and memory stays constant however many values arrive.
+    Values above the last bound land in an overflow bucket.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, q):
+        """Estimate of the q-th quantile (0-1), interpolated within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(estimate, self.max)
+            seen += bucket_count
+        return self.max
+
+    def summary(self, scale=1.0):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count * scale if self.count else 0.0,
+            'p50': self.percentile(0.50) * scale,
+            'p95': self.percentile(0.95) * scale,
+            'p99': self.percentile(0.99) * scale,
+            'max': self.max * scale,
+        }
+
+    def buckets(self, scale=1.0):
+        """(upper bound, count) pairs for non-empty buckets, for aggregating across workers"""
+        bounds = [bound * scale for bound in self.bounds] + [None]
+        return [[bound, count] for bound, count in zip(bounds, self.counts) if count]
+
+
+class PipelineMetrics:
+    """
+    Per-worker latency histograms for each prediction stage plus size
+    histograms for batches. Stages are created on first use, so call sites
+    just name them: `with pipeline_metrics.timer('inference'): ...`
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.reset()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(enabled=getattr(settings, 'PREDICTION_METRICS_ENABLED', True))
+
+    def reset(self):
+        self.started_at = time.time()
+        self.latencies = {}
+        self.sizes = {}
+
+    def _histogram(self, table, name, bounds):
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table.setdefault(name, Histogram(bounds))
+        return histogram
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self._histogram(self.latencies, stage, LATENCY_BUCKETS).observe(seconds)
+
+    def observe_size(self, name, size):
+        if self.enabled:
+            self._histogram(self.sizes, name, SIZE_BUCKETS).observe(size)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def latency_summary(self):
+        """p50/p95/p99 per stage, in milliseconds"""
+        return {stage: histogram.summary(scale=1000.0) for stage, histogram in sorted(self.latencies.copy().items())}
+
+    def as_dict(self):
+        return {
+            'enabled': self.enabled,
+            'pid': os.getpid(),
+            'since': self.started_at,
+            'latency_ms': {
+                stage: dict(histogram.summary(scale=1000.0), buckets=histogram.buckets(scale=1000.0))
+                for stage, histogram in sorted(self.latencies.copy().items())
+            },
+            'sizes': {
+                name: dict(histogram.summary(), buckets=histogram.buckets())
+                for name, histogram in sorted(self.sizes.copy().items())
+            },
+        }
+
+
+pipeline_metrics = PipelineMetrics.from_settings()
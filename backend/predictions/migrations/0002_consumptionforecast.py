@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0001_initial'),
+        ('predictions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('forecast_7d', models.FloatField()),
+                ('forecast_14d', models.FloatField()),
+                ('forecast_30d', models.FloatField()),
+                ('level', models.FloatField()),
+                ('history_days', models.IntegerField()),
+                ('generated_at', models.DateTimeField()),
+                ('inventory', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='consumption_forecast', to='hospitals.inventory')),
+            ],
+            options={
+                'db_table': 'consumption_forecasts',
+                'indexes': [models.Index(fields=['generated_at'], name='consumption_generat_2289fe_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0002_consumptionforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumptionforecast',
+            name='residual_std',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
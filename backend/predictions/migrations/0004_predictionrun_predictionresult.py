@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitals', '0001_initial'),
+        ('medicines', '0001_initial'),
+        ('predictions', '0003_consumptionforecast_residual_std'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=64)),
+                ('state', models.CharField(blank=True, max_length=100)),
+                ('total', models.IntegerField(default=0)),
+                ('risk_summary', models.JSONField(blank=True, default=dict)),
+                ('seconds', models.FloatField(default=0.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='prediction_runs', to='hospitals.hospital')),
+            ],
+            options={
+                'db_table': 'prediction_runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PredictionResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shortage_probability', models.FloatField()),
+                ('risk_level', models.CharField(max_length=10)),
+                ('days_of_supply', models.FloatField()),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_results', to='hospitals.hospital')),
+                ('inventory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_results', to='hospitals.inventory')),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prediction_results', to='medicines.medicine')),
+                ('run', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='results', to='predictions.predictionrun')),
+            ],
+            options={
+                'db_table': 'prediction_results',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='predictionrun',
+            index=models.Index(fields=['completed_at'], name='prediction__complet_e8c60f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='predictionresult',
+            index=models.Index(fields=['run', 'risk_level', 'shortage_probability'], name='prediction__run_id_136573_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='predictionresult',
+            index=models.Index(fields=['run', 'shortage_probability'], name='prediction__run_id_84c7fe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='predictionresult',
+            index=models.Index(fields=['run', 'hospital', 'shortage_probability'], name='prediction__run_id_cc04f0_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0004_predictionrun_predictionresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionrun',
+            name='rescored',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='predictionrun',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predictionrun',
+            name='watermark',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
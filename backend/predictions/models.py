@@ -1,3 +1,117 @@
 from django.db import models
 
 # Create your models here.
+class TrainingJob(models.Model):
+    """A background run of train_model, with its progress and outcome"""
+
+    class Mode(models.TextChoices):
+        FULL = 'FULL', 'Full'
+        INCREMENTAL = 'INCREMENTAL', 'Incremental'
+        TUNE = 'TUNE', 'Tune'
+
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+
+    ACTIVE_STATUSES = [Status.QUEUED, Status.RUNNING]
+
+    mode = models.CharField(max_length=15, choices=Mode.choices, default=Mode.FULL)
+    options = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    progress = models.FloatField(default=0.0)  # 0-1, advanced at each training step
+    current_step = models.CharField(max_length=100, blank=True)
+    steps = models.JSONField(default=list, blank=True)  # [{step, message, started_at, seconds}]
+    metrics = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    model_version = models.CharField(max_length=64, blank=True)
+    task_id = models.CharField(max_length=255, blank=True)  # Celery task ID when run by a worker
+    cancel_requested = models.BooleanField(default=False)
+    requested_by = models.ForeignKey('accounts.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='training_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Refreshed while the job runs (tasks.Heartbeat)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'training_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.mode} training job {self.id} ({self.status})"
+
+
+class ConsumptionForecast(models.Model):
+    """Expected consumption of one inventory, fitted to its transaction ledger (consumption.py)"""
+    inventory = models.OneToOneField('hospitals.Inventory', on_delete=models.CASCADE, related_name='consumption_forecast')
+    forecast_7d = models.FloatField()  # Units expected to be consumed over the next 7 days
+    forecast_14d = models.FloatField()
+    forecast_30d = models.FloatField()
+    level = models.FloatField()  # Smoothed daily consumption, before the day-of-week adjustment
+    residual_std = models.FloatField(default=0.0)  # Spread of daily consumption around the forecast
+    history_days = models.IntegerField()  # Days with recorded consumption in the fitted window
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'consumption_forecasts'
+        indexes = [
+            models.Index(fields=['generated_at']),
+        ]
+
+    def __str__(self):
+        return f"Forecast for inventory {self.inventory_id}: {self.forecast_7d:.1f} units / 7 days"
+
+
+class PredictionRun(models.Model):
+    """One scoring pass over a scope, persisted so dashboards read stored scores (runs.py)"""
+    model_version = models.CharField(max_length=64)
+    hospital = models.ForeignKey('hospitals.Hospital', on_delete=models.CASCADE, null=True, blank=True, related_name='prediction_runs')
+    state = models.CharField(max_length=100, blank=True)  # Scope; neither set = the whole network
+    total = models.IntegerField(default=0)
+    risk_summary = models.JSONField(default=dict, blank=True)  # {risk level: count}
+    seconds = models.FloatField(default=0.0)  # Scoring plus writing the results
+    watermark = models.JSONField(default=dict, blank=True)  # Data the results are current to (data_watermark)
+    rescored = models.IntegerField(default=0)  # Results replaced by incremental rescoring since the run
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)  # Set once every result is written
+    updated_at = models.DateTimeField(null=True, blank=True)  # Last incremental rescoring merged in
+
+    class Meta:
+        db_table = 'prediction_runs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['completed_at']),
+        ]
+
+    def __str__(self):
+        return f"Prediction run {self.id} ({self.model_version}, {self.total} results)"
+
+
+class PredictionResult(models.Model):
+    """The stored score of one inventory in a PredictionRun"""
+    # No index of its own: every composite index below starts with run
+    run = models.ForeignKey(PredictionRun, on_delete=models.CASCADE, related_name='results', db_index=False)
+    inventory = models.ForeignKey('hospitals.Inventory', on_delete=models.CASCADE, related_name='prediction_results')
+    hospital = models.ForeignKey('hospitals.Hospital', on_delete=models.CASCADE, related_name='prediction_results')
+    medicine = models.ForeignKey('medicines.Medicine', on_delete=models.CASCADE, related_name='prediction_results')
+    shortage_probability = models.FloatField()
+    risk_level = models.CharField(max_length=10)
+    days_of_supply = models.FloatField()
+
+    class Meta:
+        db_table = 'prediction_results'
+        indexes = [
+            # Dashboard reads: one run, optionally one risk level or hospital, riskiest first
+            models.Index(fields=['run', 'risk_level', 'shortage_probability']),
+            models.Index(fields=['run', 'shortage_probability']),
+            models.Index(fields=['run', 'hospital', 'shortage_probability']),
+        ]
+
+    def __str__(self):
+        return f"Inventory {self.inventory_id}: {self.shortage_probability:.1%} {self.risk_level} (run {self.run_id})"
+
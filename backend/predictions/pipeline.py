@@ -0,0 +1,152 @@
+# Drug/backend/predictions/pipeline.py
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .consumption import projected_days_of_supply
+
+MONSOON_MONTHS = frozenset([6, 7, 8, 9])
+FLU_SEASON_MONTHS = frozenset([10, 11, 12, 1, 2])
+
+
+def _to_float(value):
+    return math.nan if value is None else float(value)
+
+
+def _parse_timestamp(value):
+    """Parse last_updated the way pd.to_datetime(..., utc=True) would"""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value
+
+
+class CompiledFeaturePipeline:
+    """
+    Maps a raw inventory dict straight to a scaled float32 feature row.
+
+    Built once from a fitted predictor. Mirrors create_features(is_training=False)
+    followed by scaler.transform, but uses plain dict lookups instead of pandas,
+    so a single prediction costs microseconds rather than milliseconds.
+    """
+
+    def __init__(self, feature_columns, label_encoders, scaler):
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+
+        # Category -> code lookups; unseen values fall back to the first class (code 0)
+        self.vocabularies = {
+            name: {label: code for code, label in enumerate(le.classes_)}
+            for name, le in label_encoders.items()
+        }
+
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        if mean is None:
+            mean = np.zeros(self.n_features)
+        if scale is None:
+            scale = np.ones(self.n_features)
+
+        # (column index, feature name, mean, scale) for every model input
+        self.steps = [
+            (idx, name, float(mean[idx]), float(scale[idx]))
+            for idx, name in enumerate(self.feature_columns)
+        ]
+
+    @classmethod
+    def from_predictor(cls, predictor):
+        return cls(predictor.feature_columns, predictor.label_encoders, predictor.scaler)
+
+    def _encode(self, name, value):
+        vocabulary = self.vocabularies.get(name)
+        if vocabulary is None:
+            return 0.0
+        label = 'Unknown' if value is None else str(value).title()
+        return float(vocabulary.get(label, 0))
+
+    def raw_features(self, data):
+        """
+        Compute the unscaled engineered features for one inventory dict
+        """
+        current_stock = _to_float(data['current_stock'])
+        daily_consumption = _to_float(data['daily_consumption'])
+        reorder_level = _to_float(data['reorder_level'])
+
+        # Ledger-based consumption forecast, as in create_features
+        forecast_7d = _to_float(data.get('forecast_7d'))
+        if not math.isnan(forecast_7d):
+            daily_consumption = forecast_7d / 7
+        days_of_supply = current_stock / (daily_consumption + 0.01)
+        if not math.isnan(forecast_7d) and 'forecast_14d' in data and 'forecast_30d' in data:
+            projected = float(projected_days_of_supply(
+                current_stock, forecast_7d, _to_float(data['forecast_14d']), _to_float(data['forecast_30d'])
+            ))
+            if not math.isnan(projected):
+                days_of_supply = projected
+
+        features = {
+            'current_stock': current_stock,
+            'daily_consumption': daily_consumption,
+            'reorder_level': reorder_level,
+            'stock_consumption_ratio': current_stock / (daily_consumption + 1),
+            'days_of_supply': days_of_supply,
+            'below_reorder_level': float(current_stock < reorder_level),
+        }
+
+        # Time & seasonal features
+        timestamp = _parse_timestamp(data.get('last_updated'))
+        month = timestamp.month if timestamp else 0
+        features['month'] = float(month)
+        features['day_of_week'] = float(timestamp.weekday()) if timestamp else 0.0
+        features['is_monsoon'] = float(month in MONSOON_MONTHS)
+        features['is_flu_season'] = float(month in FLU_SEASON_MONTHS)
+
+        # Hospital size
+        if 'hospital_bed_count' in data:
+            bed_count = _to_float(data['hospital_bed_count'])
+            features['bed_count_scaled'] = 0.1 if math.isnan(bed_count) else bed_count / 1000
+        elif 'bed_count_scaled' in data:
+            features['bed_count_scaled'] = _to_float(data['bed_count_scaled'])
+        else:
+            features['bed_count_scaled'] = 0.1  # Default 100 beds
+
+        # Categorical encodings (missing key behaves like an unseen category)
+        features['drug_category_encoded'] = self._encode('drug_category', data.get('drug_category'))
+        features['hospital_type_encoded'] = self._encode('hospital_type', data.get('hospital_type'))
+
+        return features
+
+    def fill_row(self, data, row):
+        """
+        Write the scaled features for `data` into `row` and return days of supply
+        """
+        features = self.raw_features(data)
+        for idx, name, mean, scale in self.steps:
+            value = features[name] if name in features else _to_float(data.get(name, 0.0))
+            row[idx] = (value - mean) / scale
+        return features['days_of_supply']
+
+    def transform_one(self, data):
+        """
+        Returns a (1, n_features) float32 matrix and the item's days of supply
+        """
+        X = np.empty((1, self.n_features), dtype=np.float32)
+        days_of_supply = self.fill_row(data, X[0])
+        return X, days_of_supply
+
+    def transform_many(self, items):
+        """
+        Returns a (len(items), n_features) float32 matrix and days of supply per item
+        """
+        X = np.empty((len(items), self.n_features), dtype=np.float32)
+        days_of_supply = np.empty(len(items), dtype=np.float64)
+        for i, data in enumerate(items):
+            days_of_supply[i] = self.fill_row(data, X[i])
+        return X, days_of_supply
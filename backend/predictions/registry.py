@@ -0,0 +1,141 @@
+# Drug/backend/predictions/registry.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+MANIFEST_NAME = 'manifest.json'
+POINTER_NAME = 'CURRENT'
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _combined_checksum(files):
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(f"{name}:{files[name]}\n".encode())
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Versioned store for trained model artifacts.
+
+    Every save goes into its own immutable directory under versions/ together
+    with a manifest holding a checksum per file. The CURRENT pointer is swapped
+    with os.replace, so a reader sees either the old version or the new one,
+    never a model from one run next to a scaler from another.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        self.pointer_path = os.path.join(root, POINTER_NAME)
+
+    def version_path(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def current_version(self):
+        """Version the CURRENT pointer refers to, or None if nothing was published"""
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def pointer_stamp(self):
+        """
+        Cheap change marker for the CURRENT pointer (a stat, no read).
+        os.replace gives the pointer a new inode on every publish.
+        """
+        try:
+            st = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def list_versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if not name.startswith('.') and os.path.isdir(self.version_path(name))
+        )
+
+    def read_manifest(self, version):
+        with open(os.path.join(self.version_path(version), MANIFEST_NAME)) as f:
+            return json.load(f)
+
+    def verify(self, version):
+        """Recompute artifact checksums and compare them with the manifest"""
+        manifest = self.read_manifest(version)
+        directory = self.version_path(version)
+        files = {name: _sha256(os.path.join(directory, name)) for name in manifest['files']}
+        if files != manifest['files'] or _combined_checksum(files) != manifest['checksum']:
+            raise ValueError(f"Checksum mismatch for model version {version}")
+        return manifest
+
+    def publish(self, write_artifacts, metadata=None, keep=5):
+        """
+        Write a new version and point CURRENT at it.
+        write_artifacts(directory) saves the artifact files into a staging directory.
+        """
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.versions_dir)
+        try:
+            write_artifacts(staging)
+            files = {name: _sha256(os.path.join(staging, name)) for name in sorted(os.listdir(staging))}
+            checksum = _combined_checksum(files)
+            created_at = datetime.now(timezone.utc)
+            # Timestamp first so versions sort chronologically
+            version = f"{created_at:%Y%m%dT%H%M%S%f}-{checksum[:8]}"
+
+            manifest = {
+                'version': version,
+                'created_at': created_at.isoformat(),
+                'files': files,
+                'checksum': checksum,
+                'metadata': metadata or {},
+            }
+            with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            os.rename(staging, self.version_path(version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self.activate(version)
+        self.prune(keep)
+        return version
+
+    def activate(self, version):
+        """Atomically point CURRENT at an existing version (also used for rollbacks)"""
+        if not os.path.isdir(self.version_path(version)):
+            raise ValueError(f"Unknown model version: {version}")
+
+        fd, tmp_path = tempfile.mkstemp(prefix='.pointer-', dir=self.root)
+        with os.fdopen(fd, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+
+    def prune(self, keep=5):
+        """
+        Delete old versions, always keeping the current one. Workers still
+        serving a pruned version are unaffected: a loaded snapshot holds its
+        artifact files open (see DrugShortagePredictor._load_bundle).
+        """
+        current = self.current_version()
+        stale = [v for v in self.list_versions() if v != current][:-keep or None]
+        for version in stale:
+            shutil.rmtree(self.version_path(version), ignore_errors=True)
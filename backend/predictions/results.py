@@ -0,0 +1,168 @@
+# Drug/backend/predictions/results.py
+import json
+import math
+import uuid
+
+import numpy as np
+from django.conf import settings
+
+from .cache import LRUCache, RedisTier
+
+# Redis payload: MAGIC, a 4-byte header length, a JSON header, then the raw
+# bytes of every numeric array. Nothing is unpickled, so a forged entry can
+# at worst fail to decode.
+FORMAT = 1
+MAGIC = b'SRS1'
+ARRAY_FIELDS = ['hospital_ids', 'medicine_ids', 'probabilities', 'days_of_supply', 'inventory_ids']
+# bool, int, uint and float arrays are stored as raw bytes
+NUMERIC_KINDS = 'biuf'
+# Rough per-item size of object arrays (client-supplied IDs), for the LRU byte budget
+OBJECT_ITEM_BYTES = 64
+
+
+def encode_entry(entry):
+    """Redis form of a stored result entry (owner, top_k and its ScoreSet)"""
+    scores = entry['scores']
+    header = {
+        'format': FORMAT,
+        'owner_id': entry['owner_id'],
+        'top_k': entry['top_k'],
+        'version': scores.version,
+        'horizons': list(scores.horizons),
+        'arrays': {},
+    }
+    buffers, offset = [], 0
+    for name in ARRAY_FIELDS:
+        array = getattr(scores, name)
+        if array is None:
+            header['arrays'][name] = None
+        elif array.dtype.kind in NUMERIC_KINDS:
+            data = np.ascontiguousarray(array).tobytes()
+            header['arrays'][name] = {
+                'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset, 'nbytes': len(data),
+            }
+            buffers.append(data)
+            offset += len(data)
+        else:
+            # Client-supplied IDs are whatever JSON values the caller sent
+            header['arrays'][name] = {'values': array.tolist()}
+    head = json.dumps(header).encode()
+    return MAGIC + len(head).to_bytes(4, 'big') + head + b''.join(buffers)
+
+
+def decode_entry(raw):
+    """Inverse of encode_entry; raises ValueError for anything it did not write"""
+    from .scoring import ScoreSet
+
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a stored result')
+    start = len(MAGIC) + 4
+    end = start + int.from_bytes(raw[len(MAGIC):start], 'big')
+    header = json.loads(raw[start:end])
+    if header.get('format') != FORMAT:
+        raise ValueError(f"Unsupported result format {header.get('format')}")
+    body = memoryview(raw)[end:]
+
+    arrays = {}
+    for name in ARRAY_FIELDS:
+        spec = header['arrays'].get(name)
+        if spec is None:
+            arrays[name] = None
+        elif 'values' in spec:
+            arrays[name] = np.fromiter(spec['values'], dtype=object, count=len(spec['values']))
+        else:
+            dtype = np.dtype(spec['dtype'])
+            if dtype.kind not in NUMERIC_KINDS:
+                raise ValueError(f'Unexpected dtype {dtype} for {name}')
+            count = math.prod(spec['shape'])
+            if count * dtype.itemsize != spec['nbytes']:
+                raise ValueError(f'Size mismatch for {name}')
+            arrays[name] = np.frombuffer(body, dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+
+    scores = ScoreSet(
+        header['version'], arrays['hospital_ids'], arrays['medicine_ids'], arrays['probabilities'],
+        arrays['days_of_supply'], inventory_ids=arrays['inventory_ids'], horizons=header['horizons'],
+    )
+    return {'owner_id': header['owner_id'], 'top_k': header['top_k'], 'scores': scores}
+
+
+def entry_nbytes(entry):
+    """Approximate memory held by a stored entry's arrays"""
+    total = 0
+    for name in ARRAY_FIELDS:
+        array = getattr(entry['scores'], name)
+        if array is not None:
+            total += array.nbytes if array.dtype.kind in NUMERIC_KINDS else array.size * OBJECT_ITEM_BYTES
+    return total
+
+
+class ResultStore:
+    """
+    Short-lived store of scored result sets, so clients can page through a
+    batch or network run by handle instead of rescoring it.
+
+    Entries live in a per-worker LRU bounded by count and bytes and, when
+    PREDICTION_CACHE_REDIS_URL is set, in Redis too (see encode_entry) so
+    any worker can serve the next page. A handle is only readable by the
+    user who created it.
+    """
+
+    KEY_PREFIX = 'shortage-result'
+
+    def __init__(self, max_size=20, ttl=900, redis_url='', max_bytes=64 * 2 ** 20):
+        self.local = LRUCache(max_size, ttl, max_bytes=max_bytes, sizeof=entry_nbytes)
+        self.ttl = ttl
+        self.redis = RedisTier(redis_url)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_size=getattr(settings, 'PREDICTION_RESULT_CACHE_SIZE', 20),
+            ttl=getattr(settings, 'PREDICTION_RESULT_TTL', 900),
+            redis_url=getattr(settings, 'PREDICTION_CACHE_REDIS_URL', ''),
+            max_bytes=getattr(settings, 'PREDICTION_RESULT_CACHE_MB', 64) * 2 ** 20,
+        )
+
+    def _key(self, handle):
+        return f"{self.KEY_PREFIX}:{handle}"
+
+    def save(self, scores, owner_id, top_k=None):
+        """Store a ScoreSet and return its handle"""
+        handle = uuid.uuid4().hex
+        entry = {'owner_id': owner_id, 'top_k': top_k, 'scores': scores}
+        self.local.set(self._key(handle), entry)
+
+        client = self.redis.client()
+        if client is not None:
+            try:
+                client.set(self._key(handle), encode_entry(entry), ex=int(self.ttl))
+            except Exception:
+                self.redis.failed()
+        return handle
+
+    def load(self, handle, owner_id):
+        """The stored entry for `handle`, or None if unknown, expired or not the owner's"""
+        entry = self.local.get(self._key(handle))
+
+        client = self.redis.client() if entry is None else None
+        if client is not None:
+            try:
+                raw = client.get(self._key(handle))
+            except Exception:
+                self.redis.failed()
+                raw = None
+            if raw is not None:
+                try:
+                    entry = decode_entry(raw)
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️  Ignoring unreadable stored result {handle}: {e}")
+                    entry = None
+                else:
+                    self.local.set(self._key(handle), entry)
+
+        if entry is None or entry['owner_id'] != owner_id:
+            return None
+        return entry
+
+
+result_store = ResultStore.from_settings()
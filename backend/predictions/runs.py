@@ -0,0 +1,175 @@
+# Drug/backend/predictions/runs.py
+import time
+
+import numpy as np
+
+from .forecaster import RISK_LEVELS, risk_indices
+from .scoring import DEFAULT_CHUNK_SIZE, changed_inventories, inventory_scope, score_inventories
+
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_RUNS_KEPT = 30
+
+
+def result_objects(run, scores, indices):
+    """Unsaved PredictionResult rows for the given rows of `scores`"""
+    from .models import PredictionResult
+
+    levels = np.array(RISK_LEVELS)[risk_indices(scores.primary[indices])]
+    return [
+        PredictionResult(
+            run_id=run.id,
+            inventory_id=int(scores.inventory_ids[i]),
+            hospital_id=int(scores.hospital_ids[i]),
+            medicine_id=int(scores.medicine_ids[i]),
+            shortage_probability=float(scores.primary[i]),
+            risk_level=level,
+            days_of_supply=float(scores.days_of_supply[i]),
+        )
+        for i, level in zip(indices, levels)
+    ]
+
+
+def save_run(scores, hospital_id=None, state=None, batch_size=None, scoring_seconds=0.0, watermark=None,
+             log=print):
+    """
+    Persist a database ScoreSet (see scoring.score_inventories) as a
+    PredictionRun. Results are inserted batch_size rows at a time, building
+    only one batch of model objects at once. The run only counts as the
+    latest once completed_at is set, after its last batch; a run that fails
+    part-way is deleted. `watermark` (data_watermark, read before scoring)
+    lets rescore_changed bring the run up to date later. Older runs of the
+    same scope beyond PREDICTION_RUNS_KEPT are pruned. Returns the run.
+    """
+    from django.conf import settings
+    from django.utils import timezone
+    from .models import PredictionResult, PredictionRun
+
+    batch_size = batch_size or getattr(settings, 'PREDICTION_RUN_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    started = time.perf_counter()
+    run = PredictionRun.objects.create(
+        model_version=scores.version or '',
+        hospital_id=hospital_id,
+        state=state or '',
+        total=len(scores),
+        risk_summary=scores.risk_summary(),
+        watermark=watermark or {},
+    )
+
+    try:
+        for offset in range(0, len(scores), batch_size):
+            indices = np.arange(offset, min(offset + batch_size, len(scores)))
+            PredictionResult.objects.bulk_create(result_objects(run, scores, indices))
+    except Exception:
+        run.delete()
+        raise
+
+    written = time.perf_counter() - started
+    run.seconds = round(scoring_seconds + written, 3)
+    run.completed_at = timezone.now()
+    run.save(update_fields=['seconds', 'completed_at'])
+
+    prune_runs(hospital_id, state, getattr(settings, 'PREDICTION_RUNS_KEPT', DEFAULT_RUNS_KEPT))
+    log(f"💾 Saved prediction run {run.id}: {len(scores)} results in {written:.2f}s")
+    return run
+
+
+def prune_runs(hospital_id=None, state=None, kept=DEFAULT_RUNS_KEPT):
+    """Delete the completed runs of a scope beyond the newest `kept`"""
+    from .models import PredictionRun
+
+    stale = PredictionRun.objects.filter(
+        hospital_id=hospital_id, state=state or '', completed_at__isnull=False
+    ).order_by('-completed_at').values_list('id', flat=True)[kept:]
+    return PredictionRun.objects.filter(id__in=list(stale)).delete()[0]
+
+
+def record_run(predictor, hospital_id=None, state=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, log=print):
+    """Score a scope (see sharding.score_inventories_sharded) and save it as a PredictionRun"""
+    from .sharding import score_inventories_sharded
+
+    started = time.perf_counter()
+    # Read before scoring, so rows changed while scoring are picked up by the next rescore
+    watermark = predictor.data_watermark()
+    scores = score_inventories_sharded(
+        predictor, hospital_id=hospital_id, state=state, workers=workers, chunk_size=chunk_size
+    )
+    return save_run(
+        scores, hospital_id, state, scoring_seconds=time.perf_counter() - started, watermark=watermark, log=log
+    )
+
+
+def merge_results(run, scores, watermark, batch_size=None):
+    """
+    Replace the results of the rescored inventories in `run` and move its
+    watermark forward, in one transaction so readers see the run either
+    before or after the merge
+    """
+    from django.conf import settings
+    from django.db import transaction
+    from django.db.models import Count
+    from django.utils import timezone
+    from .models import PredictionResult, PredictionRun
+
+    batch_size = batch_size or getattr(settings, 'PREDICTION_RUN_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    with transaction.atomic():
+        for offset in range(0, len(scores), batch_size):
+            indices = np.arange(offset, min(offset + batch_size, len(scores)))
+            run.results.filter(inventory_id__in=scores.inventory_ids[indices].tolist()).delete()
+            PredictionResult.objects.bulk_create(result_objects(run, scores, indices))
+
+        # Recounted from the (run, risk_level, ...) index, so deleted inventories drop out of the totals too
+        counts = dict(run.results.values_list('risk_level').annotate(count=Count('id')).order_by())
+        run.risk_summary = {level: counts.get(level, 0) for level in RISK_LEVELS}
+        run.total = sum(counts.values())
+        run.watermark = watermark or {}
+        run.rescored += len(scores)
+        run.updated_at = timezone.now()
+        run.save(update_fields=['risk_summary', 'total', 'watermark', 'rescored', 'updated_at'])
+    return PredictionRun.objects.get(id=run.id)
+
+
+def rescore_changed(predictor, hospital_id=None, state=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, log=print):
+    """
+    Bring the latest run of a scope up to date by rescoring only the
+    inventories updated, given new transactions or re-forecast since its
+    watermark (see scoring.changed_inventories), so the cost follows the
+    number of changes rather than the size of the network. Without a
+    watermarked run of the current model version a full run is recorded
+    instead. Returns (run, rows rescored).
+    """
+    from .models import PredictionRun
+
+    run = PredictionRun.objects.filter(
+        hospital_id=hospital_id, state=state or '', completed_at__isnull=False
+    ).order_by('-completed_at').first()
+    version = predictor.serving_snapshot().version
+    if run is None or not run.watermark or run.model_version != (version or ''):
+        log("⚠️  No watermarked run of the serving model for this scope; recording a full run")
+        run = record_run(predictor, hospital_id, state, workers, chunk_size, log)
+        return run, run.total
+
+    started = time.perf_counter()
+    watermark = predictor.data_watermark()
+    changed = changed_inventories(inventory_scope(hospital_id, state), run.watermark)
+    scores = score_inventories(predictor, changed, chunk_size)
+    scored = time.perf_counter()
+    run = merge_results(run, scores, watermark)
+    log(
+        f"🔄 Rescored {len(scores)} changed inventories into run {run.id}: "
+        f"score {scored - started:.2f}s, merge {time.perf_counter() - scored:.2f}s"
+    )
+    return run, len(scores)
+
+
+def latest_run(hospital_id=None):
+    """
+    The most recently completed network-wide run; with hospital_id, the most
+    recent one covering that hospital (network-wide or scoped to it)
+    """
+    from django.db.models import Q
+    from .models import PredictionRun
+
+    covering = Q(hospital__isnull=True, state='')
+    if hospital_id is not None:
+        covering |= Q(hospital_id=hospital_id)
+    return PredictionRun.objects.filter(covering, completed_at__isnull=False).order_by('-completed_at').first()
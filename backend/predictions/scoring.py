@@ -0,0 +1,201 @@
+# Drug/backend/predictions/scoring.py
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+
+from .consumption import FORECAST_COLUMNS
+from .forecaster import DEFAULT_HORIZONS, RISK_LEVELS, primary_probabilities, risk_indices, top_k_indices
+
+# Inventory columns (joined to Hospital and Medicine) read for server-side scoring
+SCORING_FIELDS = [
+    'id', 'hospital_id', 'medicine_id',
+    'current_stock', 'average_daily_usage', 'reorder_level', 'last_updated',
+    'medicine__category', 'hospital__hospital_type', 'hospital__bed_capacity',
+    'consumption_forecast__forecast_7d', 'consumption_forecast__forecast_14d',
+    'consumption_forecast__forecast_30d',
+]
+# Matching names in the raw-input format create_features expects
+SCORING_COLUMNS = [
+    'inventory_id', 'hospital_id', 'medicine_id',
+    'current_stock', 'daily_consumption', 'reorder_level', 'last_updated',
+    'drug_category', 'hospital_type', 'hospital_bed_count',
+    'forecast_7d', 'forecast_14d', 'forecast_30d',
+]
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def inventory_scope(hospital_id=None, state=None):
+    """Inventory rows for one hospital, one state, or the whole network"""
+    from hospitals.models import Inventory
+
+    queryset = Inventory.objects.all()
+    if hospital_id is not None:
+        queryset = queryset.filter(hospital_id=hospital_id)
+    if state:
+        queryset = queryset.filter(hospital__state__iexact=state)
+    # Primary-key order keeps chunked reads cheap and results reproducible
+    return queryset.order_by('id')
+
+
+def changed_inventories(queryset, watermark, forecasts=True):
+    """
+    The rows of `queryset` updated, given new transactions or (with
+    forecasts) a refreshed consumption forecast after `watermark`
+    (DrugShortagePredictor.data_watermark); every row if nothing had been
+    recorded yet
+    """
+    from django.db.models import Q
+    from hospitals.models import Inventory, InventoryTransaction
+    from .models import ConsumptionForecast
+
+    if not watermark or not watermark.get('inventory_last_updated'):
+        return queryset
+
+    # One indexed ID subquery per source, so the database never scans every inventory
+    since = datetime.fromisoformat(watermark['inventory_last_updated'])
+    changed = Q(id__in=Inventory.objects.filter(last_updated__gt=since).values('id'))
+    # No transactions or forecasts at the watermark: every one there is now is new
+    transactions = InventoryTransaction.objects.all()
+    if watermark.get('transaction_date'):
+        transactions = transactions.filter(transaction_date__gt=datetime.fromisoformat(watermark['transaction_date']))
+    changed |= Q(id__in=transactions.values('inventory_id'))
+    if forecasts:
+        refreshed = ConsumptionForecast.objects.all()
+        if watermark.get('forecasts_generated_at'):
+            refreshed = refreshed.filter(generated_at__gt=datetime.fromisoformat(watermark['forecasts_generated_at']))
+        changed |= Q(id__in=refreshed.values('inventory_id'))
+    return queryset.filter(changed)
+
+
+def inventory_frame(rows):
+    """
+    Build a raw-input frame from values_list rows, applying the same
+    defaults prepare_training_data uses for training
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(rows, columns=SCORING_COLUMNS)
+    df['current_stock'] = df['current_stock'].fillna(0).astype(float)
+    df['daily_consumption'] = df['daily_consumption'].astype(float).fillna(0)
+    df['reorder_level'] = df['reorder_level'].fillna(0).replace(0, 50).astype(float)
+    df['hospital_bed_count'] = df['hospital_bed_count'].fillna(0).replace(0, 100)
+    for column in FORECAST_COLUMNS:
+        df[column] = df[column].astype(float)
+    return df
+
+
+def iter_inventory_frames(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a queryset as raw-input frames of at most chunk_size rows,
+    without instantiating model objects
+    """
+    rows = queryset.values_list(*SCORING_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield inventory_frame(chunk)
+
+
+class ScoreSet:
+    """
+    Scores for a set of inventory items, kept as flat arrays so ranking,
+    paging and risk counts never build a dict per row. Database scoring has
+    inventory IDs; client-supplied batches only carry whatever hospital and
+    medicine IDs the caller sent (inventory_ids is None). Multi-horizon
+    models give probabilities one column per horizon.
+    """
+
+    def __init__(self, version, hospital_ids, medicine_ids, probabilities, days_of_supply, inventory_ids=None,
+                 horizons=None):
+        self.version = version
+        self.inventory_ids = inventory_ids
+        self.hospital_ids = hospital_ids
+        self.medicine_ids = medicine_ids
+        self.probabilities = probabilities
+        self.days_of_supply = days_of_supply
+        self.horizons = list(horizons or DEFAULT_HORIZONS)
+
+    @classmethod
+    def from_items(cls, predictor, inventory_list, snapshot=None):
+        """Score client-supplied inventory dicts; returns (ScoreSet, errors)"""
+        snapshot = snapshot or predictor.serving_snapshot()
+        positions, probabilities, days_of_supply, errors = predictor.score_items(inventory_list, snapshot)
+        scores = cls(
+            snapshot.version,
+            np.array([inventory_list[i].get('hospital_id') for i in positions], dtype=object),
+            np.array([inventory_list[i].get('medicine_id') for i in positions], dtype=object),
+            np.asarray(probabilities, dtype=np.float32),
+            np.asarray(days_of_supply, dtype=np.float64),
+            horizons=snapshot.horizons,
+        )
+        return scores, errors
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    @property
+    def primary(self):
+        """Probabilities for the shortest horizon, which set risk levels and ranking"""
+        return primary_probabilities(self.probabilities)
+
+    def risk_summary(self):
+        counts = np.bincount(risk_indices(self.primary), minlength=len(RISK_LEVELS))
+        return {level: int(count) for level, count in zip(RISK_LEVELS, counts)}
+
+    def ranking(self, top_k=None):
+        """
+        Row indices ordered by shortage probability, highest first (stable).
+        With top_k, only the first top_k of that order, found by partial selection.
+        """
+        return top_k_indices(self.primary, top_k)
+
+    def to_predictions(self, predictor, indices):
+        """Prediction dicts (same shape as batch_predict) for the given rows"""
+        indices = np.asarray(indices, dtype=np.intp)
+        predictions = predictor._format_predictions(
+            self.probabilities[indices], self.days_of_supply[indices], self.horizons
+        )
+        for pred, i in zip(predictions, indices):
+            if self.inventory_ids is not None:
+                pred['inventory_id'] = int(self.inventory_ids[i])
+            pred['medicine_id'] = _plain(self.medicine_ids[i])
+            pred['hospital_id'] = _plain(self.hospital_ids[i])
+        return predictions
+
+
+def _plain(value):
+    """numpy scalars -> Python values so results stay JSON-serializable"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def score_inventories(predictor, queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Score every inventory in `queryset`, one vectorized pass per chunk.
+    All chunks use the same model snapshot even if a new version lands mid-run.
+    """
+    snapshot = predictor.serving_snapshot()
+
+    ids, hospitals, medicines, probabilities, days = [], [], [], [], []
+    for df in iter_inventory_frames(queryset, chunk_size):
+        chunk_probabilities, chunk_days = predictor.score_frame(df, snapshot)
+        ids.append(df['inventory_id'].to_numpy(dtype=np.int64))
+        hospitals.append(df['hospital_id'].to_numpy(dtype=np.int64))
+        medicines.append(df['medicine_id'].to_numpy(dtype=np.int64))
+        probabilities.append(np.asarray(chunk_probabilities, dtype=np.float32))
+        days.append(np.asarray(chunk_days, dtype=np.float64))
+
+    def merge(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return ScoreSet(
+        snapshot.version,
+        merge(hospitals, np.int64),
+        merge(medicines, np.int64),
+        merge(probabilities, np.float32),
+        merge(days, np.float64),
+        inventory_ids=merge(ids, np.int64),
+        horizons=snapshot.horizons,
+    )
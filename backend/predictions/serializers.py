@@ -0,0 +1,48 @@
+from rest_framework import serializers
+from .models import PredictionResult, PredictionRun, TrainingJob
+
+
+class TrainingJobSerializer(serializers.ModelSerializer):
+    requested_by_name = serializers.CharField(source='requested_by.get_full_name', read_only=True)
+    
+    class Meta:
+        model = TrainingJob
+        fields = '__all__'
+        read_only_fields = [
+            'status', 'progress', 'current_step', 'steps', 'metrics', 'error', 'model_version',
+            'task_id', 'cancel_requested', 'requested_by', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+        ]
+    
+    def validate_options(self, value):
+        allowed = {'folds', 'workers', 'n_iter', 'tolerance', 'horizons'}
+        if not isinstance(value, dict) or set(value) - allowed:
+            raise serializers.ValidationError(f"options may only contain {', '.join(sorted(allowed))}")
+        for key in ('folds', 'workers', 'n_iter'):
+            if key in value and (not isinstance(value[key], int) or value[key] < (2 if key == 'folds' else 1)):
+                raise serializers.ValidationError(f'{key} must be a positive integer (folds at least 2)')
+        if 'tolerance' in value and (not isinstance(value['tolerance'], (int, float)) or value['tolerance'] < 0):
+            raise serializers.ValidationError('tolerance must be a non-negative number')
+        if 'horizons' in value and (
+            not isinstance(value['horizons'], list) or not value['horizons']
+            or not all(isinstance(h, int) and h > 0 for h in value['horizons'])
+        ):
+            raise serializers.ValidationError('horizons must be a non-empty list of positive day counts')
+        return value
+
+
+class PredictionRunSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PredictionRun
+        fields = '__all__'
+
+
+class PredictionResultSerializer(serializers.ModelSerializer):
+    medicine_name = serializers.CharField(source='medicine.name', read_only=True)
+    hospital_name = serializers.CharField(source='hospital.name', read_only=True)
+    
+    class Meta:
+        model = PredictionResult
+        fields = [
+            'inventory', 'hospital', 'hospital_name', 'medicine', 'medicine_name',
+            'shortage_probability', 'risk_level', 'days_of_supply'
+        ]
@@ -0,0 +1,113 @@
+# Drug/backend/predictions/sharding.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.db.models import Count
+
+from .scoring import DEFAULT_CHUNK_SIZE, ScoreSet, inventory_scope, score_inventories
+
+# Shards per worker process; more, smaller shards even out uneven hospitals
+SHARDS_PER_WORKER = 4
+
+# Per-process predictor, loaded once by the pool initializer
+_worker_predictor = None
+
+
+def hospital_shards(queryset, num_shards):
+    """
+    Split a scope into contiguous hospital ID ranges [(first_id, last_id), ...]
+    holding roughly the same number of inventory rows each
+    """
+    counts = list(
+        queryset.order_by('hospital_id').values('hospital_id')
+        .annotate(rows=Count('id')).values_list('hospital_id', 'rows')
+    )
+    if not counts:
+        return []
+
+    target = sum(rows for _, rows in counts) / max(num_shards, 1)
+    shards, first_id, filled = [], None, 0
+    for hospital_id, rows in counts:
+        if first_id is None:
+            first_id = hospital_id
+        filled += rows
+        if filled >= target * (len(shards) + 1) and len(shards) < num_shards - 1:
+            shards.append((first_id, hospital_id))
+            first_id = None
+    if first_id is not None:
+        shards.append((first_id, counts[-1][0]))
+    return shards
+
+
+def _init_worker(model_path, version):
+    """Load the model once per worker process, pinned to the parent's version"""
+    global _worker_predictor
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        # Spawned (not forked) workers start without Django configured
+        django.setup()
+
+    from .cache import PredictionCache
+    from .forecaster import DrugShortagePredictor
+
+    predictor = DrugShortagePredictor()
+    predictor.model_path = model_path
+    predictor.cache = PredictionCache(max_size=0)
+    predictor.poll_interval = float('inf')
+    if not predictor.load_model(version):
+        raise RuntimeError(f"Worker {os.getpid()} could not load model version {version}")
+
+    # One process per core already; keep xgboost from oversubscribing with threads
+    model = predictor.snapshot.model
+    if hasattr(model, 'get_booster'):
+        model.get_booster().set_param({'nthread': 1})
+    _worker_predictor = predictor
+
+
+def _score_shard(scope, first_id, last_id, chunk_size):
+    queryset = inventory_scope(**scope).filter(hospital_id__gte=first_id, hospital_id__lte=last_id)
+    scores = score_inventories(_worker_predictor, queryset, chunk_size)
+    return (scores.hospital_ids, scores.medicine_ids, scores.probabilities,
+            scores.days_of_supply, scores.inventory_ids)
+
+
+def score_inventories_sharded(predictor, hospital_id=None, state=None, workers=None,
+                              chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Score a scope across a process pool, one hospital ID range per task.
+    Every worker loads the model once and scores its shards with the same
+    model version as the parent; the shard arrays are merged at the end.
+    """
+    from django.db import connections
+
+    workers = workers or os.cpu_count() or 1
+    scope = {'hospital_id': hospital_id, 'state': state}
+    snapshot = predictor.serving_snapshot()
+
+    if workers <= 1:
+        return score_inventories(predictor, inventory_scope(**scope), chunk_size)
+
+    shards = hospital_shards(inventory_scope(**scope), workers * SHARDS_PER_WORKER)
+
+    # Forked workers must open their own database connections
+    connections.close_all()
+
+    parts = []
+    with ProcessPoolExecutor(
+        max_workers=min(workers, max(len(shards), 1)),
+        initializer=_init_worker,
+        initargs=(predictor.model_path, snapshot.version),
+    ) as pool:
+        futures = [pool.submit(_score_shard, scope, first, last, chunk_size) for first, last in shards]
+        for future in futures:
+            parts.append(future.result())
+
+    columns = list(zip(*parts)) if parts else [[]] * 5
+    dtypes = [np.int64, np.int64, np.float32, np.float64, np.int64]
+    merged = [
+        np.concatenate(column) if len(column) else np.empty(0, dtype=dtype)
+        for column, dtype in zip(columns, dtypes)
+    ]
+    return ScoreSet(snapshot.version, *merged, horizons=snapshot.horizons)
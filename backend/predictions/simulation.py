@@ -0,0 +1,241 @@
+# Drug/backend/predictions/simulation.py
+import time
+
+import numpy as np
+
+DEFAULT_PATHS = 1000
+DEFAULT_DAYS = 30
+# Working memory for one chunk of inventories × paths × days
+DEFAULT_MEMORY_MB = 256
+# Daily demand spread (std / mean) for inventories without a ledger forecast
+DEFAULT_DEMAND_CV = 0.5
+# Replenishment lead time: mean days from order to delivery, and its spread
+DEFAULT_LEAD_TIME_DAYS = 7
+DEFAULT_LEAD_TIME_CV = 0.5
+# Lowest demand spread simulated; a perfectly regular ledger still varies a little
+MIN_DEMAND_CV = 0.05
+# float32 demand plus one bool scratch array per cell
+BYTES_PER_CELL = 5
+
+# Inventory columns (joined to the consumption forecast) read for a simulation
+SIMULATION_FIELDS = [
+    'id', 'hospital_id', 'medicine_id',
+    'current_stock', 'reorder_level', 'max_capacity', 'average_daily_usage',
+    'consumption_forecast__forecast_7d', 'consumption_forecast__forecast_14d',
+    'consumption_forecast__forecast_30d', 'consumption_forecast__residual_std',
+]
+
+
+class StockoutSimulation:
+    """
+    Simulated stockout risk for a set of inventories: stockout_probability[i, d]
+    is P(inventory i has run out by the end of day d + 1), expected_shortage[i]
+    the mean over paths of the largest unmet demand within the horizon (units
+    that would have to be redistributed to avoid running out).
+    """
+
+    def __init__(self, inventory_ids, hospital_ids, medicine_ids, stockout_probability, expected_shortage, paths):
+        self.inventory_ids = inventory_ids
+        self.hospital_ids = hospital_ids
+        self.medicine_ids = medicine_ids
+        self.stockout_probability = stockout_probability  # (inventories, days) float32
+        self.expected_shortage = expected_shortage  # (inventories,) float64
+        self.paths = paths
+
+    def __len__(self):
+        return len(self.inventory_ids)
+
+    @property
+    def days(self):
+        return self.stockout_probability.shape[1]
+
+    def stockout_day(self, probability=0.5):
+        """Days until P(stockout) first reaches `probability` (NaN beyond the horizon)"""
+        reached = self.stockout_probability >= probability
+        return np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, np.nan)
+
+    def ranking(self):
+        """
+        Row indices by probability of running out within the horizon, highest
+        first; ties go to the earlier stockout (more expected days out of stock)
+        """
+        return np.lexsort((-self.stockout_probability.sum(axis=1), -self.stockout_probability[:, -1]))
+
+    def to_rows(self, indices):
+        median = self.stockout_day(0.5)
+        rows = []
+        for i in np.asarray(indices, dtype=np.intp):
+            rows.append({
+                'inventory_id': int(self.inventory_ids[i]),
+                'hospital_id': int(self.hospital_ids[i]),
+                'medicine_id': int(self.medicine_ids[i]),
+                'stockout_probability': [round(float(p), 4) for p in self.stockout_probability[i]],
+                'median_stockout_day': None if np.isnan(median[i]) else int(median[i]),
+                'expected_shortage': float(self.expected_shortage[i]),
+            })
+        return rows
+
+
+def daily_demand_means(daily_consumption, forecast_7d, forecast_14d, forecast_30d, days=DEFAULT_DAYS):
+    """
+    (inventories, days) expected demand on each future day: the average rate
+    between the 7, 14 and 30 day forecast totals (and the 30-day rate after
+    that) where there is a forecast, else the flat daily consumption
+    """
+    daily = np.asarray(daily_consumption, dtype=np.float64)
+    f7, f14, f30 = (np.asarray(f, dtype=np.float64) for f in (forecast_7d, forecast_14d, forecast_30d))
+    day = np.arange(days)
+    rates = np.select(
+        [day < 7, day < 14, day < 30],
+        [f7[:, None] / 7, (f14 - f7)[:, None] / 7, (f30 - f14)[:, None] / 16],
+        f30[:, None] / 30,
+    )
+    rates = np.where(np.isnan(f7)[:, None], daily[:, None], rates)
+    return np.maximum(rates, 0.0)
+
+
+def demand_cv(residual_std, forecast_7d, default=DEFAULT_DEMAND_CV):
+    """Per-inventory spread of daily demand relative to its mean, from the forecast residuals"""
+    mean = np.asarray(forecast_7d, dtype=np.float64) / 7
+    residual_std = np.asarray(residual_std, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = residual_std / mean
+    cv = np.where(np.isfinite(cv) & (residual_std > 0), cv, default)
+    return np.maximum(cv, MIN_DEMAND_CV)
+
+
+def _lognormal_params(cv):
+    """Log-space sigma and mean shift of a lognormal with unit mean and the given cv"""
+    sigma = np.sqrt(np.log1p(np.square(cv)))
+    return sigma, -0.5 * np.square(sigma)
+
+
+def simulate_stockouts(stock, reorder_level, order_quantity, mean_demand, cv, paths=DEFAULT_PATHS, seed=None,
+                       lead_time_days=DEFAULT_LEAD_TIME_DAYS, lead_time_cv=DEFAULT_LEAD_TIME_CV,
+                       memory_mb=DEFAULT_MEMORY_MB):
+    """
+    Monte Carlo stockout simulation. Each path draws lognormal daily demand
+    (mean `mean_demand[i, d]`, spread `cv[i]`), places one order of
+    `order_quantity` once stock falls to the reorder level and receives it
+    after a lognormal lead time; unmet demand is backordered.
+
+    Inventories are processed in chunks whose (chunk, paths, days) float32
+    demand array fits in `memory_mb`; the buffer is allocated once and
+    refilled in place, so memory stays flat however many inventories there
+    are. Cumulative demand never decreases, so the reorder day, first
+    stockout day and peak backlog of every path are counts or single
+    gathers along the day axis rather than a day-by-day loop.
+
+    Returns ((inventories, days) P(stockout by day d), (inventories,)
+    expected peak backlog). The same seed and memory_mb give the same result.
+    """
+    mean_demand = np.asarray(mean_demand, dtype=np.float32)
+    count, days = mean_demand.shape
+    stock, reorder_level, order_quantity, cv = (
+        np.broadcast_to(np.asarray(values, dtype=np.float32), (count,))
+        for values in (stock, reorder_level, order_quantity, cv)
+    )
+    rng = np.random.default_rng(seed)
+
+    chunk = int(max(1, min(count, memory_mb * 2 ** 20 // (paths * days * BYTES_PER_CELL))))
+    buffer = np.empty((chunk, paths, days), dtype=np.float32)
+    below = np.empty((chunk, paths, days), dtype=bool)
+
+    sigma, shift = _lognormal_params(cv)
+    lead_sigma, lead_shift = _lognormal_params(lead_time_cv)
+
+    probabilities = np.empty((count, days), dtype=np.float32)
+    expected_shortage = np.empty(count, dtype=np.float64)
+    for start in range(0, count, chunk):
+        stop = min(start + chunk, count)
+        rows = stop - start
+        demand, scratch = buffer[:rows], below[:rows]
+
+        # demand = mean * exp(sigma * z + shift), then its running total, all in place
+        rng.standard_normal(dtype=np.float32, out=demand)
+        demand *= sigma[start:stop, None, None]
+        with np.errstate(divide='ignore'):
+            demand += np.log(mean_demand[start:stop])[:, None, :] + shift[start:stop, None, None]
+        np.exp(demand, out=demand)
+        consumed = np.cumsum(demand, axis=2, out=demand)
+
+        level = stock[start:stop, None, None]
+        # Reorder once stock falls to the reorder level (day -1: already there, order now)
+        np.less(consumed, level - reorder_level[start:stop, None, None], out=scratch)
+        ordered = np.where(stock[start:stop, None] <= reorder_level[start:stop, None], -1, scratch.sum(axis=2))
+        lead_time = np.ceil(lead_time_days * np.exp(lead_sigma * rng.standard_normal((rows, paths)) + lead_shift))
+        # Delivered in time for the demand of day `arrival`; never within the horizon if not ordered
+        arrival = np.where(ordered < days, ordered + np.maximum(lead_time, 1), days).astype(np.intp)
+
+        # Before delivery a path runs out once demand exceeds the stock, after it once it exceeds stock + order
+        np.less_equal(consumed, level, out=scratch)
+        runs_out = scratch.sum(axis=2)
+        np.less_equal(consumed, level + order_quantity[start:stop, None, None], out=scratch)
+        runs_out_after = scratch.sum(axis=2)
+        first_stockout = np.where(runs_out < arrival, runs_out, runs_out_after)
+
+        # P(stockout by day d): cumulative histogram of each path's first stockout day (days = never)
+        offsets = (np.arange(rows) * (days + 1))[:, None]
+        counts = np.bincount((offsets + first_stockout).ravel(), minlength=rows * (days + 1))
+        probabilities[start:stop] = np.cumsum(counts.reshape(rows, days + 1)[:, :days], axis=1) / paths
+
+        # Peak backlog: just before delivery, or at the end of the horizon
+        before = np.take_along_axis(consumed, np.clip(arrival - 1, 0, days - 1)[:, :, None], axis=2)[:, :, 0]
+        before = np.where(arrival > 0, before - level[:, :, 0], 0.0)
+        delivered = np.where(arrival < days, order_quantity[start:stop, None], 0.0)
+        after = consumed[:, :, -1] - level[:, :, 0] - delivered
+        expected_shortage[start:stop] = np.maximum(np.maximum(before, after), 0.0).mean(axis=1)
+
+    return probabilities, expected_shortage
+
+
+def simulation_inputs(rows, days=DEFAULT_DAYS, default_cv=DEFAULT_DEMAND_CV):
+    """Arrays for simulate_stockouts from SIMULATION_FIELDS rows"""
+    columns = list(zip(*rows)) if rows else [()] * len(SIMULATION_FIELDS)
+
+    def column(index, fill=0.0):
+        return np.array([fill if value is None else float(value) for value in columns[index]], dtype=np.float64)
+
+    forecasts = [column(7, np.nan), column(8, np.nan), column(9, np.nan)]
+    stock = column(3)
+    reorder_level = column(4)
+    return {
+        'stock': stock,
+        'reorder_level': reorder_level,
+        # Order up to capacity from the reorder level
+        'order_quantity': np.maximum(column(5) - reorder_level, 0.0),
+        'mean_demand': daily_demand_means(column(6), *forecasts, days=days),
+        'cv': demand_cv(column(10), forecasts[0], default_cv),
+    }
+
+
+def simulate_inventories(queryset, paths=None, days=None, seed=None, log=print):
+    """
+    Simulate every inventory in `queryset` (see scoring.inventory_scope),
+    with defaults from the SIMULATION_* settings. Returns a StockoutSimulation.
+    """
+    from django.conf import settings
+
+    paths = paths or getattr(settings, 'SIMULATION_PATHS', DEFAULT_PATHS)
+    days = days or getattr(settings, 'SIMULATION_DAYS', DEFAULT_DAYS)
+
+    started = time.perf_counter()
+    rows = list(queryset.values_list(*SIMULATION_FIELDS))
+    inputs = simulation_inputs(rows, days, getattr(settings, 'SIMULATION_DEMAND_CV', DEFAULT_DEMAND_CV))
+    loaded = time.perf_counter()
+
+    probabilities, expected_shortage = simulate_stockouts(
+        **inputs, paths=paths, seed=seed,
+        lead_time_days=getattr(settings, 'SIMULATION_LEAD_TIME_DAYS', DEFAULT_LEAD_TIME_DAYS),
+        lead_time_cv=getattr(settings, 'SIMULATION_LEAD_TIME_CV', DEFAULT_LEAD_TIME_CV),
+        memory_mb=getattr(settings, 'SIMULATION_MEMORY_MB', DEFAULT_MEMORY_MB),
+    )
+    log(
+        f"🎲 Simulated {len(rows)} inventories × {paths} paths × {days} days: "
+        f"load {loaded - started:.2f}s, simulate {time.perf_counter() - loaded:.2f}s"
+    )
+
+    def ids(index):
+        return np.array([row[index] for row in rows], dtype=np.int64)
+
+    return StockoutSimulation(ids(0), ids(1), ids(2), probabilities, expected_shortage, paths)
@@ -0,0 +1,250 @@
+# Drug/backend/predictions/tasks.py
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TrainingJob
+
+# Celery name of run_training_job (registered in backend/celery.py). Celery is
+# optional and only imported when a job is sent, so web workers and management
+# commands never load it; without it jobs run in a thread (enqueue_training_job).
+TRAINING_TASK_NAME = 'predictions.run_training_job'
+
+
+class TrainingCancelled(Exception):
+    """Raised at a step boundary once a job's cancellation has been requested"""
+
+
+class JobProgress:
+    """
+    The progress callback passed to train_model/tune_model for one job.
+    Records each step's start and duration on the job row, and raises
+    TrainingCancelled when the job has been asked to stop.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.steps = []
+        self._step_started = None
+
+    def __call__(self, step, total, message):
+        now = time.perf_counter()
+        if self.steps:
+            self.steps[-1]['seconds'] = round(now - self._step_started, 3)
+        self._step_started = now
+
+        if TrainingJob.objects.filter(id=self.job_id, cancel_requested=True).exists():
+            raise TrainingCancelled()
+
+        self.steps.append({'step': step, 'message': message, 'started_at': timezone.now().isoformat()})
+        TrainingJob.objects.filter(id=self.job_id).update(
+            progress=(step - 1) / total, current_step=message, steps=self.steps, heartbeat_at=timezone.now()
+        )
+
+    def finish(self):
+        if self.steps and 'seconds' not in self.steps[-1]:
+            self.steps[-1]['seconds'] = round(time.perf_counter() - self._step_started, 3)
+        return self.steps
+
+
+class Heartbeat:
+    """
+    Refreshes a running job's heartbeat_at from a daemon thread, so a job
+    whose process dies mid-step can be told apart from one in a long step
+    (see fail_stale_jobs)
+    """
+
+    def __init__(self, job_id, interval=None):
+        self.job_id = job_id
+        self.interval = interval or settings.TRAINING_JOB_HEARTBEAT_SECONDS
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True, name=f'training-heartbeat-{job_id}')
+
+    def _beat(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    TrainingJob.objects.filter(id=self.job_id).update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    print(f"⚠️  Could not record heartbeat of training job {self.job_id}: {e}")
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def fail_stale_jobs(stale_seconds=None, job_id=None, reason=None, queued=True):
+    """
+    Mark RUNNING jobs whose heartbeat is older than stale_seconds (default
+    TRAINING_JOB_STALE_SECONDS) FAILED: the process running them is gone,
+    so they would otherwise block new jobs forever. On the 'thread' backend
+    a job still QUEUED that long is dead too, since its thread starts at
+    once (skipped with queued=False). Returns the number of jobs failed.
+    """
+    stale_seconds = settings.TRAINING_JOB_STALE_SECONDS if stale_seconds is None else stale_seconds
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=stale_seconds)
+
+    silent = (
+        Q(heartbeat_at__lt=cutoff)
+        | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+        | Q(heartbeat_at__isnull=True, started_at__isnull=True, created_at__lt=cutoff)
+    )
+    stale = Q(status=TrainingJob.Status.RUNNING) & silent
+    if queued and settings.TRAINING_JOB_BACKEND == 'thread':
+        stale |= Q(status=TrainingJob.Status.QUEUED, created_at__lt=cutoff)
+
+    jobs = TrainingJob.objects.filter(stale)
+    if job_id is not None:
+        jobs = jobs.filter(id=job_id)
+    failed = jobs.update(
+        status=TrainingJob.Status.FAILED, finished_at=now,
+        error=reason or f'No heartbeat for {stale_seconds}s; the process running the job stopped',
+    )
+    if failed:
+        print(f"⚠️  Marked {failed} stale training job(s) failed")
+    return failed
+
+
+def unsupported_mode(mode):
+    """Why the configured TRAINING_JOB_BACKEND cannot run a job of `mode`, or None"""
+    if mode == TrainingJob.Mode.TUNE and settings.TRAINING_JOB_BACKEND == 'thread':
+        return (
+            'Tuning starts a process pool and cannot run inside a web worker; '
+            'configure a Celery broker or TRAINING_JOB_BACKEND=eager, or run `manage.py train_model --tune`'
+        )
+    return None
+
+
+def _train(job, progress):
+    """Run the job's training mode; returns (accuracy, predictor)"""
+    from .forecaster import DrugShortagePredictor, predictor_instance
+
+    # A private predictor, so a running job never touches the serving snapshot;
+    # workers pick up the published version through the registry pointer
+    predictor = DrugShortagePredictor()
+    predictor.model_path = predictor_instance.model_path
+    options = job.options or {}
+
+    if job.mode == TrainingJob.Mode.TUNE:
+        accuracy, _ = predictor.tune_model(
+            n_iter=options.get('n_iter'), folds=options.get('folds', 3),
+            workers=options.get('workers'), tolerance=options.get('tolerance'),
+            progress=progress, horizons=options.get('horizons'),
+        )
+    else:
+        accuracy = predictor.train_model(
+            incremental=job.mode == TrainingJob.Mode.INCREMENTAL, progress=progress,
+            horizons=options.get('horizons'),
+        )
+    return accuracy, predictor
+
+
+def run_training_job(job_id):
+    """
+    Execute a queued TrainingJob and record its outcome. Safe to call from a
+    Celery worker, a thread or inline; a job that is no longer queued (e.g.
+    cancelled before a worker picked it up) is left alone.
+    """
+    # Jobs orphaned by a worker that died are failed before a new one starts
+    fail_stale_jobs()
+    now = timezone.now()
+    started = TrainingJob.objects.filter(id=job_id, status=TrainingJob.Status.QUEUED).update(
+        status=TrainingJob.Status.RUNNING, started_at=now, heartbeat_at=now
+    )
+    if not started:
+        return None
+    job = TrainingJob.objects.get(id=job_id)
+    progress = JobProgress(job_id)
+
+    try:
+        with Heartbeat(job_id):
+            accuracy, predictor = _train(job, progress)
+    except TrainingCancelled:
+        print(f"⚠️  Training job {job_id} cancelled")
+        TrainingJob.objects.filter(id=job_id).update(
+            status=TrainingJob.Status.CANCELLED, steps=progress.finish(), finished_at=timezone.now()
+        )
+        return TrainingJob.Status.CANCELLED
+    except Exception as e:
+        print(f"❌ Training job {job_id} failed: {e}")
+        TrainingJob.objects.filter(id=job_id).update(
+            status=TrainingJob.Status.FAILED, error=str(e), steps=progress.finish(), finished_at=timezone.now()
+        )
+        return TrainingJob.Status.FAILED
+
+    # An incremental run with too few changes keeps the current version
+    version = predictor.version or predictor.registry.current_version()
+    metrics = {'accuracy': float(accuracy)}
+    try:
+        metrics.update(predictor.registry.read_manifest(version)['metadata'].get('training', {}))
+    except Exception:
+        pass
+    TrainingJob.objects.filter(id=job_id).update(
+        status=TrainingJob.Status.SUCCEEDED, progress=1.0, current_step='',
+        steps=progress.finish(), metrics=metrics, model_version=version or '',
+        finished_at=timezone.now(),
+    )
+    print(f"✅ Training job {job_id} finished: version {version}, accuracy {accuracy:.2%}")
+    return TrainingJob.Status.SUCCEEDED
+
+
+def _celery_app():
+    """The project's Celery app, or None when Celery is not installed"""
+    try:
+        from backend.celery import app
+    except ImportError:
+        return None
+    return app
+
+
+def _run_in_thread(job_id):
+    try:
+        run_training_job(job_id)
+    finally:
+        # Threads get their own connection; don't leave it open
+        connection.close()
+
+
+def enqueue_training_job(job):
+    """
+    Hand a queued job to the backend named by TRAINING_JOB_BACKEND:
+    'celery' (a worker process), 'thread' (a daemon thread in this process)
+    or 'eager' (run now, before returning; for tests and scripts)
+    """
+    backend = settings.TRAINING_JOB_BACKEND
+    if backend == 'celery':
+        app = _celery_app()
+        if app is None:
+            raise RuntimeError('TRAINING_JOB_BACKEND is celery but Celery is not installed')
+        result = app.send_task(TRAINING_TASK_NAME, args=[job.id])
+        job.task_id = result.id
+        job.save(update_fields=['task_id'])
+    elif backend == 'thread':
+        threading.Thread(target=_run_in_thread, args=(job.id,), daemon=True, name=f'training-job-{job.id}').start()
+    elif backend == 'eager':
+        run_training_job(job.id)
+    else:
+        raise RuntimeError(f'Unknown TRAINING_JOB_BACKEND: {backend}')
+    return job
+
+
+def revoke_training_job(job):
+    """Drop a queued job's Celery message so no worker starts it (best effort)"""
+    app = _celery_app() if job.task_id else None
+    if app is not None:
+        try:
+            app.control.revoke(job.task_id)
+        except Exception as e:
+            print(f"⚠️  Could not revoke task {job.task_id}: {e}")
@@ -1,3 +1,1530 @@
-from django.test import TestCase
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from hospitals.models import Hospital, Inventory, InventoryTransaction
+from medicines.models import Medicine
+
+from . import benchmarks
+from . import consumption
+from .batching import MicroBatcher
+from .bundle import read_bundle, write_bundle
+from .cache import LRUCache, PredictionCache, decode_value, encode_value
+from . import tuning
+from .datasets import TrainingMatrix, add_shortage_target, iter_synthetic_frames, read_inventory_columns, synthetic_training_frame, write_synthetic_parquet
+from .forecaster import BUNDLE_FILE, DrugShortagePredictor, normalize_labels, predictor_instance, top_k_indices
+from .metrics import LATENCY_BUCKETS, Histogram, pipeline_metrics
+from .models import ConsumptionForecast, PredictionResult, PredictionRun, TrainingJob
+from .registry import ModelRegistry
+from .results import ResultStore, decode_entry, encode_entry
+from . import runs
+from .scoring import ScoreSet, inventory_scope, score_inventories
+from .views import MAX_SIMULATION_PATHS, _ndjson_predictions
+from . import sharding
+from . import simulation
+from .tasks import run_training_job
 
 # Create your tests here.
+
+
+def train_test_predictor():
+    """Train a predictor on synthetic data into a throwaway model directory"""
+    predictor = DrugShortagePredictor()
+    predictor.model_path = tempfile.mkdtemp()
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.train_model()
+    return predictor
+
+
+def sample_inventories(count=40):
+    categories = ['ANTIBIOTIC', 'Analgesic', 'VACCINE', None]
+    hospital_types = ['GOVERNMENT', 'PRIVATE', 'Rural']
+    items = []
+    for i in range(count):
+        item = {
+            'medicine_id': i,
+            'hospital_id': i % 7,
+            'current_stock': (i * 37) % 400,
+            'daily_consumption': float((i * 13) % 45 + 1),
+            'reorder_level': (i * 11) % 90 + 10,
+            'hospital_type': hospital_types[i % 3],
+            'hospital_bed_count': [50, 200, 1000][i % 3],
+        }
+        if categories[i % 4]:
+            item['drug_category'] = categories[i % 4]
+        if i % 5:
+            item['last_updated'] = f'2025-{i % 12 + 1:02d}-15T10:00:00+00:00'
+        items.append(item)
+    return items
+
+
+def create_network(hospitals=3, medicines=5):
+    """Hospitals in two states, each stocking every medicine"""
+    categories = ['ANTIBIOTIC', 'ANALGESIC', 'VACCINE', 'DIABETES', 'OTHER']
+    meds = [
+        Medicine.objects.create(
+            name=f'Medicine {m}', generic_name=f'Generic {m}', category=categories[m % 5],
+            manufacturer='Acme', dosage_form='Tablet', strength='500mg'
+        )
+        for m in range(medicines)
+    ]
+    inventories = []
+    for h in range(hospitals):
+        hospital = Hospital.objects.create(
+            name=f'Hospital {h}', registration_number=f'REG{h}', address='1 Main St',
+            city='Pune', state='Maharashtra' if h % 2 == 0 else 'Kerala', pincode='411001',
+            contact_person='Admin', contact_email=f'h{h}@example.com', contact_phone='123',
+            bed_capacity=100 * (h + 1), hospital_type=['GOVERNMENT', 'PRIVATE', 'CHARITABLE'][h % 3]
+        )
+        for m, medicine in enumerate(meds):
+            inventories.append(Inventory.objects.create(
+                hospital=hospital, medicine=medicine,
+                current_stock=(h * 53 + m * 31) % 300, reorder_level=(m * 17) % 80,
+                max_capacity=1000, average_daily_usage=Decimal(f'{(h * 7 + m * 11) % 40 + 1}.50')
+            ))
+    return inventories
+
+
+def inventory_payload(inventory):
+    """The raw-input dict a client would send for an inventory row"""
+    return {
+        'medicine_id': inventory.medicine_id,
+        'hospital_id': inventory.hospital_id,
+        'current_stock': inventory.current_stock,
+        'daily_consumption': float(inventory.average_daily_usage),
+        'reorder_level': inventory.reorder_level or 50,
+        'drug_category': inventory.medicine.category,
+        'hospital_type': inventory.hospital.hospital_type,
+        'hospital_bed_count': inventory.hospital.bed_capacity,
+        'last_updated': inventory.last_updated,
+    }
+
+
+class PredictorTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.predictor = train_test_predictor()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.predictor.model_path, ignore_errors=True)
+        super().tearDownClass()
+
+
+class PredictionApiTestCase(PredictorTestCase):
+    """Points the views' shared predictor at the test model"""
+
+    def setUp(self):
+        self.original_model_path = predictor_instance.model_path
+        predictor_instance.model_path = self.predictor.model_path
+        predictor_instance.snapshot = None
+        predictor_instance.cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        predictor_instance.model_path = self.original_model_path
+        predictor_instance.snapshot = None
+        predictor_instance.cache.clear()
+
+    def login(self, role='HEALTH_AUTHORITY', hospital=None):
+        user = get_user_model().objects.create_user(
+            username=f'{role.lower()}-user', email=f'{role.lower()}@example.com',
+            password='TestPass123!', role=role, hospital=hospital
+        )
+        self.client.force_authenticate(user=user)
+        return user
+
+
+class ImportTimeTests(TestCase):
+    """Processes that never score (migrate, admin, inventory APIs) must not pay for the ML stack"""
+
+    HEAVY_MODULES = ['pandas', 'sklearn', 'xgboost', 'joblib', 'scipy', 'celery']
+    # Seconds to import the predictions URLConf once Django and DRF are loaded
+    IMPORT_BUDGET = 0.5
+
+    def test_urlconf_import_stays_within_budget(self):
+        code = (
+            "import json, sys, time\n"
+            "import django\n"
+            "django.setup()\n"
+            "import rest_framework.views, rest_framework.response\n"
+            "started = time.perf_counter()\n"
+            "import predictions.urls, predictions.forecaster\n"
+            "elapsed = time.perf_counter() - started\n"
+            f"heavy = [m for m in {self.HEAVY_MODULES!r} if m in sys.modules]\n"
+            "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(report['heavy'], [])
+        self.assertLess(report['elapsed'], self.IMPORT_BUDGET)
+
+
+class BatchPredictTests(PredictorTestCase):
+    def test_batch_matches_single_predictions(self):
+        items = sample_inventories()
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = self.predictor.batch_predict(items)
+
+        expected = []
+        for item in items:
+            pred = self.predictor.predict(item)
+            pred['medicine_id'] = item['medicine_id']
+            pred['hospital_id'] = item['hospital_id']
+            expected.append(pred)
+        expected.sort(key=lambda x: x['shortage_probability'], reverse=True)
+
+        self.assertEqual(batch, expected)
+
+    def test_batch_skips_unscorable_items(self):
+        items = sample_inventories(3)
+        del items[0]['reorder_level']
+        items[1]['current_stock'] = 'n/a'
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = self.predictor.batch_predict(items)
+
+        self.assertEqual([p['medicine_id'] for p in batch], [2])
+        self.assertEqual(self.predictor.batch_predict([]), [])
+
+    def test_top_k_is_prefix_of_full_ranking(self):
+        items = sample_inventories()
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = self.predictor.batch_predict(items)
+            top = self.predictor.batch_predict(items, top_k=7)
+        self.assertEqual(top, full[:7])
+
+
+class TopKIndicesTests(TestCase):
+    def test_matches_stable_sort_with_ties(self):
+        rng = np.random.default_rng(0)
+        values = rng.choice([0.1, 0.35, 0.7, 0.9], size=200).astype(np.float32)
+        full = np.argsort(-values, kind='stable')
+        for k in (0, 1, 5, 50, 199, 200, 500):
+            np.testing.assert_array_equal(top_k_indices(values, k), full[:k])
+
+
+class CompiledFeaturePipelineTests(PredictorTestCase):
+    def test_matches_pandas_feature_path(self):
+        items = sample_inventories()
+        df = self.predictor.create_features(pd.DataFrame(items), is_training=False)
+        expected = self.predictor.scaler.transform(df[self.predictor.feature_columns]).astype(np.float32)
+
+        X, days_of_supply = self.predictor.pipeline.transform_many(items)
+
+        np.testing.assert_array_equal(X, expected)
+        np.testing.assert_array_equal(days_of_supply, df['days_of_supply'].to_numpy())
+
+    def test_matches_pandas_feature_path_with_forecasts(self):
+        items = sample_inventories()
+        for i, item in enumerate(items):
+            if i % 3:
+                item.update(forecast_7d=float(i * 5), forecast_14d=float(i * 11), forecast_30d=float(i * 25))
+        df = self.predictor.create_features(pd.DataFrame(items), is_training=False)
+        expected = self.predictor.scaler.transform(df[self.predictor.feature_columns]).astype(np.float32)
+
+        X, days_of_supply = self.predictor.pipeline.transform_many(items)
+
+        np.testing.assert_array_equal(X, expected)
+        np.testing.assert_array_equal(days_of_supply, df['days_of_supply'].to_numpy())
+
+    def test_single_row_defaults(self):
+        X, days_of_supply = self.predictor.pipeline.transform_one(
+            {'current_stock': 10, 'daily_consumption': 5, 'reorder_level': 35}
+        )
+        self.assertEqual(X.shape, (1, len(self.predictor.feature_columns)))
+        self.assertEqual(X.dtype, np.float32)
+        self.assertAlmostEqual(days_of_supply, 10 / 5.01)
+
+
+class TreeEnsembleTests(PredictorTestCase):
+    def test_matches_xgboost_probabilities(self):
+        snapshot = self.predictor.snapshot
+        X = np.vstack([snapshot.pipeline.transform_one(item)[0] for item in sample_inventories(200)])
+        X[::9, 0] = np.nan  # missing values follow each split's default branch
+
+        np.testing.assert_allclose(
+            snapshot.ensemble.predict_proba(X), snapshot.model.predict_proba(X)[:, 1], atol=1e-6
+        )
+
+    def test_exported_with_each_version(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = DrugShortagePredictor()
+            loaded.model_path = self.predictor.model_path
+            loaded.load_model()
+        self.assertEqual(len(loaded.snapshot.ensemble), 200)
+        X = np.random.default_rng(0).normal(size=(50, len(loaded.feature_columns)))
+        np.testing.assert_array_equal(loaded.snapshot.ensemble.predict_proba(X), self.predictor.snapshot.ensemble.predict_proba(X))
+
+    def test_booster_loaded_only_for_large_batches(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = DrugShortagePredictor()
+            loaded.model_path = self.predictor.model_path
+            loaded.load_model()
+        loaded.cache = PredictionCache(max_size=0)
+        snapshot = loaded.snapshot
+        X = np.vstack([snapshot.pipeline.transform_one(item)[0] for item in sample_inventories(100)])
+        X[::7, 0] = np.nan
+        limit = loaded.numpy_max_rows
+
+        below = loaded._infer(snapshot, X[:limit])
+        self.assertFalse(snapshot.model_loaded)
+        with contextlib.redirect_stdout(io.StringIO()):
+            above = loaded._infer(snapshot, X[:limit + 1])
+        self.assertTrue(snapshot.model_loaded)
+
+        # Both paths agree on either side of the threshold
+        expected = snapshot.model.predict_proba(X[:limit + 1])[:, 1]
+        np.testing.assert_allclose(below, expected[:limit], atol=1e-6)
+        np.testing.assert_allclose(above, expected, atol=1e-6)
+        np.testing.assert_allclose(snapshot.ensemble.predict_proba(X[:limit + 1]), above, atol=1e-6)
+        self.assertIs(loaded.model, snapshot.model)
+
+    def test_booster_survives_pruned_version(self):
+        model_path = tempfile.mkdtemp()
+        try:
+            shutil.copytree(self.predictor.model_path, model_path, dirs_exist_ok=True)
+            with contextlib.redirect_stdout(io.StringIO()):
+                loaded = DrugShortagePredictor()
+                loaded.model_path = model_path
+                loaded.load_model()
+            snapshot = loaded.snapshot
+            # Another process publishes and prunes this version before the first large batch
+            shutil.rmtree(loaded.registry.version_path(snapshot.version))
+
+            X = np.vstack([snapshot.pipeline.transform_one(item)[0] for item in sample_inventories(100)])
+            with contextlib.redirect_stdout(io.StringIO()):
+                probabilities = loaded._infer(snapshot, X)
+        finally:
+            shutil.rmtree(model_path, ignore_errors=True)
+
+        np.testing.assert_allclose(probabilities, snapshot.ensemble.predict_proba(X), atol=1e-6)
+
+
+class MultiHorizonTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.predictor = DrugShortagePredictor()
+        cls.predictor.model_path = tempfile.mkdtemp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.predictor.train_model(horizons=[30, 7, 14])
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.predictor.model_path, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_labels_one_column_per_horizon(self):
+        df = add_shortage_target(pd.DataFrame({
+            'current_stock': [10.0, 80.0, 500.0], 'daily_consumption': [5.0, 5.0, 5.0],
+        }), horizons=[7, 14, 30])
+        # Required stock is 1.2x the horizon's demand: 42, 84 and 180 units
+        self.assertEqual(df['shortage_next_7d'].tolist(), [1, 0, 0])
+        self.assertEqual(df['shortage_next_14d'].tolist(), [1, 1, 0])
+        self.assertEqual(df['shortage_next_30d'].tolist(), [1, 1, 0])
+
+    def test_one_booster_scores_every_horizon(self):
+        snapshot = self.predictor.snapshot
+        self.assertEqual(snapshot.horizons, [7, 14, 30])
+        X = np.vstack([snapshot.pipeline.transform_one(item)[0] for item in sample_inventories(200)])
+        X[::9, 0] = np.nan
+
+        expected = snapshot.model.predict_proba(X)
+        self.assertEqual(expected.shape, (200, 3))
+        np.testing.assert_allclose(snapshot.ensemble.predict_proba(X), expected, atol=1e-6)
+        self.predictor.numpy_max_rows = 0
+        np.testing.assert_allclose(self.predictor._infer(snapshot, X), expected, atol=1e-6)
+
+    def test_predictions_list_each_horizon(self):
+        items = sample_inventories(20)
+        with contextlib.redirect_stdout(io.StringIO()):
+            batch = self.predictor.batch_predict(items)
+        single = self.predictor.predict(items[0])
+
+        self.assertEqual(list(single['horizons']), ['7d', '14d', '30d'])
+        self.assertEqual(single['shortage_probability'], single['horizons']['7d']['shortage_probability'])
+        match = next(pred for pred in batch if pred['medicine_id'] == items[0]['medicine_id'])
+        self.assertEqual({key: match[key] for key in single}, single)
+        ranked = [pred['shortage_probability'] for pred in batch]
+        self.assertEqual(ranked, sorted(ranked, reverse=True))
+
+    def test_reloaded_version_keeps_horizons(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = DrugShortagePredictor()
+            loaded.model_path = self.predictor.model_path
+            loaded.load_model()
+        self.assertEqual(loaded.horizons, [7, 14, 30])
+        item = sample_inventories(1)[0]
+        self.assertEqual(loaded.predict(item), self.predictor.predict(item))
+
+    def test_cache_round_trips_horizon_vectors(self):
+        value = np.array([0.25, 0.5, 0.875], dtype=np.float32)
+        np.testing.assert_array_equal(decode_value(encode_value(value).encode()), value)
+        self.assertEqual(decode_value(encode_value(np.float32(0.5)).encode()), np.float32(0.5))
+
+        self.predictor.cache = PredictionCache(max_size=100, ttl=60)
+        items = sample_inventories(6)
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = self.predictor.batch_predict(items[:3])
+            second = self.predictor.batch_predict(items)
+        self.assertEqual(self.predictor.cache.stats()['local_hits'], 3)
+        for pred in first:
+            self.assertIn(pred, second)
+
+
+class WarmUpTests(PredictorTestCase):
+    def test_warm_up_loads_saved_model(self):
+        predictor = DrugShortagePredictor()
+        predictor.model_path = self.predictor.model_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(predictor.warm_up())
+        # Loaded before workers fork, although the warm-up batches are small
+        self.assertTrue(predictor.snapshot.model_loaded)
+        self.assertIsNotNone(predictor.model)
+        self.assertIsNotNone(predictor.pipeline)
+
+    def test_warm_up_without_model(self):
+        predictor = DrugShortagePredictor()
+        predictor.model_path = tempfile.mkdtemp()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertFalse(predictor.warm_up())
+        shutil.rmtree(predictor.model_path)
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def publish(self, payload, **kwargs):
+        def write(directory):
+            with open(f'{directory}/artifact.bin', 'w') as f:
+                f.write(payload)
+        return self.registry.publish(write, **kwargs)
+
+    def test_publish_points_current_at_new_version(self):
+        self.assertIsNone(self.registry.current_version())
+        first = self.publish('one')
+        second = self.publish('two')
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.registry.current_version(), second)
+        self.assertEqual(self.registry.verify(second)['version'], second)
+
+        self.registry.activate(first)
+        self.assertEqual(self.registry.current_version(), first)
+
+    def test_verify_detects_tampering(self):
+        version = self.publish('one')
+        with open(f'{self.registry.version_path(version)}/artifact.bin', 'w') as f:
+            f.write('tampered')
+        with self.assertRaises(ValueError):
+            self.registry.verify(version)
+
+    def test_prune_keeps_current(self):
+        versions = [self.publish(str(i), keep=10) for i in range(4)]
+        self.registry.activate(versions[0])
+        self.registry.prune(keep=1)
+        self.assertEqual(self.registry.list_versions(), [versions[0], versions[3]])
+
+
+class ArtifactBundleTests(PredictorTestCase):
+    def test_round_trip_is_memory_mapped(self):
+        path = f'{tempfile.mkdtemp()}/test.bundle'
+        self.addCleanup(shutil.rmtree, path.rsplit('/', 1)[0])
+        write_bundle(path, {'a': np.arange(5.0), 'names': np.array(['x', 'yz'])}, {'k': 1})
+
+        arrays, metadata = read_bundle(path)
+        np.testing.assert_array_equal(arrays['a'], np.arange(5.0))
+        self.assertEqual(list(arrays['names']), ['x', 'yz'])
+        self.assertEqual(metadata, {'k': 1})
+        self.assertFalse(arrays['a'].flags.writeable)
+
+        with open(path, 'r+b') as f:
+            f.seek(-1, 2)
+            f.write(b'\xff')
+        with self.assertRaises(ValueError):
+            read_bundle(path)
+
+    def test_bundled_version_scores_like_trained_model(self):
+        directory = self.predictor.registry.version_path(self.predictor.version)
+        self.assertTrue(os.path.exists(os.path.join(directory, BUNDLE_FILE)))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = DrugShortagePredictor()
+            loaded.model_path = self.predictor.model_path
+            loaded.cache = PredictionCache(max_size=0)
+            loaded.load_model()
+            items = sample_inventories()
+            self.assertEqual(loaded.batch_predict(items), self.predictor.batch_predict(items))
+            # Single items take the NumPy evaluator; don't compare against batch results cached above
+            self.predictor.cache.clear()
+            self.assertEqual(loaded.predict(items[0]), self.predictor.predict(items[0]))
+
+
+class HotSwapTests(PredictorTestCase):
+    def test_worker_picks_up_new_version(self):
+        worker = DrugShortagePredictor()
+        worker.model_path = self.predictor.model_path
+        worker.poll_interval = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            worker.load_model()
+            old_version = worker.version
+
+            trainer = DrugShortagePredictor()
+            trainer.model_path = self.predictor.model_path
+            trainer.train_model()
+
+            worker.check_for_update()
+            worker._reload_thread.join()
+
+        self.assertNotEqual(trainer.version, old_version)
+        self.assertEqual(worker.version, trainer.version)
+        self.assertEqual(worker.snapshot.version, trainer.version)
+
+
+class TrainingDataTests(TestCase):
+    def setUp(self):
+        self.predictor = DrugShortagePredictor()
+        self.predictor.model_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.predictor.model_path, ignore_errors=True)
+
+    def test_streams_typed_columns(self):
+        inventories = create_network(hospitals=2, medicines=3)
+        df = read_inventory_columns(inventory_scope())
+
+        self.assertEqual(df['inventory_id'].tolist(), [inv.id for inv in inventories])
+        self.assertEqual(str(df['last_updated'].dtype), 'datetime64[us, UTC]')
+        for row, inv in zip(df.to_dict('records'), inventories):
+            payload = inventory_payload(inv)
+            for column in ('current_stock', 'daily_consumption', 'reorder_level',
+                           'drug_category', 'hospital_type', 'hospital_bed_count', 'last_updated'):
+                self.assertEqual(row[column], payload[column], column)
+
+    def test_feature_snapshot_reused_until_data_changes(self):
+        create_network(hospitals=2, medicines=3)
+        watermark = self.predictor.data_watermark()
+        with contextlib.redirect_stdout(io.StringIO()):
+            built = self.predictor.training_matrix(watermark)
+            with self.assertNumQueries(0):
+                cached = self.predictor.training_matrix(watermark)
+
+        np.testing.assert_array_equal(cached.X, built.X)
+        np.testing.assert_array_equal(cached.y, built.y)
+        self.assertEqual(cached.feature_columns, built.feature_columns)
+        self.assertEqual(list(self.predictor.label_encoders['drug_category'].classes_),
+                         list(built.encoder_classes['drug_category']))
+
+        Inventory.objects.filter(id=Inventory.objects.first().id).delete()
+        with contextlib.redirect_stdout(io.StringIO()):
+            rebuilt = self.predictor.training_matrix(self.predictor.data_watermark())
+        self.assertEqual(len(rebuilt), len(built) - 1)
+
+
+class SyntheticDataTests(TestCase):
+    def test_deterministic_by_seed(self):
+        a = synthetic_training_frame(500, seed=7, end=date(2025, 6, 30))
+        b = synthetic_training_frame(500, seed=7, end=date(2025, 6, 30))
+        pd.testing.assert_frame_equal(a, b)
+        self.assertFalse(a.equals(synthetic_training_frame(500, seed=8, end=date(2025, 6, 30))))
+
+        self.assertEqual(str(a['drug_category'].dtype), 'category')
+        self.assertEqual(a['last_updated'].max(), pd.Timestamp('2025-06-30', tz='UTC'))
+        self.assertGreater(a['last_updated'].min(), pd.Timestamp('2024-06-30', tz='UTC'))
+        expected = (a['current_stock'] < a['daily_consumption'] * 7 * 1.2).astype(int)
+        self.assertTrue((a['shortage_next_7d'] == expected).all())
+
+    def test_chunks_cover_all_rows(self):
+        chunks = list(iter_synthetic_frames(1050, chunk_size=500, seed=1, end=date(2025, 6, 30)))
+        self.assertEqual([len(chunk) for chunk in chunks], [500, 500, 50])
+        again = pd.concat(iter_synthetic_frames(1050, chunk_size=500, seed=1, end=date(2025, 6, 30)))
+        pd.testing.assert_frame_equal(pd.concat(chunks), again)
+
+    def test_categorical_labels_normalized_like_strings(self):
+        values = pd.Series(['ANTIBIOTIC', None, 'vaccine', 'Antibiotic'])
+        categorical = values.astype('category')
+        self.assertEqual(normalize_labels(categorical).tolist(), normalize_labels(values).tolist())
+        self.assertEqual(normalize_labels(values).tolist(), ['Antibiotic', 'Unknown', 'Vaccine', 'Antibiotic'])
+
+    @unittest.skipUnless(find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_writes_parquet_in_row_groups(self):
+        path = os.path.join(tempfile.mkdtemp(), 'synthetic.parquet')
+        try:
+            write_synthetic_parquet(path, 1200, chunk_size=500, seed=3, end=date(2025, 6, 30))
+            df = pd.read_parquet(path)
+        finally:
+            shutil.rmtree(os.path.dirname(path))
+        expected = pd.concat(iter_synthetic_frames(1200, chunk_size=500, seed=3, end=date(2025, 6, 30)), ignore_index=True)
+        self.assertEqual(len(df), 1200)
+        pd.testing.assert_frame_equal(df, expected, check_categorical=False)
+
+
+class TuningTests(TestCase):
+    grid = {'n_estimators': [5, 30], 'max_depth': [2, 4]}
+
+    def synthetic_matrix(self):
+        predictor = DrugShortagePredictor()
+        df = predictor.create_features(synthetic_training_frame(1200, seed=5, end=date(2025, 6, 30)))
+        return TrainingMatrix.from_frame(df, predictor.feature_columns, predictor.label_encoders)
+
+    def test_folds_expand_forward_in_time(self):
+        folds = tuning.time_series_folds(1000, 3)
+        self.assertEqual(folds, [(250, 500), (500, 750), (750, 1000)])
+
+        matrix = self.synthetic_matrix()
+        order = matrix.time_order()
+        self.assertTrue((np.diff(matrix.timestamps[order]) >= 0).all())
+
+    def test_selects_cheapest_candidate_within_tolerance(self):
+        matrix = self.synthetic_matrix()
+        candidates = tuning.candidate_params(self.grid)
+        quiet = lambda line: None
+
+        report = tuning.search(matrix, candidates, folds=3, workers=1, tolerance=1.0, log=quiet)
+        self.assertEqual(report['selected']['params'], {'max_depth': 2, 'n_estimators': 5})
+        self.assertEqual(len(report['candidates']), 4)
+        self.assertEqual([fold['fold'] for fold in report['selected']['folds']], [0, 1, 2])
+
+        report = tuning.search(matrix, candidates, folds=3, workers=1, tolerance=0.0, log=quiet)
+        self.assertEqual(report['selected']['accuracy'], report['best_accuracy'])
+        self.assertEqual(len(tuning.candidate_params(self.grid, n_iter=3)), 3)
+
+    def test_tune_model_publishes_selected_params(self):
+        predictor = DrugShortagePredictor()
+        predictor.model_path = tempfile.mkdtemp()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                accuracy, report = predictor.tune_model(grid=self.grid, workers=1, tolerance=1.0)
+            manifest = predictor.registry.read_manifest(predictor.version)
+        finally:
+            shutil.rmtree(predictor.model_path)
+
+        training = manifest['metadata']['training']
+        self.assertEqual(training['params'], {'n_estimators': 5, 'max_depth': 2})
+        self.assertEqual(training['trees'], 5)
+        self.assertEqual(training['tuning']['candidates'], 4)
+        self.assertEqual(predictor.model.get_booster().num_boosted_rounds(), 5)
+
+
+@override_settings(ML_INCREMENTAL_MIN_ROWS=10, ML_INCREMENTAL_ROUNDS=20, ML_INCREMENTAL_DRIFT_THRESHOLD=100)
+class IncrementalTrainingTests(PredictorTestCase):
+    def setUp(self):
+        self.trainer = DrugShortagePredictor()
+        self.trainer.model_path = self.predictor.model_path
+        self.registry = ModelRegistry(self.predictor.model_path)
+
+    def train(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.trainer.train_model(incremental=True)
+        version = self.registry.current_version()
+        return version, self.registry.read_manifest(version)['metadata']['training']
+
+    def test_warm_start_continues_current_booster(self):
+        base_version = self.registry.current_version()
+        base = self.registry.read_manifest(base_version)['metadata']['training']
+        create_network(hospitals=4, medicines=5)
+        Medicine.objects.update(category='ANTIBIOTIC')
+
+        version, training = self.train()
+        self.assertEqual(training['mode'], 'incremental')
+        self.assertEqual(training['base_version'], base_version)
+        self.assertEqual(training['rows'], 20)
+        self.assertEqual(training['trees'], base['trees'] + 20)
+        self.assertEqual(self.trainer.model.get_booster().num_boosted_rounds(), training['trees'])
+        self.assertIsNotNone(training['watermark']['inventory_last_updated'])
+
+        # Nothing changed since: the version stays
+        self.assertEqual(self.train()[0], version)
+
+    def test_unseen_category_forces_full_training(self):
+        create_network(hospitals=4, medicines=5)  # includes VACCINE and OTHER
+        version, training = self.train()
+        self.assertEqual(training['mode'], 'full')
+        self.assertEqual(training['trees'], 200)
+
+    def test_too_few_changed_records_keeps_version(self):
+        version = self.registry.current_version()
+        create_network(hospitals=1, medicines=5)
+        self.assertEqual(self.train()[0], version)
+
+
+class PredictionCacheTests(PredictorTestCase):
+    def setUp(self):
+        self.predictor.cache = PredictionCache(max_size=100, ttl=60)
+
+    def test_lru_evicts_oldest_and_expires(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.evictions, 1)
+
+        cache.ttl = -1
+        cache.set('d', 4)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.expirations, 1)
+
+    def test_repeat_prediction_is_served_from_cache(self):
+        item = sample_inventories(1)[0]
+        first = self.predictor.predict(item)
+        second = self.predictor.predict(dict(item))
+
+        self.assertEqual(first, second)
+        stats = self.predictor.cache.stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 1))
+
+    def test_batch_reuses_cached_rows(self):
+        items = sample_inventories(10)
+        with contextlib.redirect_stdout(io.StringIO()):
+            uncached = self.predictor.batch_predict(items[:4])
+            batch = self.predictor.batch_predict(items)
+
+        self.assertEqual(self.predictor.cache.stats()['local_hits'], 4)
+        for pred in uncached:
+            self.assertIn(pred, batch)
+
+    def test_bulk_scoring_bypasses_cache(self):
+        self.predictor.cache.max_rows = 5
+        items = sample_inventories(10)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.predictor.batch_predict(items)
+            self.predictor.batch_predict(items)
+
+        stats = self.predictor.cache.stats()
+        self.assertEqual((stats['size'], stats['local_hits'], stats['misses']), (0, 0, 0))
+
+    def test_key_includes_model_version(self):
+        row = np.zeros(3, dtype=np.float32)
+        cache = self.predictor.cache
+        self.assertNotEqual(cache.key('v1', row), cache.key('v2', row))
+        self.assertEqual(cache.key('v1', row), cache.key('v1', row.astype(np.float64)))
+
+    def test_unreachable_redis_falls_back_to_model(self):
+        self.predictor.cache = PredictionCache(max_size=100, ttl=60, redis_url='redis://127.0.0.1:1/0')
+        item = sample_inventories(1)[0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            prediction = self.predictor.predict(item)
+
+        self.assertIn(prediction['risk_level'], ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL'])
+        self.assertGreaterEqual(self.predictor.cache.stats()['redis_errors'], 1)
+
+
+class MicroBatcherTests(PredictorTestCase):
+    def setUp(self):
+        self.predictor.cache = PredictionCache(max_size=0)
+        self.predictor.batcher = MicroBatcher(self.predictor._infer, window_ms=20, max_batch=16)
+
+    def tearDown(self):
+        self.predictor.batcher = None
+
+    def test_concurrent_predictions_share_model_calls(self):
+        items = sample_inventories(12)
+        results = [None] * len(items)
+        barrier = threading.Barrier(len(items))
+
+        def worker(i):
+            barrier.wait()
+            results[i] = self.predictor.predict(items[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(items))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = self.predictor.batcher.stats()
+        self.assertEqual(stats['items'], len(items))
+        self.assertLess(stats['batches'], len(items))
+
+        self.predictor.batcher = None
+        self.assertEqual(results, [self.predictor.predict(item) for item in items])
+
+    def test_model_errors_reach_the_caller(self):
+        def failing(snapshot, X):
+            raise RuntimeError('boom')
+
+        self.predictor.batcher = MicroBatcher(failing, window_ms=1)
+        with self.assertRaises(RuntimeError):
+            self.predictor.predict(sample_inventories(1)[0])
+
+    def test_stranded_request_falls_back_to_direct_call(self):
+        expected = self.predictor.predict(sample_inventories(1)[0])
+        batcher = MicroBatcher(self.predictor._infer, window_ms=1, timeout_ms=50)
+        # A dispatcher that is alive but never serves the queue
+        stuck = threading.Event()
+        batcher._thread = threading.Thread(target=stuck.wait, daemon=True)
+        batcher._thread.start()
+        self.predictor.batcher = batcher
+        try:
+            self.assertEqual(self.predictor.predict(sample_inventories(1)[0]), expected)
+        finally:
+            stuck.set()
+        self.assertEqual((batcher.stats()['timeouts'], len(batcher._queue)), (1, 0))
+
+    def test_threads_share_one_reset_after_fork(self):
+        batcher = self.predictor.batcher
+        batcher._pid = -1  # As seen by a freshly forked worker
+        items = sample_inventories(8)
+        barrier = threading.Barrier(len(items))
+        results = [None] * len(items)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = self.predictor.predict(items[i])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(items))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(batcher.stats()['timeouts'], 0)
+        self.assertEqual(batcher._pid, os.getpid())
+        self.predictor.batcher = None
+        self.assertEqual(results, [self.predictor.predict(item) for item in items])
+
+
+class NetworkScoreViewTests(PredictionApiTestCase):
+    url = '/api/predictions/network-score/'
+
+    def setUp(self):
+        super().setUp()
+        self.inventories = create_network()
+
+    def test_scores_whole_network_from_database(self):
+        self.login()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.get(self.url, {'page_size': 100})
+            expected = self.predictor.batch_predict([inventory_payload(inv) for inv in self.inventories])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_predictions'], len(self.inventories))
+        got = [(p['hospital_id'], p['medicine_id'], p['shortage_probability']) for p in response.data['predictions']]
+        want = [(p['hospital_id'], p['medicine_id'], p['shortage_probability']) for p in expected]
+        self.assertEqual(got, want)
+        self.assertEqual(sum(response.data['risk_summary'].values()), len(self.inventories))
+
+    def test_pages_and_top_k(self):
+        self.login()
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = self.client.get(self.url, {'page_size': 100}).data['predictions']
+            page = self.client.get(self.url, {'page': 2, 'page_size': 4, 'top_k': 6}).data
+
+        self.assertEqual(page['total_pages'], 2)
+        self.assertEqual(page['predictions'], full[4:6])
+
+    def test_state_scope(self):
+        self.login()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.get(self.url, {'state': 'kerala'})
+        self.assertEqual(response.data['total_predictions'], 5)
+
+    def test_hospital_staff_limited_to_own_hospital(self):
+        hospital = self.inventories[0].hospital
+        self.login(role='PHARMACIST', hospital=hospital)
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total_predictions'], 5)
+        self.assertEqual({p['hospital_id'] for p in response.data['predictions']}, {hospital.id})
+
+        other = self.inventories[-1].hospital
+        response = self.client.get(self.url, {'hospital_id': other.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ShardedScoringTests(PredictorTestCase):
+    def setUp(self):
+        self.inventories = create_network(hospitals=5, medicines=4)
+
+    def test_shards_cover_scope_in_balanced_ranges(self):
+        shards = sharding.hospital_shards(inventory_scope(), 3)
+        hospital_ids = sorted({inv.hospital_id for inv in self.inventories})
+
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(shards[0][0], hospital_ids[0])
+        self.assertEqual(shards[-1][1], hospital_ids[-1])
+        for (_, last), (first, _) in zip(shards, shards[1:]):
+            self.assertLess(last, first)
+
+    def test_shard_results_merge_to_in_process_scores(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = score_inventories(self.predictor, inventory_scope())
+            sharding._init_worker(self.predictor.model_path, self.predictor.version)
+            parts = [
+                sharding._score_shard({'hospital_id': None, 'state': None}, first, last, 3)
+                for first, last in sharding.hospital_shards(inventory_scope(), 2)
+            ]
+
+        merged = [np.concatenate(column) for column in zip(*parts)]
+        np.testing.assert_array_equal(merged[4], expected.inventory_ids)
+        np.testing.assert_array_equal(merged[2], expected.probabilities)
+
+
+class StreamingBatchPredictViewTests(PredictionApiTestCase):
+    url = '/api/predictions/batch-predict/stream/'
+
+    def post_ndjson(self, lines):
+        body = '\n'.join(lines) + '\n'
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.post(self.url, body, content_type='application/x-ndjson')
+            content = b''.join(response.streaming_content).decode()
+        return response, [json.loads(line) for line in content.splitlines()]
+
+    def test_streams_one_result_per_record_in_order(self):
+        self.login()
+        items = sample_inventories(25)
+        response, results = self.post_ndjson([json.dumps(item) for item in items])
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        summary = results.pop()['summary']
+        self.assertEqual(summary['total_predictions'], 25)
+        self.assertEqual([r['line'] for r in results], list(range(1, 26)))
+
+        expected, _ = self.predictor.predict_many(items)
+        for result, pred in zip(results, expected):
+            result.pop('line')
+            self.assertEqual(result, pred)
+
+    def test_scores_in_fixed_size_chunks(self):
+        body = ''.join(json.dumps(item) + '\n' for item in sample_inventories(25))
+        with contextlib.redirect_stdout(io.StringIO()):
+            chunks = list(_ndjson_predictions(io.BytesIO(body.encode()), chunk_size=10))
+
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [10, 10, 5, 1])
+
+    def test_reports_bad_records_inline(self):
+        self.login()
+        good = json.dumps(sample_inventories(1)[0])
+        _, results = self.post_ndjson([good, '{not json', '', json.dumps({'current_stock': 5}), good, 'null', '[1]'])
+
+        self.assertEqual([r['line'] for r in results[:-1]], [1, 2, 4, 5, 6, 7])
+        self.assertEqual(results[1]['error'], 'invalid JSON')
+        self.assertIn('missing', results[2]['error'])
+        self.assertEqual([r['error'] for r in results[4:6]], ['expected a JSON object'] * 2)
+        self.assertEqual(results[-1]['summary']['errors'], 4)
+
+    def test_empty_body_is_rejected(self):
+        self.login()
+        response = self.client.post(self.url, '', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_accepts_chunked_upload(self):
+        self.login()
+        items = sample_inventories(3)
+        body = ''.join(json.dumps(item) + '\n' for item in items).encode()
+        with contextlib.redirect_stdout(io.StringIO()):
+            # As a server hands over a chunked upload: no Content-Length, decoded body in wsgi.input
+            response = self.client.post(
+                self.url, body, content_type='application/x-ndjson',
+                CONTENT_LENGTH='', HTTP_TRANSFER_ENCODING='chunked', **{'wsgi.input': io.BytesIO(body)},
+            )
+            results = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(results[-1]['summary']['total_predictions'], 3)
+
+    def test_overlong_lines_are_reported_and_skipped(self):
+        good = json.dumps(sample_inventories(1)[0])
+        body = '\n'.join([good, '[' + '0,' * 200 + '0]', good, 'x' * 700]).encode()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = [
+                json.loads(line)
+                for chunk in _ndjson_predictions(io.BytesIO(body), max_line_bytes=len(good) + 1)
+                for line in chunk.splitlines()
+            ]
+
+        self.assertEqual([r['line'] for r in results[:-1]], [1, 2, 3, 4])
+        self.assertEqual(results[1]['error'], f'line longer than {len(good) + 1} bytes')
+        self.assertEqual(results[2]['risk_level'], results[0]['risk_level'])
+        self.assertIn('longer', results[3]['error'])
+        self.assertEqual(results[-1]['summary']['errors'], 2)
+
+
+class ResultHandleTests(PredictionApiTestCase):
+    def post_batch(self, items, **extra):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.client.post(
+                '/api/predictions/batch-predict/', {'inventories': items, **extra}, format='json'
+            )
+
+    def test_batch_returns_top_k_and_pages_by_handle(self):
+        self.login()
+        items = sample_inventories()
+        response = self.post_batch(items, top_k=5)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = self.predictor.batch_predict(items)
+        self.assertEqual(response.data['predictions'], expected[:5])
+        self.assertEqual(sum(response.data['risk_summary'].values()), len(items))
+
+        url = f"/api/predictions/results/{response.data['result_handle']}/"
+        page = self.client.get(url, {'page': 3, 'page_size': 15}).data
+        self.assertEqual(page['total_pages'], 3)
+        self.assertEqual(page['predictions'], expected[30:40])
+
+    def test_handle_is_private_to_its_owner(self):
+        self.login()
+        handle = self.post_batch(sample_inventories(5)).data['result_handle']
+
+        self.login(role='PHARMACIST')
+        response = self.client.get(f'/api/predictions/results/{handle}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_redis_payload_round_trips_without_pickle(self):
+        import pickle
+
+        scores = ScoreSet(
+            'v1', np.array([1, 2, 3]), np.array([4, 5, 6]),
+            np.array([[0.1, 0.2], [0.5, 0.6], [0.9, 0.95]], dtype=np.float32),
+            np.array([30.0, 7.5, 1.0]), inventory_ids=np.array([7, 8, 9]), horizons=[7, 14],
+        )
+        entry = decode_entry(encode_entry({'owner_id': 3, 'top_k': 2, 'scores': scores}))
+        self.assertEqual((entry['owner_id'], entry['top_k']), (3, 2))
+        decoded = entry['scores']
+        self.assertEqual((decoded.version, decoded.horizons), ('v1', [7, 14]))
+        for name in ('hospital_ids', 'medicine_ids', 'probabilities', 'days_of_supply', 'inventory_ids'):
+            np.testing.assert_array_equal(getattr(decoded, name), getattr(scores, name))
+            self.assertEqual(getattr(decoded, name).dtype, getattr(scores, name).dtype)
+
+        # Client batches carry whatever IDs were sent, and no inventory IDs
+        client_scores = ScoreSet(
+            'v1', np.array([1, 'H-2', None], dtype=object), np.array([4, 5, 6], dtype=object),
+            np.array([0.1, 0.5, 0.9], dtype=np.float32), np.array([30.0, 7.5, 1.0]),
+        )
+        decoded = decode_entry(encode_entry({'owner_id': 3, 'top_k': None, 'scores': client_scores}))['scores']
+        self.assertEqual(decoded.hospital_ids.tolist(), [1, 'H-2', None])
+        self.assertIsNone(decoded.inventory_ids)
+
+        # Anything else in Redis, pickles included, is rejected rather than executed
+        with self.assertRaises(ValueError):
+            decode_entry(pickle.dumps({'owner_id': 3}))
+
+    def test_local_store_is_bounded_by_bytes(self):
+        def scores(rows):
+            return ScoreSet('v1', np.zeros(rows, dtype=np.int64), np.zeros(rows, dtype=np.int64),
+                            np.zeros(rows, dtype=np.float32), np.zeros(rows))
+
+        store = ResultStore(max_size=10, max_bytes=1000)
+        first = store.save(scores(20), owner_id=1)  # 560 bytes
+        second = store.save(scores(20), owner_id=1)
+        self.assertIsNone(store.load(first, 1))
+        self.assertIsNotNone(store.load(second, 1))
+        # Larger than the whole budget: not kept in memory at all
+        self.assertIsNone(store.load(store.save(scores(100), owner_id=1), 1))
+        self.assertLessEqual(store.local.nbytes, 1000)
+
+
+class PipelineMetricsTests(PredictionApiTestCase):
+    def test_histogram_percentiles_stay_within_a_bucket(self):
+        histogram = Histogram(LATENCY_BUCKETS)
+        values = np.random.default_rng(0).lognormal(mean=-6, sigma=1, size=5000)
+        for value in values:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.count, 5000)
+        for q in (0.5, 0.95, 0.99):
+            exact = np.quantile(values, q)
+            # Buckets are sqrt(2) apart, so estimates are within that factor
+            self.assertLess(abs(np.log2(histogram.percentile(q) / exact)), 0.5)
+
+    def test_stages_are_reported(self):
+        pipeline_metrics.reset()
+        self.login()
+        item = sample_inventories(1)[0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.client.post('/api/predictions/predict/', {**item, 'hospital_id': 1, 'medicine_id': 1}, format='json')
+            self.client.post('/api/predictions/batch-predict/', {'inventories': sample_inventories(10)}, format='json')
+
+        metrics = self.client.get('/api/predictions/metrics/').data
+        for stage in ('model_load', 'predict', 'predict.features', 'inference', 'batch', 'batch.features', 'batch.scaling'):
+            self.assertGreaterEqual(metrics['latency_ms'][stage]['count'], 1, stage)
+        self.assertEqual(metrics['sizes']['batch_items']['max'], 10)
+
+        status_data = self.client.get('/api/predictions/model-status/').data
+        self.assertIn('p99', status_data['latency_ms']['predict'])
+
+
+class BenchmarkTests(PredictionApiTestCase):
+    def test_suite_runs_against_fixture(self):
+        benchmarks.seed_fixture(hospitals=2, medicines=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = benchmarks.run_benchmarks(predictor_instance, sizes=[1, 5], repeat=1, log=lambda line: None)
+
+        self.assertEqual(results['model_version'], self.predictor.version)
+        for name in ('model_load', 'booster_load', 'predict', 'create_features[5]', 'batch_predict[5]',
+                     'view.predict', 'view.batch_predict[100]', 'view.network_score[6]'):
+            self.assertGreater(results['results'][name]['median_ms'], 0, name)
+        json.dumps(results)
+
+    def test_compare_flags_regressions_over_threshold(self):
+        def run(**medians):
+            return {'results': {name: {'median_ms': ms} for name, ms in medians.items()}}
+
+        rows = benchmarks.compare(
+            run(predict=1.3, model_load=1.5, new=9.0), run(predict=1.0, model_load=1.0),
+            threshold=0.25, overrides={'model_load': 1.0},
+        )
+        self.assertEqual([(name, regressed) for name, _, _, _, regressed in rows],
+                         [('predict', True), ('model_load', False)])
+
+
+@override_settings(TRAINING_JOB_BACKEND='eager')
+class TrainingJobTests(PredictionApiTestCase):
+    url = '/api/predictions/training-jobs/'
+
+    def start(self, data):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.client.post(self.url, data, format='json')
+
+    def test_job_trains_and_records_steps(self):
+        self.login()
+        response = self.start({'mode': 'FULL'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        job = self.client.get(f"{self.url}{response.data['id']}/").data
+        self.assertEqual(job['status'], TrainingJob.Status.SUCCEEDED)
+        self.assertEqual(job['progress'], 1.0)
+        # Step 2 (creating features) is skipped when a feature snapshot is reused
+        steps = [step['step'] for step in job['steps']]
+        self.assertEqual(steps, sorted(steps))
+        self.assertEqual((steps[0], steps[-1]), (1, 7))
+        self.assertTrue(all('seconds' in step for step in job['steps']))
+        self.assertEqual(job['model_version'], ModelRegistry(self.predictor.model_path).current_version())
+        self.assertEqual(job['metrics']['mode'], 'full')
+        self.assertGreater(job['metrics']['accuracy'], 0.5)
+
+    def test_only_health_authority_can_start(self):
+        self.login(role='PHARMACIST')
+        self.assertEqual(self.start({'mode': 'FULL'}).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_other_users_only_see_their_own_jobs(self):
+        job = TrainingJob.objects.create(status=TrainingJob.Status.FAILED, error='Traceback ...')
+        user = self.login(role='PHARMACIST')
+        own = TrainingJob.objects.create(requested_by=user)
+
+        self.assertEqual([row['id'] for row in self.client.get(self.url).data], [own.id])
+        self.assertEqual(self.client.get(f'{self.url}{job.id}/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(f'{self.url}{own.id}/').status_code, status.HTTP_200_OK)
+
+    def test_rejects_bad_options_and_concurrent_jobs(self):
+        self.login()
+        self.assertEqual(self.start({'mode': 'TUNE', 'options': {'folds': 1}}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.start({'mode': 'NIGHTLY'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        TrainingJob.objects.create(status=TrainingJob.Status.RUNNING)
+        self.assertEqual(self.start({'mode': 'FULL'}).status_code, status.HTTP_409_CONFLICT)
+
+    def test_cancel_queued_job(self):
+        self.login()
+        job = TrainingJob.objects.create()
+        response = self.client.post(f'{self.url}{job.id}/cancel/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], TrainingJob.Status.CANCELLED)
+
+        # A worker that picks the message up later leaves it alone
+        self.assertIsNone(run_training_job(job.id))
+        self.assertEqual(self.client.post(f'{self.url}{job.id}/cancel/').status_code, status.HTTP_409_CONFLICT)
+
+    def test_cancel_stops_running_job_before_publishing(self):
+        version = ModelRegistry(self.predictor.model_path).current_version()
+        job = TrainingJob.objects.create(cancel_requested=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(run_training_job(job.id), TrainingJob.Status.CANCELLED)
+
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(ModelRegistry(self.predictor.model_path).current_version(), version)
+
+    def test_stale_running_job_no_longer_blocks_training(self):
+        self.login()
+        silent = timezone.now() - timedelta(seconds=settings.TRAINING_JOB_STALE_SECONDS + 60)
+        orphan = TrainingJob.objects.create(status=TrainingJob.Status.RUNNING, started_at=silent, heartbeat_at=silent)
+
+        response = self.start({'mode': 'FULL'})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, TrainingJob.Status.FAILED)
+        self.assertIn('heartbeat', orphan.error)
+
+    def test_cancel_fails_job_without_live_heartbeat(self):
+        self.login()
+        silent = timezone.now() - timedelta(seconds=4 * settings.TRAINING_JOB_HEARTBEAT_SECONDS)
+        job = TrainingJob.objects.create(status=TrainingJob.Status.RUNNING, started_at=silent, heartbeat_at=silent)
+        live = TrainingJob.objects.create(status=TrainingJob.Status.RUNNING, heartbeat_at=timezone.now())
+
+        response = self.client.post(f'{self.url}{job.id}/cancel/')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], TrainingJob.Status.FAILED)
+        # A job still beating is only asked to stop at its next step
+        response = self.client.post(f'{self.url}{live.id}/cancel/')
+        self.assertEqual((response.data['status'], response.data['cancel_requested']), (TrainingJob.Status.RUNNING, True))
+
+    @override_settings(TRAINING_JOB_BACKEND='thread')
+    def test_tuning_refused_in_web_worker_threads(self):
+        self.login()
+        response = self.start({'mode': 'TUNE'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(TrainingJob.objects.exists())
+
+
+class ConsumptionForecastTests(PredictionApiTestCase):
+    end = date(2026, 3, 2)  # A Monday
+
+    def record(self, inventory, days_ago, quantity, hour=10):
+        transaction = InventoryTransaction.objects.create(
+            inventory=inventory, transaction_type=InventoryTransaction.TransactionType.CONSUMPTION,
+            quantity=-quantity, previous_stock=0, new_stock=0
+        )
+        when = datetime.combine(self.end - timedelta(days=days_ago), datetime.min.time(), dt_timezone.utc)
+        InventoryTransaction.objects.filter(id=transaction.id).update(transaction_date=when + timedelta(hours=hour))
+
+    def test_weekly_profile_is_recovered(self):
+        # 10 units on weekdays, 3 at weekends, for 12 weeks
+        start = self.end - timedelta(days=84)
+        weekdays = (start.weekday() + np.arange(84)) % 7
+        values = np.tile(np.where(weekdays < 5, 10.0, 3.0), (2, 1))
+        values[1, :42] = 0  # Second series starts halfway through
+        series = consumption.ConsumptionSeries(np.array([1, 2]), values, start)
+
+        forecasts, level, residual_std = consumption.forecast_consumption(series)
+
+        np.testing.assert_allclose(forecasts[7], [56, 56], rtol=1e-6)
+        np.testing.assert_allclose(forecasts[14], [112, 112], rtol=1e-6)
+        np.testing.assert_allclose(level, [8, 8], rtol=1e-6)
+        # A perfectly regular week leaves nothing unexplained
+        np.testing.assert_allclose(residual_std, [0, 0], atol=1e-6)
+
+    def test_series_group_ledger_by_day(self):
+        first, second = create_network(hospitals=1, medicines=2)
+        self.record(first, 1, 4)
+        self.record(first, 1, 6, hour=18)
+        self.record(first, 3, 2)
+        self.record(first, 0, 50)  # Today: not a whole day yet
+        self.record(second, 200, 9)  # Outside the window
+        InventoryTransaction.objects.create(
+            inventory=second, transaction_type=InventoryTransaction.TransactionType.PURCHASE,
+            quantity=100, previous_stock=0, new_stock=100
+        )
+
+        series = consumption.consumption_series(days=7, end=self.end)
+
+        self.assertEqual(list(series.inventory_ids), [first.id])
+        self.assertEqual(series.values[0].tolist(), [0, 0, 0, 0, 2, 0, 10])
+
+    def test_refresh_feeds_scoring_and_stockout_projection(self):
+        inventories = create_network(hospitals=1, medicines=3)
+        for days_ago in range(1, 29):
+            self.record(inventories[0], days_ago, 20)
+            self.record(inventories[1], days_ago, 1)
+        ConsumptionForecast.objects.create(
+            inventory=inventories[2], forecast_7d=1, forecast_14d=2, forecast_30d=4, level=0.1,
+            history_days=1, generated_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        )
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            written = consumption.refresh_forecasts(end=self.end)
+        self.assertEqual(written, 2)
+        # Stale forecast (no consumption in the window any more) is dropped
+        forecast = ConsumptionForecast.objects.get(inventory=inventories[0])
+        self.assertEqual(ConsumptionForecast.objects.count(), 2)
+        self.assertAlmostEqual(forecast.forecast_7d, 140)
+        self.assertAlmostEqual(forecast.forecast_30d, 600)
+
+        scores = score_inventories(self.predictor, inventory_scope())
+        days = dict(zip(scores.inventory_ids.tolist(), scores.days_of_supply.tolist()))
+        stock = inventories[0].current_stock
+        self.assertAlmostEqual(days[inventories[0].id], stock / 20)
+        # No forecast: the manual average as before
+        usage = float(inventories[2].average_daily_usage)
+        self.assertAlmostEqual(days[inventories[2].id], inventories[2].current_stock / (usage + 0.01))
+
+        inventory = Inventory.objects.select_related('consumption_forecast').get(id=inventories[1].id)
+        # 31 units at 1 a day: 30 days of forecast, then the 30-day rate (+0.01 guard)
+        self.assertEqual(inventory.current_stock, 31)
+        self.assertEqual(inventory.days_until_stockout, 30)
+
+    def test_projection_interpolates_horizons(self):
+        projected = consumption.projected_days_of_supply(
+            [0, 7, 10.5, 22, 60, 5], [7, 7, 7, 7, 7, np.nan], [14, 14, 14, 14, 14, 1], [30, 30, 30, 30, 30, 1]
+        )
+        np.testing.assert_allclose(projected[:4], [0, 7, 10.5, 22])
+        self.assertAlmostEqual(projected[4], 30 + 30 / 1.01)
+        self.assertTrue(np.isnan(projected[5]))
+
+
+class StockoutSimulationTests(PredictionApiTestCase):
+    url = '/api/predictions/stockout-simulation/'
+
+    def simulate(self, stock=10.5, reorder_level=0, order_quantity=0, lead_time_days=7, **kwargs):
+        # Nearly constant demand of 1 unit a day for 30 days
+        return simulation.simulate_stockouts(
+            [stock], [reorder_level], [order_quantity], np.ones((1, 30)), [0.05],
+            paths=2000, seed=0, lead_time_days=lead_time_days, lead_time_cv=0.01, **kwargs
+        )
+
+    def test_runs_out_when_demand_exceeds_stock(self):
+        probabilities, shortage = self.simulate()
+        # 10.5 units last ten days; the eleventh day's demand cannot be met
+        self.assertLess(probabilities[0, 9], 0.01)
+        self.assertGreater(probabilities[0, 10], 0.99)
+        self.assertTrue(np.all(np.diff(probabilities[0]) >= 0))
+        self.assertAlmostEqual(shortage[0], 30 - 10.5, delta=0.5)
+
+    def test_replenishment_lead_time(self):
+        # Reorder at 5 units (end of day 6): delivered in 3 days there is no stockout
+        probabilities, shortage = self.simulate(reorder_level=5, order_quantity=50, lead_time_days=3)
+        self.assertEqual(probabilities[0, -1], 0)
+        self.assertEqual(shortage[0], 0)
+
+        # Delivered after 20 days: runs out on day 11, backlog peaks the day before delivery
+        probabilities, shortage = self.simulate(reorder_level=5, order_quantity=50, lead_time_days=20)
+        self.assertGreater(probabilities[0, 10], 0.99)
+        self.assertAlmostEqual(shortage[0], 25 - 10.5, delta=1.5)
+
+    def test_chunks_bound_memory_without_changing_results(self):
+        rng = np.random.default_rng(1)
+        stock = rng.integers(0, 300, 40)
+        mean_demand = np.repeat(rng.uniform(1, 20, 40)[:, None], 30, axis=1)
+        args = (stock, stock * 0.3, 200, mean_demand, 0.5)
+
+        whole, whole_shortage = simulation.simulate_stockouts(*args, paths=2000, seed=3)
+        again, _ = simulation.simulate_stockouts(*args, paths=2000, seed=3)
+        # About one inventory per chunk
+        chunked, chunked_shortage = simulation.simulate_stockouts(*args, paths=2000, seed=3, memory_mb=0.3)
+
+        np.testing.assert_array_equal(whole, again)
+        np.testing.assert_allclose(chunked, whole, atol=0.05)
+        np.testing.assert_allclose(chunked_shortage, whole_shortage, rtol=0.1, atol=2)
+
+    def test_demand_follows_forecast_horizons(self):
+        means = simulation.daily_demand_means([3.0, 3.0], [7, np.nan], [21, np.nan], [53, np.nan], days=35)
+        np.testing.assert_allclose(means[0, [0, 6, 7, 13, 14, 29, 30]], [1, 1, 2, 2, 2, 2, 53 / 30])
+        np.testing.assert_allclose(means[1], 3.0)
+        np.testing.assert_allclose(simulation.demand_cv([0.5, 0.0], [7, 7], default=0.4), [0.5, 0.4])
+
+    def test_simulates_scope_from_database(self):
+        inventories = create_network()
+        ConsumptionForecast.objects.create(
+            inventory=inventories[0], forecast_7d=700, forecast_14d=1400, forecast_30d=3000, level=100,
+            residual_std=10, history_days=90, generated_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        self.login()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.get(self.url, {'paths': 500, 'days': 20, 'seed': 1, 'page_size': 100})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['total_inventories'], response.data['paths'], response.data['days']), (15, 500, 20))
+        results = response.data['results']
+        by_day = [row['stockout_probability'][-1] for row in results]
+        self.assertEqual(by_day, sorted(by_day, reverse=True))
+        # 100 units a day against at most 300 in stock: out within three days
+        first = next(row for row in results if row['inventory_id'] == inventories[0].id)
+        self.assertLessEqual(first['median_stockout_day'], 3)
+        self.assertGreater(first['expected_shortage'], 0)
+
+    def test_rejects_simulations_over_the_request_budget(self):
+        create_network()
+        self.login()
+        response = self.client.get(self.url, {'paths': MAX_SIMULATION_PATHS + 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # 15 inventories: within the budget at 100 paths, over it at 200
+        with override_settings(SIMULATION_REQUEST_MAX_STEPS=15 * 100 * 30), contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.client.get(self.url, {'paths': 100}).status_code, status.HTTP_200_OK)
+            response = self.client.get(self.url, {'paths': 200})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('simulate_stockouts', response.data['error'])
+
+    def test_hospital_staff_limited_to_own_hospital(self):
+        inventories = create_network()
+        hospital = inventories[0].hospital
+        self.login(role='PHARMACIST', hospital=hospital)
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.get(self.url, {'paths': 100})
+        self.assertEqual({row['hospital_id'] for row in response.data['results']}, {hospital.id})
+        response = self.client.get(self.url, {'hospital_id': inventories[-1].hospital_id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_alert_date_follows_request_stock(self):
+        from alerts.models import Alert
+
+        inventory = create_network(hospitals=1, medicines=1)[0]
+        # The stored row would last far longer than the stock sent with the request
+        Inventory.objects.filter(id=inventory.id).update(current_stock=900, reorder_level=0, max_capacity=1000)
+        ConsumptionForecast.objects.create(
+            inventory=inventory, forecast_7d=14, forecast_14d=28, forecast_30d=60, level=2,
+            residual_std=0.1, history_days=90, generated_at=datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        self.login()
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.client.post('/api/predictions/predict/', {
+                'hospital_id': inventory.hospital_id, 'medicine_id': inventory.medicine_id,
+                'current_stock': 11, 'daily_consumption': 2, 'reorder_level': 50,
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        alert = Alert.objects.get(inventory=inventory)
+        days_of_supply = response.data['prediction']['days_of_supply']
+        # 11 units at 2 a day, not the 900 units stored on the inventory
+        self.assertAlmostEqual(days_of_supply, 5.5, delta=0.01)
+        self.assertEqual(alert.current_stock, 11)
+        self.assertEqual(alert.predicted_stockout_date, (alert.created_at + timedelta(days=days_of_supply)).date())
+
+class PredictionRunTests(PredictionApiTestCase):
+    url = '/api/predictions/runs/'
+
+    def setUp(self):
+        super().setUp()
+        self.inventories = create_network()
+
+    def record(self, **kwargs):
+        return runs.record_run(self.predictor, workers=1, log=lambda *args: None, **kwargs)
+
+    def test_saves_every_score_in_batches(self):
+        scores = score_inventories(self.predictor, inventory_scope())
+        run = runs.save_run(scores, batch_size=4, log=lambda *args: None)
+
+        self.assertIsNotNone(run.completed_at)
+        self.assertEqual((run.total, run.model_version), (15, scores.version))
+        self.assertEqual(run.risk_summary, scores.risk_summary())
+        stored = {r.inventory_id: r for r in run.results.all()}
+        self.assertEqual(len(stored), 15)
+        for i, inventory_id in enumerate(scores.inventory_ids):
+            result = stored[int(inventory_id)]
+            self.assertAlmostEqual(result.shortage_probability, float(scores.primary[i]), places=6)
+            self.assertAlmostEqual(result.days_of_supply, float(scores.days_of_supply[i]))
+
+    def test_failed_write_leaves_no_run(self):
+        scores = score_inventories(self.predictor, inventory_scope())
+        # The last batch cannot be built once the first ones are written
+        scores.hospital_ids = scores.hospital_ids.astype(object)
+        scores.hospital_ids[-1] = None
+        with self.assertRaises(TypeError):
+            runs.save_run(scores, batch_size=4, log=lambda *args: None)
+        self.assertFalse(PredictionRun.objects.exists())
+        self.assertFalse(PredictionResult.objects.exists())
+
+    @override_settings(PREDICTION_RUNS_KEPT=2)
+    def test_latest_run_and_pruning(self):
+        hospital = self.inventories[0].hospital
+        first, second = self.record(), self.record()
+        scoped = self.record(hospital_id=hospital.id)
+        third = self.record()
+
+        self.assertEqual(runs.latest_run(), third)
+        self.assertEqual(runs.latest_run(self.inventories[-1].hospital_id), third)
+        PredictionRun.objects.filter(id=scoped.id).update(completed_at=third.completed_at + timedelta(seconds=1))
+        self.assertEqual(runs.latest_run(hospital.id).id, scoped.id)
+        # Two network-wide runs kept; the hospital run is a scope of its own
+        self.assertEqual(
+            set(PredictionRun.objects.values_list('id', flat=True)), {second.id, scoped.id, third.id}
+        )
+        self.assertFalse(PredictionResult.objects.filter(run_id=first.id).exists())
+
+    def test_reads_latest_run_filtered_and_paged(self):
+        run = self.record()
+        self.login()
+        response = self.client.get(self.url + 'latest/', {'page_size': 100})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['run']['id'], response.data['total_results']), (run.id, 15))
+        probabilities = [r['shortage_probability'] for r in response.data['results']]
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+
+        page = self.client.get(self.url + 'latest/', {'page': 2, 'page_size': 4}).data
+        self.assertEqual((page['total_pages'], page['results']), (4, response.data['results'][4:8]))
+
+        level = response.data['results'][0]['risk_level']
+        filtered = self.client.get(self.url + f'{run.id}/', {'risk_level': level.lower(), 'min_probability': 0.01})
+        self.assertEqual(filtered.data['total_results'], run.results.filter(
+            risk_level=level, shortage_probability__gte=0.01
+        ).count())
+        self.assertTrue(all(r['risk_level'] == level for r in filtered.data['results']))
+
+        self.assertEqual(self.client.get(self.url + 'latest/', {'risk_level': 'SEVERE'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url + '999/').status_code, 404)
+
+    def test_hospital_staff_read_own_hospital_only(self):
+        self.record()
+        hospital = self.inventories[0].hospital
+        self.login(role='PHARMACIST', hospital=hospital)
+
+        response = self.client.get(self.url + 'latest/')
+        self.assertEqual(response.data['total_results'], 5)
+        self.assertEqual({r['hospital'] for r in response.data['results']}, {hospital.id})
+        response = self.client.get(self.url + 'latest/', {'hospital_id': self.inventories[-1].hospital_id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_post_records_run(self):
+        self.login()
+        response = self.client.post(self.url, {'state': 'Kerala'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['state'], response.data['total']), ('Kerala', 5))
+        self.assertEqual(len(self.client.get(self.url).data), 1)
+
+    def test_incremental_rescore_merges_changed_inventories(self):
+        run = self.record()
+        lowest = run.results.order_by('shortage_probability').first()
+        changed = Inventory.objects.get(id=lowest.inventory_id)
+        restocked = Inventory.objects.exclude(id=changed.id).first()
+
+        changed.current_stock, changed.average_daily_usage = 0, Decimal('80.00')
+        changed.save()
+        InventoryTransaction.objects.create(
+            inventory=restocked, transaction_type=InventoryTransaction.TransactionType.PURCHASE,
+            quantity=10, previous_stock=restocked.current_stock, new_stock=restocked.current_stock + 10,
+        )
+        merged, rescored = runs.rescore_changed(self.predictor, log=lambda *args: None)
+
+        self.assertEqual((merged.id, rescored, merged.rescored, merged.total), (run.id, 2, 2, 15))
+        self.assertEqual(run.results.count(), 15)
+        after = run.results.get(inventory=changed)
+        self.assertGreater(after.shortage_probability, lowest.shortage_probability)
+        fresh = score_inventories(self.predictor, inventory_scope().filter(id=changed.id))
+        self.assertAlmostEqual(after.shortage_probability, float(fresh.primary[0]), places=6)
+        self.assertEqual(sum(merged.risk_summary.values()), 15)
+        self.assertEqual(merged.risk_summary[after.risk_level], run.results.filter(risk_level=after.risk_level).count())
+
+        # Nothing changed since: nothing to rescore
+        merged, rescored = runs.rescore_changed(self.predictor, log=lambda *args: None)
+        self.assertEqual((merged.id, rescored, merged.rescored), (run.id, 0, 2))
+
+    def test_incremental_rescore_without_run_records_full_run(self):
+        run, rescored = runs.rescore_changed(self.predictor, state='Kerala', log=lambda *args: None)
+        self.assertEqual((run.state, run.total, rescored), ('Kerala', 5, 5))
+        self.assertTrue(run.watermark)
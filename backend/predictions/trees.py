@@ -0,0 +1,163 @@
+# Drug/backend/predictions/trees.py
+import json
+
+import numpy as np
+
+# Complete-tree layout doubles in size per level; deeper boosters stay on xgboost
+MAX_SUPPORTED_DEPTH = 12
+
+
+class TreeEnsemble:
+    """
+    A trained binary:logistic XGBoost booster flattened into NumPy arrays.
+
+    Each tree is padded to a complete binary tree of depth max_depth and
+    stored heap-style (children of node i are 2i+1 and 2i+2), all trees in
+    one contiguous block: split feature, threshold and default direction for
+    the internal nodes, leaf value for the bottom level. predict_proba walks
+    every tree for a whole batch one level at a time, so scoring needs only
+    NumPy and a few vectorized gathers per level instead of a call into the
+    xgboost runtime.
+
+    Padding under a shallow leaf always branches left (threshold +inf) and
+    every bottom-level descendant carries that leaf's value.
+
+    Multi-label boosters (one output per shortage horizon) are supported:
+    tree_target records which output each tree adds to, and base_margin
+    holds one value per output.
+    """
+
+    FIELDS = ('feature', 'threshold', 'default_right', 'leaf_value')
+
+    def __init__(self, feature, threshold, default_right, leaf_value, base_margin, tree_target=None):
+        # feature/threshold/default_right: (trees, 2**depth - 1); leaf_value: (trees, 2**depth)
+        self.feature = feature
+        self.threshold = threshold
+        self.default_right = default_right
+        self.leaf_value = leaf_value
+        self.base_margin = np.atleast_1d(np.asarray(base_margin, dtype=np.float64))
+        self.max_depth = int(np.log2(leaf_value.shape[1]))
+        if tree_target is None:
+            tree_target = np.zeros(len(feature), dtype=np.int32)
+        self.tree_target = np.asarray(tree_target, dtype=np.int32)
+        # (trees, targets): sums each row's leaf values into its output's margin
+        self._target_matrix = np.eye(len(self.base_margin))[self.tree_target]
+
+        n_trees, n_internal = feature.shape
+        self._tree_base = (np.arange(n_trees, dtype=np.int32) * n_internal)[np.newaxis, :]
+        self._leaf_base = (np.arange(n_trees, dtype=np.int32) * (n_internal + 1))[np.newaxis, :]
+
+    @classmethod
+    def from_model(cls, model):
+        """Compile an XGBClassifier (or a raw Booster)"""
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        return cls.from_booster(booster)
+
+    @classmethod
+    def from_booster(cls, booster):
+        dump = json.loads(bytes(booster.save_raw(raw_format='json')))
+        learner = dump['learner']
+
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective for the NumPy evaluator: {objective}")
+
+        # base_score is stored in probability space (as "[5E-1]" in xgboost >= 3,
+        # one value per target for multi-label models)
+        base_score = np.array(str(learner['learner_model_param']['base_score']).strip('[]').split(','), dtype=np.float64)
+        # xgboost 1.7 stores a single base_score shared by every target
+        targets = int(learner['learner_model_param'].get('num_target', 1))
+        if len(base_score) == 1 and targets > 1:
+            base_score = np.repeat(base_score, targets)
+        base_margin = np.log(base_score / (1.0 - base_score))
+
+        model = learner['gradient_booster']['model']
+        trees = model['trees']
+        # Output each tree belongs to (round-robin over targets)
+        tree_target = np.array(model.get('tree_info', [0] * len(trees)), dtype=np.int32)
+        depth = max([_tree_depth(tree['left_children'], tree['right_children']) for tree in trees] or [0])
+        if depth > MAX_SUPPORTED_DEPTH:
+            raise ValueError(f"Trees of depth {depth} are too deep for the NumPy evaluator")
+
+        n_internal = 2 ** depth - 1
+        feature = np.zeros((len(trees), n_internal), dtype=np.int32)
+        threshold = np.full((len(trees), n_internal), np.inf, dtype=np.float32)
+        default_right = np.zeros((len(trees), n_internal), dtype=bool)
+        leaf_value = np.zeros((len(trees), n_internal + 1), dtype=np.float32)
+
+        for t, tree in enumerate(trees):
+            left, right = tree['left_children'], tree['right_children']
+            # Leaves store their value in split_conditions
+            conditions = tree['split_conditions']
+            stack = [(0, 0, 0)]  # (node id, heap position, level)
+            while stack:
+                node, position, level = stack.pop()
+                if left[node] == -1:
+                    span = 2 ** (depth - level)
+                    first = (position + 1) * span - 1 - n_internal
+                    leaf_value[t, first:first + span] = conditions[node]
+                    continue
+                feature[t, position] = tree['split_indices'][node]
+                threshold[t, position] = conditions[node]
+                default_right[t, position] = not tree['default_left'][node]
+                stack.append((left[node], 2 * position + 1, level + 1))
+                stack.append((right[node], 2 * position + 2, level + 1))
+
+        return cls(feature, threshold, default_right, leaf_value, base_margin, tree_target)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(*(data[field] for field in cls.FIELDS), base_margin=data['base_margin'])
+
+    def __len__(self):
+        return len(self.feature)
+
+    @property
+    def targets(self):
+        return len(self.base_margin)
+
+    def leaf_indices(self, X):
+        """Bottom-level position reached in every tree, shape (rows, trees)"""
+        # xgboost compares float32 inputs against float32 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat_X = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.int32) * X.shape[1])[:, np.newaxis]
+        feature = self.feature.ravel()
+        threshold = self.threshold.ravel()
+        default_right = self.default_right.ravel()
+        has_missing = np.isnan(X).any()
+
+        # Global index of each row's current node in each tree
+        nodes = np.repeat(self._tree_base, len(X), axis=0)
+        for _ in range(self.max_depth):
+            x = flat_X[row_base + feature[nodes]]
+            go_right = x >= threshold[nodes]
+            if has_missing:
+                go_right = np.where(np.isnan(x), default_right[nodes], go_right)
+            # Heap child within the tree: 2 * (node - base) + 1 + go_right
+            nodes = 2 * nodes - self._tree_base + 1 + go_right
+        return nodes - self._tree_base - self.feature.shape[1]
+
+    def predict_margin(self, X):
+        leaves = self.leaf_value.ravel()[self.leaf_indices(X) + self._leaf_base]
+        if self.targets == 1:
+            return leaves.sum(axis=1, dtype=np.float64) + self.base_margin[0]
+        return leaves.astype(np.float64) @ self._target_matrix + self.base_margin
+
+    def predict_proba(self, X):
+        """
+        Positive-class probability for each row (column 1 of
+        XGBClassifier.predict_proba); (rows, targets) for multi-label models
+        """
+        return (1.0 / (1.0 + np.exp(-self.predict_margin(X)))).astype(np.float32)
+
+
+def _tree_depth(left, right):
+    """Number of splits on the longest root-to-leaf path"""
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+        if not frontier:
+            return depth
+        depth += 1
@@ -0,0 +1,194 @@
+# Drug/backend/predictions/tuning.py
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .datasets import load_matrix, save_matrix
+
+# Hyperparameters searched by train_model --tune (the rest of BOOSTER_PARAMS stays fixed)
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [3, 4, 6],
+    'learning_rate': [0.1, 0.3],
+}
+# Candidates whose mean fold accuracy is within this of the best count as ties;
+# the cheapest of them to evaluate wins
+DEFAULT_TOLERANCE = 0.005
+
+# Per-process training matrix, memory-mapped once by the pool initializer
+_worker_matrix = None
+_worker_order = None
+
+
+def _init_worker(path):
+    """Map the parent's training matrix; every worker shares its page cache"""
+    global _worker_matrix, _worker_order
+    _worker_matrix = load_matrix(path, verify=False)
+    _worker_order = _worker_matrix.time_order()
+
+
+def time_series_folds(rows, folds):
+    """
+    (train_stop, test_stop) positions in time order for expanding-window
+    folds, as sklearn's TimeSeriesSplit: each fold trains on everything
+    before its test window, so no model sees the future it is scored on
+    """
+    from sklearn.model_selection import TimeSeriesSplit
+
+    return [
+        (int(train[-1]) + 1, int(test[-1]) + 1)
+        for train, test in TimeSeriesSplit(n_splits=folds).split(np.empty((rows, 1)))
+    ]
+
+
+def candidate_params(grid=None, n_iter=None, seed=42):
+    """Every combination of the grid, or n_iter of them sampled without replacement"""
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    grid = grid or DEFAULT_PARAM_GRID
+    if n_iter:
+        return list(ParameterSampler(grid, n_iter=min(n_iter, len(ParameterGrid(grid))), random_state=seed))
+    return list(ParameterGrid(grid))
+
+
+def inference_cost(params):
+    """Tree nodes visited per scored row, which is what inference latency scales with"""
+    from .forecaster import BOOSTER_PARAMS, FULL_TRAINING_ROUNDS
+
+    return params.get('n_estimators', FULL_TRAINING_ROUNDS) * params.get('max_depth', BOOSTER_PARAMS['max_depth'])
+
+
+def _evaluate(candidate, params, fold, train_stop, test_stop):
+    import xgboost as xgb
+    from sklearn.metrics import accuracy_score, log_loss
+    from sklearn.preprocessing import StandardScaler
+
+    from .forecaster import BOOSTER_PARAMS, FULL_TRAINING_ROUNDS
+
+    train_rows = _worker_order[:train_stop]
+    test_rows = _worker_order[train_stop:test_stop]
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(_worker_matrix.X[train_rows])
+    X_test = scaler.transform(_worker_matrix.X[test_rows])
+    # One label column per horizon; single-horizon matrices fit a plain binary model
+    labels = _worker_matrix.labels
+    y_train = labels[train_rows]
+    y_test = _worker_matrix.y[test_rows]
+
+    # One process per core already; keep xgboost single-threaded
+    model = xgb.XGBClassifier(**{**BOOSTER_PARAMS, 'n_estimators': FULL_TRAINING_ROUNDS, **params, 'n_jobs': 1})
+    started = time.perf_counter()
+    model.fit(X_train, y_train, verbose=False)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    probabilities = model.predict_proba(X_test)
+    predict_seconds = time.perf_counter() - started
+    if labels.ndim == 1:
+        probabilities = probabilities[:, 1]
+    probabilities = probabilities.reshape(len(test_rows), -1)
+
+    return {
+        'candidate': candidate,
+        'fold': fold,
+        'train_rows': len(train_rows),
+        'test_rows': len(test_rows),
+        'fit_seconds': fit_seconds,
+        'predict_us_per_row': predict_seconds / max(len(test_rows), 1) * 1e6,
+        # Means over horizons, so multi-horizon candidates are judged on all of them
+        'accuracy': float(np.mean([
+            accuracy_score(y_test[:, i], probabilities[:, i] >= 0.5) for i in range(y_test.shape[1])
+        ])),
+        'log_loss': float(np.mean([
+            log_loss(y_test[:, i], probabilities[:, i], labels=[0, 1]) for i in range(y_test.shape[1])
+        ])),
+    }
+
+
+def search(matrix, candidates, folds=3, workers=None, tolerance=DEFAULT_TOLERANCE, log=print):
+    """
+    Score every candidate on time-ordered folds of `matrix`, one (candidate,
+    fold) fit per task across a process pool. Workers memory-map the matrix's
+    snapshot file instead of receiving a copy of the data.
+
+    Returns a report whose 'selected' entry is the cheapest candidate (by
+    inference_cost) within `tolerance` of the best mean accuracy.
+    """
+    workers = workers or os.cpu_count() or 1
+    splits = time_series_folds(len(matrix), folds)
+    tasks = [
+        (candidate, params, fold, train_stop, test_stop)
+        for candidate, params in enumerate(candidates)
+        for fold, (train_stop, test_stop) in enumerate(splits)
+    ]
+
+    scratch = None
+    path = matrix.path
+    if path is None:
+        # No cached snapshot (e.g. no data watermark): share a temporary one
+        fd, scratch = tempfile.mkstemp(suffix='.bundle')
+        os.close(fd)
+        save_matrix(scratch, matrix)
+        path = scratch
+
+    started = time.perf_counter()
+    try:
+        if workers <= 1:
+            _init_worker(path)
+            results = [_evaluate(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)),
+                initializer=_init_worker,
+                initargs=(path,),
+            ) as pool:
+                futures = [pool.submit(_evaluate, *task) for task in tasks]
+                results = [future.result() for future in futures]
+    finally:
+        if scratch:
+            os.unlink(scratch)
+    wall_seconds = time.perf_counter() - started
+
+    summaries = []
+    for candidate, params in enumerate(candidates):
+        fold_results = [result for result in results if result['candidate'] == candidate]
+        summary = {
+            'params': params,
+            'accuracy': float(np.mean([r['accuracy'] for r in fold_results])),
+            'log_loss': float(np.mean([r['log_loss'] for r in fold_results])),
+            'fit_seconds': float(np.mean([r['fit_seconds'] for r in fold_results])),
+            'predict_us_per_row': float(np.mean([r['predict_us_per_row'] for r in fold_results])),
+            'inference_cost': inference_cost(params),
+            'folds': [
+                {key: r[key] for key in ('fold', 'train_rows', 'test_rows', 'fit_seconds', 'predict_us_per_row', 'accuracy')}
+                for r in fold_results
+            ],
+        }
+        summaries.append(summary)
+        log(
+            f"   {params}: accuracy {summary['accuracy']:.4f}, log loss {summary['log_loss']:.4f}, "
+            f"fit {summary['fit_seconds']:.2f}s, predict {summary['predict_us_per_row']:.2f} us/row"
+        )
+        for r in summary['folds']:
+            log(
+                f"      fold {r['fold']}: {r['train_rows']} train / {r['test_rows']} test rows, "
+                f"fit {r['fit_seconds']:.2f}s, predict {r['predict_us_per_row']:.2f} us/row, accuracy {r['accuracy']:.4f}"
+            )
+
+    best_accuracy = max(summary['accuracy'] for summary in summaries)
+    eligible = [summary for summary in summaries if summary['accuracy'] >= best_accuracy - tolerance]
+    # Cheapest to evaluate, then the most accurate, then the lowest log loss
+    selected = min(eligible, key=lambda s: (s['inference_cost'], -s['accuracy'], s['log_loss']))
+
+    return {
+        'folds': len(splits),
+        'workers': workers,
+        'wall_seconds': wall_seconds,
+        'best_accuracy': best_accuracy,
+        'tolerance': tolerance,
+        'selected': selected,
+        'candidates': summaries,
+    }
@@ -10,10 +10,26 @@
 
 # backend/predictions/urls.py
 from django.urls import path
-from .views import PredictShortageView, BatchPredictView, ModelStatusView
+from .views import (
+    PredictShortageView, BatchPredictView, StreamingBatchPredictView,
+    NetworkScoreView, StockoutSimulationView, ResultPageView, PredictionMetricsView, ModelStatusView,
+    PredictionRunListView, PredictionRunResultsView,
+    TrainingJobListView, TrainingJobDetailView, TrainingJobCancelView
+)
 
 urlpatterns = [
     path('predict/', PredictShortageView.as_view(), name='predict_shortage'),
     path('batch-predict/', BatchPredictView.as_view(), name='batch_predict'),
+    path('batch-predict/stream/', StreamingBatchPredictView.as_view(), name='batch_predict_stream'),
+    path('network-score/', NetworkScoreView.as_view(), name='network_score'),
+    path('stockout-simulation/', StockoutSimulationView.as_view(), name='stockout_simulation'),
+    path('runs/', PredictionRunListView.as_view(), name='prediction_runs'),
+    path('runs/latest/', PredictionRunResultsView.as_view(), name='prediction_run_latest'),
+    path('runs/<int:pk>/', PredictionRunResultsView.as_view(), name='prediction_run_results'),
+    path('results/<str:handle>/', ResultPageView.as_view(), name='prediction_results'),
     path('model-status/', ModelStatusView.as_view(), name='model_status'),
+    path('metrics/', PredictionMetricsView.as_view(), name='prediction_metrics'),
+    path('training-jobs/', TrainingJobListView.as_view(), name='training_jobs'),
+    path('training-jobs/<int:pk>/', TrainingJobDetailView.as_view(), name='training_job_detail'),
+    path('training-jobs/<int:pk>/cancel/', TrainingJobCancelView.as_view(), name='training_job_cancel'),
 ]
\ No newline at end of file
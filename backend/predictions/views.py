@@ -66,9 +66,37 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+import json
+import time
 
-from .forecaster import predictor_instance
+from .forecaster import RISK_LEVELS, predictor_instance
+from .metrics import pipeline_metrics
+from .results import result_store
+from .scoring import ScoreSet, inventory_scope, score_inventories
+from .consumption import FORECAST_COLUMNS
+from .models import ConsumptionForecast, PredictionRun, TrainingJob
+from .runs import latest_run, record_run
+from .serializers import PredictionResultSerializer, PredictionRunSerializer, TrainingJobSerializer
+from .simulation import DEFAULT_DAYS, DEFAULT_PATHS, simulate_inventories
+from .tasks import enqueue_training_job, fail_stale_jobs, revoke_training_job, unsupported_mode
+
+MAX_PAGE_SIZE = 500
+# Predictions returned inline by batch-predict; the rest are paged by result_handle
+DEFAULT_BATCH_TOP_K = 50
+# Records scored per model call when streaming NDJSON
+STREAM_CHUNK_SIZE = 500
+# Longer NDJSON lines are skipped with a per-line error instead of being buffered
+STREAM_MAX_LINE_BYTES = 64 * 1024
+# Upper bounds for stockout simulations requested through the API, which run
+# inside the request (see also SIMULATION_REQUEST_MAX_STEPS); larger scopes go
+# through `manage.py simulate_stockouts`
+MAX_SIMULATION_PATHS = 5000
+MAX_SIMULATION_DAYS = 90
+MAX_SIMULATION_INVENTORIES = 2000
 
 class PredictShortageView(APIView):
     """
@@ -106,6 +134,7 @@ class PredictShortageView(APIView):
             
             # Try to fetch actual hospital details if ID provided
             if 'hospital_id' in data:
+                started = time.perf_counter()
                 try:
                     from hospitals.models import Hospital
                     hospital = Hospital.objects.get(id=data['hospital_id'])
@@ -113,6 +142,16 @@ class PredictShortageView(APIView):
                     defaults['hospital_bed_count'] = hospital.bed_capacity
                 except Exception:
                     pass
+                pipeline_metrics.observe('view.hospital_lookup', time.perf_counter() - started)
+                
+                # Consumption forecast from the inventory's transaction ledger, if fitted
+                started = time.perf_counter()
+                forecast = ConsumptionForecast.objects.filter(
+                    inventory__hospital_id=data['hospital_id'], inventory__medicine_id=data['medicine_id']
+                ).values(*FORECAST_COLUMNS).first()
+                if forecast:
+                    defaults.update(forecast)
+                pipeline_metrics.observe('view.forecast_lookup', time.perf_counter() - started)
 
             for key, value in defaults.items():
                 if key not in data:
@@ -123,6 +162,7 @@ class PredictShortageView(APIView):
             
             # Create alert if high risk
             if prediction['risk_level'] in ['HIGH', 'CRITICAL']:
+                started = time.perf_counter()
                 try:
                     from alerts.models import Alert
                     from hospitals.models import Inventory
@@ -135,12 +175,18 @@ class PredictShortageView(APIView):
                     ).first()
                     
                     if inventory:
-                        # Calculate details
-                        daily = float(data.get('daily_consumption', 1))
+                        # Calculate details from the request's own stock (projected from the
+                        # consumption forecast when there is one). The Monte Carlo stockout
+                        # day is served by stockout-simulation/, not computed per request.
                         current = float(data.get('current_stock', 0))
-                        days_left = current / daily if daily > 0 else 0
+                        days_left = min(prediction['days_of_supply'], 3650)
                         stockout_date = timezone.now() + timedelta(days=days_left)
-                        shortage_qty = int((daily * 7) - current)
+                        # Demand over the model's primary (shortest) shortage horizon
+                        horizon = predictor_instance.horizons[0]
+                        demand = data.get(f'forecast_{horizon}d')
+                        if demand is None:
+                            demand = float(data.get('daily_consumption', 1)) * horizon
+                        shortage_qty = int(demand - current)
                         if shortage_qty < 0: shortage_qty = 0
 
                         Alert.objects.create(
@@ -157,6 +203,7 @@ class PredictShortageView(APIView):
                 except Exception as e:
                     print(f"Error creating alert: {e}")
                     # Continue even if alert creation fails
+                pipeline_metrics.observe('view.alert_creation', time.perf_counter() - started)
             
             return Response({
                 'success': True,
@@ -187,21 +234,216 @@ class BatchPredictView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            predictions = predictor_instance.batch_predict(inventory_list)
+            try:
+                top_k = int(request.data.get('top_k', DEFAULT_BATCH_TOP_K))
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'top_k must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            top_k = min(max(top_k, 0), MAX_PAGE_SIZE)
+            
+            scores, _ = ScoreSet.from_items(predictor_instance, inventory_list)
             
-            # Count by risk level
-            risk_counts = {
-                'LOW': len([p for p in predictions if p['risk_level'] == 'LOW']),
-                'MEDIUM': len([p for p in predictions if p['risk_level'] == 'MEDIUM']),
-                'HIGH': len([p for p in predictions if p['risk_level'] == 'HIGH']),
-                'CRITICAL': len([p for p in predictions if p['risk_level'] == 'CRITICAL'])
-            }
+            return Response({
+                'success': True,
+                'model_version': scores.version,
+                'total_predictions': len(scores),
+                'risk_summary': scores.risk_summary(),
+                'result_handle': result_store.save(scores, request.user.id),
+                'predictions': scores.to_predictions(predictor_instance, scores.ranking(top_k))
+            })
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _request_body(request):
+    """
+    Readable request body, or None if there is none. Django caps the body at
+    Content-Length (0 when absent), so chunked uploads are read straight from
+    wsgi.input, which servers that accept them (gunicorn) end at the last chunk.
+    """
+    meta = request.META
+    if not meta.get('CONTENT_LENGTH') and (
+        meta.get('HTTP_TRANSFER_ENCODING', '').lower() == 'chunked' or meta.get('wsgi.input_terminated')
+    ):
+        return meta.get('wsgi.input')
+    return request.stream
+
+
+def _ndjson_lines(stream, max_line_bytes=STREAM_MAX_LINE_BYTES):
+    """
+    (line number, raw line) for each line of `stream`, reading at most
+    max_line_bytes at a time; the raw line of a longer one is None
+    """
+    line_no = 0
+    while True:
+        raw = stream.readline(max_line_bytes + 1)
+        if not raw:
+            return
+        line_no += 1
+        if len(raw) > max_line_bytes and not raw.endswith(b'\n'):
+            # Drop the rest of the line without holding it
+            while raw and not raw.endswith(b'\n'):
+                raw = stream.readline(max_line_bytes + 1)
+            raw = None
+        yield line_no, raw
+
+
+def _ndjson_predictions(stream, chunk_size=STREAM_CHUNK_SIZE, max_line_bytes=STREAM_MAX_LINE_BYTES):
+    """
+    Read NDJSON inventory records from `stream` and yield NDJSON results,
+    holding at most one chunk of records in memory at a time
+    """
+    risk_counts = dict.fromkeys(RISK_LEVELS, 0)
+    total = failed = 0
+    
+    try:
+        snapshot = predictor_instance.serving_snapshot()
+        
+        def score(chunk):
+            nonlocal total, failed
+            items = [item for _, item, _ in chunk if item is not None]
+            predictions, errors = predictor_instance.predict_many(items, snapshot)
+            results = iter(zip(predictions, errors))
+            
+            lines = []
+            for line_no, item, parse_error in chunk:
+                prediction, error = next(results) if item is not None else (None, parse_error)
+                if prediction is None:
+                    failed += 1
+                    lines.append(json.dumps({'line': line_no, 'error': error}))
+                else:
+                    total += 1
+                    risk_counts[prediction['risk_level']] += 1
+                    lines.append(json.dumps({'line': line_no, **prediction}))
+            return '\n'.join(lines) + '\n'
+        
+        chunk = []
+        for line_no, raw in _ndjson_lines(stream, max_line_bytes):
+            if raw is None:
+                chunk.append((line_no, None, f'line longer than {max_line_bytes} bytes'))
+            elif not raw.strip():
+                continue
+            else:
+                try:
+                    item = json.loads(raw)
+                except ValueError:
+                    chunk.append((line_no, None, 'invalid JSON'))
+                else:
+                    if isinstance(item, dict):
+                        chunk.append((line_no, item, None))
+                    else:
+                        chunk.append((line_no, None, 'expected a JSON object'))
+            if len(chunk) >= chunk_size:
+                yield score(chunk)
+                chunk = []
+        if chunk:
+            yield score(chunk)
+        
+        yield json.dumps({'summary': {
+            'total_predictions': total,
+            'errors': failed,
+            'risk_summary': risk_counts,
+            'model_version': snapshot.version,
+        }}) + '\n'
+    
+    except Exception as e:
+        yield json.dumps({'success': False, 'error': str(e)}) + '\n'
+
+
+class StreamingBatchPredictView(APIView):
+    """
+    Predict shortages for a stream of newline-delimited JSON inventory records.
+    Records are scored in fixed-size chunks and results are streamed back as
+    NDJSON in input order, so memory stays flat whatever the payload size.
+    Chunked uploads (no Content-Length) are accepted.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        stream = _request_body(request)
+        if stream is None:
+            return Response(
+                {'error': 'No inventory data provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return StreamingHttpResponse(_ndjson_predictions(stream), content_type='application/x-ndjson')
+
+
+def _ranked_page(scores, page, page_size, top_k=None):
+    """
+    One page of `scores` in risk order. Only the rows up to the end of the
+    page are selected and sorted, never the whole set.
+    """
+    ranked = len(scores) if top_k is None else min(top_k, len(scores))
+    start = (page - 1) * page_size
+    end = min(start + page_size, ranked)
+    indices = scores.ranking(end)[start:end] if start < end else []
+    return {
+        'page': page,
+        'page_size': page_size,
+        'total_pages': -(-ranked // page_size),
+        'predictions': scores.to_predictions(predictor_instance, indices),
+    }
+
+
+class NetworkScoreView(APIView):
+    """
+    Score inventories straight from the database.
+    Scope: one hospital (hospital_id), one state (state) or the whole network.
+    Hospital staff can only score their own hospital.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        
+        try:
+            hospital_id = int(params['hospital_id']) if params.get('hospital_id') else None
+            page = max(int(params.get('page', 1)), 1)
+            page_size = min(max(int(params.get('page_size', 50)), 1), MAX_PAGE_SIZE)
+            top_k = int(params['top_k']) if params.get('top_k') else None
+        except ValueError:
+            return Response(
+                {'error': 'hospital_id, page, page_size and top_k must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        state = params.get('state') or None
+        
+        # Restrict the scope to what the user may see
+        if user.is_superuser or user.role == 'HEALTH_AUTHORITY':
+            pass
+        elif user.is_hospital_staff and user.hospital:
+            if hospital_id not in (None, user.hospital.id):
+                return Response(
+                    {'error': 'You can only score your own hospital'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            hospital_id, state = user.hospital.id, None
+        else:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            scores = score_inventories(predictor_instance, inventory_scope(hospital_id, state))
+            if top_k is not None:
+                top_k = max(top_k, 0)
             
             return Response({
                 'success': True,
-                'total_predictions': len(predictions),
-                'risk_summary': risk_counts,
-                'predictions': predictions[:50]  # Limit response
+                'scope': {'hospital_id': hospital_id, 'state': state},
+                'model_version': scores.version,
+                'total_predictions': len(scores),
+                'risk_summary': scores.risk_summary(),
+                'result_handle': result_store.save(scores, user.id, top_k),
+                **_ranked_page(scores, page, page_size, top_k),
+                'timestamp': timezone.now().isoformat()
             })
             
         except Exception as e:
@@ -211,6 +453,267 @@ class BatchPredictView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class StockoutSimulationView(APIView):
+    """
+    Monte Carlo stockout simulation straight from the database: for every
+    inventory, P(stockout by day d) and the expected shortage quantity.
+    Scope as NetworkScoreView; hospital staff can only simulate their own hospital.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        
+        try:
+            hospital_id = int(params['hospital_id']) if params.get('hospital_id') else None
+            page = max(int(params.get('page', 1)), 1)
+            page_size = min(max(int(params.get('page_size', 50)), 1), MAX_PAGE_SIZE)
+            paths = max(int(params['paths']), 1) if params.get('paths') else None
+            days = max(int(params['days']), 1) if params.get('days') else None
+            seed = int(params['seed']) if params.get('seed') else None
+        except ValueError:
+            return Response(
+                {'error': 'hospital_id, page, page_size, paths, days and seed must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        state = params.get('state') or None
+        
+        if user.is_superuser or user.role == 'HEALTH_AUTHORITY':
+            pass
+        elif user.is_hospital_staff and user.hospital:
+            if hospital_id not in (None, user.hospital.id):
+                return Response(
+                    {'error': 'You can only simulate your own hospital'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            hospital_id, state = user.hospital.id, None
+        else:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        
+        paths = paths or getattr(settings, 'SIMULATION_PATHS', DEFAULT_PATHS)
+        days = days or getattr(settings, 'SIMULATION_DAYS', DEFAULT_DAYS)
+        if paths > MAX_SIMULATION_PATHS or days > MAX_SIMULATION_DAYS:
+            return Response(
+                {'error': f'paths and days can be at most {MAX_SIMULATION_PATHS} and {MAX_SIMULATION_DAYS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = inventory_scope(hospital_id, state)
+        inventories = queryset.count()
+        max_steps = getattr(settings, 'SIMULATION_REQUEST_MAX_STEPS', 60_000_000)
+        if inventories > MAX_SIMULATION_INVENTORIES or inventories * paths * days > max_steps:
+            return Response(
+                {'error': (
+                    f'{inventories} inventories x {paths} paths x {days} days is too large to simulate per '
+                    'request; narrow the scope with hospital_id or state, use fewer paths or days, or run '
+                    '`manage.py simulate_stockouts`'
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            started = time.perf_counter()
+            simulation = simulate_inventories(queryset, paths=paths, days=days, seed=seed)
+            pipeline_metrics.observe('simulation', time.perf_counter() - started)
+            
+            # Most likely to run out within the horizon first
+            start = (page - 1) * page_size
+            ranking = simulation.ranking()[start:start + page_size]
+            return Response({
+                'success': True,
+                'scope': {'hospital_id': hospital_id, 'state': state},
+                'paths': simulation.paths,
+                'days': simulation.days,
+                'total_inventories': len(simulation),
+                'page': page,
+                'page_size': page_size,
+                'total_pages': -(-len(simulation) // page_size),
+                'results': simulation.to_rows(ranking),
+                'timestamp': timezone.now().isoformat()
+            })
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PredictionRunListView(APIView):
+    """
+    Recent persisted prediction runs (GET), or score a scope now and save it
+    as a new run (POST {"hospital_id": ..., "state": ...}; health authorities
+    only). Scheduled runs come from `score_network --save`.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        runs = PredictionRun.objects.filter(completed_at__isnull=False)
+        if user.is_superuser or user.role == 'HEALTH_AUTHORITY':
+            pass
+        elif user.is_hospital_staff and user.hospital:
+            runs = runs.filter(Q(hospital__isnull=True, state='') | Q(hospital_id=user.hospital.id))
+        else:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        return Response(PredictionRunSerializer(runs[:50], many=True).data)
+    
+    def post(self, request):
+        if not _can_train(request.user):
+            return Response(
+                {'error': 'Only health authorities can record prediction runs'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            hospital_id = int(request.data['hospital_id']) if request.data.get('hospital_id') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'hospital_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            run = record_run(
+                predictor_instance, hospital_id=hospital_id, state=request.data.get('state') or None,
+                workers=1, log=lambda *args: None,
+            )
+            return Response(PredictionRunSerializer(run).data, status=status.HTTP_201_CREATED)
+        
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class PredictionRunResultsView(APIView):
+    """
+    Page through the stored results of a run (runs/<id>/) or of the latest
+    completed one (runs/latest/), riskiest first, without scoring anything.
+    Filters: risk_level (comma-separated), hospital_id, medicine_id and
+    min_probability. Hospital staff only see their own hospital's results.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk=None):
+        user = request.user
+        params = request.query_params
+        
+        try:
+            hospital_id = int(params['hospital_id']) if params.get('hospital_id') else None
+            medicine_id = int(params['medicine_id']) if params.get('medicine_id') else None
+            min_probability = float(params['min_probability']) if params.get('min_probability') else None
+            page = max(int(params.get('page', 1)), 1)
+            page_size = min(max(int(params.get('page_size', 50)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {'error': 'hospital_id, medicine_id, page and page_size must be integers, min_probability a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        risk_levels = [level.strip().upper() for level in params.get('risk_level', '').split(',') if level.strip()]
+        if set(risk_levels) - set(RISK_LEVELS):
+            return Response(
+                {'error': f"risk_level must be one or more of {', '.join(RISK_LEVELS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if user.is_superuser or user.role == 'HEALTH_AUTHORITY':
+            pass
+        elif user.is_hospital_staff and user.hospital:
+            if hospital_id not in (None, user.hospital.id):
+                return Response(
+                    {'error': 'You can only view your own hospital'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            hospital_id = user.hospital.id
+        else:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if pk is None:
+            run = latest_run(hospital_id)
+        else:
+            run = PredictionRun.objects.filter(id=pk, completed_at__isnull=False).first()
+            # A run scoped to another hospital holds none of this hospital's results
+            if run is not None and hospital_id is not None and run.hospital_id not in (None, hospital_id):
+                run = None
+        if run is None:
+            return Response({'error': 'Prediction run not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        results = run.results.all()
+        if risk_levels:
+            results = results.filter(risk_level__in=risk_levels)
+        if hospital_id is not None:
+            results = results.filter(hospital_id=hospital_id)
+        if medicine_id is not None:
+            results = results.filter(medicine_id=medicine_id)
+        if min_probability is not None:
+            results = results.filter(shortage_probability__gte=min_probability)
+        
+        total = results.count()
+        start = (page - 1) * page_size
+        page_results = results.select_related('hospital', 'medicine').order_by('-shortage_probability', 'id')
+        
+        return Response({
+            'success': True,
+            'run': PredictionRunSerializer(run).data,
+            'total_results': total,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': -(-total // page_size),
+            'results': PredictionResultSerializer(page_results[start:start + page_size], many=True).data,
+        })
+
+
+class ResultPageView(APIView):
+    """
+    Page through a stored batch or network result without rescoring it.
+    Handles expire after PREDICTION_RESULT_TTL and belong to their creator.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, handle):
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', 50)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {'error': 'page and page_size must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        entry = result_store.load(handle, request.user.id)
+        if entry is None:
+            return Response(
+                {'error': 'Result not found or expired'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        scores = entry['scores']
+        return Response({
+            'success': True,
+            'result_handle': handle,
+            'model_version': scores.version,
+            'total_predictions': len(scores),
+            'risk_summary': scores.risk_summary(),
+            **_ranked_page(scores, page, page_size, entry['top_k']),
+        })
+
+
+class PredictionMetricsView(APIView):
+    """
+    Machine-readable latency and batch-size histograms for this worker.
+    Each gunicorn worker keeps its own; scrape repeatedly and merge by pid.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return Response(dict(
+            pipeline_metrics.as_dict(),
+            model_version=predictor_instance.version,
+            cache=predictor_instance.cache.stats(),
+            micro_batching=predictor_instance.batcher.stats() if predictor_instance.batcher else None,
+        ))
+
+
 class ModelStatusView(APIView):
     """
     Check ML model status
@@ -218,19 +721,146 @@ class ModelStatusView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        import os
         from django.conf import settings
         
-        model_path = os.path.join(settings.BASE_DIR, '..', 'ml_models')
-        models_exist = os.path.exists(os.path.join(model_path, 'shortage_model.pkl'))
+        models_exist = predictor_instance.has_saved_model()
         
         # Try to load if exists but not loaded
-        if models_exist and predictor_instance.model is None:
+        if models_exist and predictor_instance.snapshot is None:
             predictor_instance.load_model()
         
         return Response({
-            'model_loaded': predictor_instance.model is not None,
+            'model_loaded': predictor_instance.snapshot is not None,
+            'booster_loaded': predictor_instance.snapshot is not None and predictor_instance.snapshot.model_loaded,
+            'model_version': predictor_instance.version,
             'models_exist': models_exist,
+            'preload_enabled': settings.PRELOAD_ML_MODEL,
             'feature_count': len(predictor_instance.feature_columns) if predictor_instance.feature_columns else 0,
-            'status': 'READY' if predictor_instance.model else 'NOT_TRAINED'
-        })
\ No newline at end of file
+            'cache': predictor_instance.cache.stats(),
+            'micro_batching': predictor_instance.batcher.stats() if predictor_instance.batcher else None,
+            'latency_ms': pipeline_metrics.latency_summary(),
+            'status': 'READY' if predictor_instance.snapshot else 'NOT_TRAINED'
+        })
+
+
+def _can_train(user):
+    return user.is_superuser or user.role == 'HEALTH_AUTHORITY'
+
+
+def _visible_jobs(user):
+    """Training jobs a user may read: all of them for those who can train, else their own"""
+    jobs = TrainingJob.objects.select_related('requested_by')
+    return jobs if _can_train(user) else jobs.filter(requested_by=user)
+
+
+class TrainingJobListView(APIView):
+    """
+    Start a background training run (POST {"mode": "FULL" | "INCREMENTAL" | "TUNE",
+    "options": {...}}) or list recent ones; users who can't train only see
+    their own. Only one job may be queued or running at a time; poll
+    training-jobs/<id>/ for progress. Jobs whose worker stopped sending
+    heartbeats are failed first, so they never block.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        jobs = _visible_jobs(request.user)
+        if request.query_params.get('status'):
+            jobs = jobs.filter(status=request.query_params['status'].upper())
+        return Response(TrainingJobSerializer(jobs[:50], many=True).data)
+    
+    def post(self, request):
+        if not _can_train(request.user):
+            return Response(
+                {'error': 'Only health authorities can start training'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = TrainingJobSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        reason = unsupported_mode(serializer.validated_data.get('mode', TrainingJob.Mode.FULL))
+        if reason:
+            return Response({'error': reason}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fail_stale_jobs()
+        active = TrainingJob.objects.filter(status__in=TrainingJob.ACTIVE_STATUSES).first()
+        if active is not None:
+            return Response(
+                {'error': 'A training job is already queued or running', 'job': TrainingJobSerializer(active).data},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        job = serializer.save(requested_by=request.user)
+        try:
+            enqueue_training_job(job)
+        except Exception as e:
+            TrainingJob.objects.filter(id=job.id).update(
+                status=TrainingJob.Status.FAILED, error=str(e), finished_at=timezone.now()
+            )
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        job.refresh_from_db()
+        return Response(TrainingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class TrainingJobDetailView(APIView):
+    """
+    Status, per-step progress and (once finished) metrics of a training job.
+    Users who can't train only see the jobs they requested.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, pk):
+        fail_stale_jobs(job_id=pk)
+        job = _visible_jobs(request.user).filter(id=pk).first()
+        if job is None:
+            return Response({'error': 'Training job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(TrainingJobSerializer(job).data)
+
+
+class TrainingJobCancelView(APIView):
+    """
+    Cancel a training job. A queued job is cancelled at once; a running one
+    stops at its next step boundary, before a new model version is published.
+    A running job without a live heartbeat (its worker is gone, so nothing
+    would read the request) is failed at once instead.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, pk):
+        if not _can_train(request.user):
+            return Response(
+                {'error': 'Only health authorities can cancel training'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        job = TrainingJob.objects.filter(id=pk).first()
+        if job is None:
+            return Response({'error': 'Training job not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        # Missed three heartbeats: no worker is left to see cancel_requested
+        if fail_stale_jobs(
+            stale_seconds=3 * settings.TRAINING_JOB_HEARTBEAT_SECONDS, job_id=pk,
+            reason='Cancelled: the process running the job stopped sending heartbeats', queued=False,
+        ):
+            job.refresh_from_db()
+            return Response(TrainingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        
+        cancelled = TrainingJob.objects.filter(id=pk, status=TrainingJob.Status.QUEUED).update(
+            status=TrainingJob.Status.CANCELLED, cancel_requested=True, finished_at=timezone.now()
+        )
+        if cancelled:
+            revoke_training_job(job)
+        elif not TrainingJob.objects.filter(id=pk, status=TrainingJob.Status.RUNNING).update(cancel_requested=True):
+            return Response(
+                {'error': f'Training job is already {job.status.lower()}'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        job.refresh_from_db()
+        return Response(TrainingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)